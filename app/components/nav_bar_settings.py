@@ -3,6 +3,7 @@ MARGIN = 1  # Increased margin for better visibility and consistency
 PAGE_FILE_NAME_DICT = {
     "比較兌換方法": "main.py",
     "兌換紀錄": "pages/transaction_history.py",
+    "交易分析": "pages/analytics.py",
     "管理資料庫": "pages/db_management.py",
     "管理用戶": "pages/user_management.py",
     "登入": "pages/login.py",
@@ -15,6 +16,7 @@ def get_tabs(is_logged_in: bool, is_admin: bool):
     
     if is_logged_in:
         general_tabs.append("兌換紀錄")
+        general_tabs.append("交易分析")
         auth_tab = "登出"
     else:
         auth_tab = "登入"
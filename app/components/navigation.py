@@ -25,4 +25,8 @@ def nav_bar():
         nav_bar[auth_tab_idx].page_link(
             page=PAGE_FILE_NAME_DICT[auth_tab],
             label=auth_tab,
-        )
\ No newline at end of file
+        )
+    
+    # Pages check the health monitor instead of waiting for the database, so the banner shows at once
+    from functions.ui.db_func_ui import show_health_banner
+    show_health_banner()
\ No newline at end of file
@@ -1,6 +1,6 @@
 import bcrypt
 from functions.utils import _read_toml
-from functions.db.mongo_connection import get_mongo_client
+from functions.db.mongo_connection import get_shared_mongo_client
 
 def _get_hashed_password(password: str) -> str:
     """
@@ -35,8 +35,10 @@ def verify_password(stored_password: bytes, provided_password: str) -> bool:
 def get_user_collection(db_name: str):
     """
     Get the users collection from MongoDB.
+    Only the user management page works on the collection itself, the other functions read and create users
+    through the storage backend so they also work with storage.backend = "sqlite".
     """
-    client = get_mongo_client()
+    client = get_shared_mongo_client()
     if client is None:
         print("Failed to connect to MongoDB.")
         return None
@@ -44,6 +46,19 @@ def get_user_collection(db_name: str):
     db = client[db_name]
     return db["users"]
 
+def _find_active_user(db_name: str, username: str) -> dict | None:
+    """
+    Get an active user from the users collection of the storage backend.
+    """
+    from functions.db.mongo_index_management import USERS_COLLECTION
+    from functions.db.storage_backend import get_storage_backend
+    backend = get_storage_backend()
+    if backend is None:
+        print("Failed to connect to the database.")
+        return None
+    users = backend.find(db_name, USERS_COLLECTION, {"username": username, "active": True}, limit=1)
+    return users[0] if users else None
+
 def store_password(password: str) -> None:
     """
     Store a hashed password in a TOML file.
@@ -104,15 +119,17 @@ def store_secondary_password(password: str) -> None:
 
 def create_admin_user(db_name: str, username: str, password: str, secondary_password: str) -> bool:
     """
-    Create an admin user in the MongoDB users collection.
+    Create an admin user in the users collection of the storage backend.
     """
-    users = get_user_collection(db_name=db_name)
-    if users is None:
-        print("Failed to connect to MongoDB.")
+    from functions.db.mongo_index_management import USERS_COLLECTION
+    from functions.db.storage_backend import get_storage_backend
+    backend = get_storage_backend()
+    if backend is None:
+        print("Failed to connect to the database.")
         return False
     
     # Check if user already exists
-    existing_user = users.find_one({"username": username})
+    existing_user = backend.count(db_name, USERS_COLLECTION, {"username": username})
     if existing_user:
         print(f"User '{username}' already exists.")
         return False
@@ -128,8 +145,8 @@ def create_admin_user(db_name: str, username: str, password: str, secondary_pass
         "active": True
     }
     
-    result = users.insert_one(user_doc)
-    if result.inserted_id:
+    inserted_id = backend.insert_one(db_name, USERS_COLLECTION, user_doc)
+    if inserted_id:
         print(f"Admin user '{username}' created successfully.")
         return True
     else:
@@ -146,26 +163,21 @@ def _get_current_datetime():
 def authenticate_user(db_name: str, username: str, password: str) -> bool:
     """
     Authenticate a user based on username and password.
-    First tries MongoDB, falls back to TOML if MongoDB authentication fails.
+    The users are read from the storage backend, MongoDB or the embedded SQLite file.
     """
-    # Try MongoDB authentication first
     try:
-        users = get_user_collection(db_name=db_name)
-        if users is None:
-            print("Failed to connect to MongoDB.")
-            return False
-        user = users.find_one({"username": username, "active": True})
+        user = _find_active_user(db_name, username)
         
         if user and user.get("password"):
             # Check if password is stored as bytes (bcrypt) or string (old SHA-256)
             stored_password = user["password"]
             
             if verify_password(stored_password, password):
-                print("User authenticated successfully via MongoDB (bcrypt).")
+                print("User authenticated successfully (bcrypt).")
                 return True
         
     except Exception as e:
-        print(f"MongoDB authentication error: {e}")
+        print(f"Authentication error: {e}")
     
     return False
 
@@ -174,11 +186,7 @@ def check_secondary_password(db_name: str, username: str, secondary_password: st
     Check if the provided secondary password matches the stored one.
     """
     try:
-        users = get_user_collection(db_name=db_name)
-        if users is None:
-            print("Failed to connect to MongoDB.")
-            return False
-        user = users.find_one({"username": username, "active": True})
+        user = _find_active_user(db_name, username)
         
         if user and user.get("secondary_password"):
             stored_secondary_password = user["secondary_password"]
@@ -195,11 +203,7 @@ def check_user_role(db_name: str, username: str, required_roles: list[str]) -> b
     Check if a user has one of the required roles.
     """
     try:
-        users = get_user_collection(db_name=db_name)
-        if users is None:
-            print("Failed to connect to MongoDB.")
-            return False
-        user = users.find_one({"username": username, "active": True})
+        user = _find_active_user(db_name, username)
         
         if user and user.get("role") in required_roles:
             return True
@@ -0,0 +1,137 @@
+from typing import Literal
+import pandas as pd
+from pymongo.errors import BulkWriteError
+from pymongo.mongo_client import MongoClient
+from pymongo.operations import InsertOne
+from functions.db.mongo_batch import DUPLICATE_TRANSACTION_MESSAGE, is_duplicate_transaction
+from functions.normalization import OWNER_FIELD, clean_up_data, normalize_dataframe
+
+IMPORT_FORMATS = ["csv", "parquet"]
+
+def read_import_chunks(file, file_format: Literal["csv", "parquet"], chunk_size: int = 1000):
+    """
+    Read a CSV or Parquet file in chunks of rows, so the whole file is never held in memory.
+    CSV values are read as strings and typed by the same normalization as the form inputs.
+
+    Yields:
+        pd.DataFrame: The rows of the chunk
+    """
+    if file_format == "csv":
+        for chunk in pd.read_csv(file, chunksize=chunk_size, dtype=str, skipinitialspace=True):
+            chunk.columns = [str(col).strip() for col in chunk.columns]
+            yield chunk
+    elif file_format == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported import format: {file_format}. Use one of {', '.join(IMPORT_FORMATS)}.")
+
+def _normalize_row(row: dict, schema: dict | None = None) -> dict:
+    """
+    Apply the same normalization as the insert forms: hidden fields, type coercion, upper-cased currencies, _rate and the fingerprint.
+    """
+    document = clean_up_data(operation_type="insert", data=dict(row), hidden_fields=True, cal_rate=True, schema=schema)
+    if not any(not key.startswith("_") for key in document):
+        raise ValueError("Row has no values.")
+    return document
+
+def _normalize_chunk(chunk: pd.DataFrame, schema: dict | None = None) -> list:
+    """
+    Normalize a whole chunk column by column. If the chunk fails, fall back to one row at a time
+    so only the offending rows are rejected.
+
+    Returns:
+        list: One document per row, or the exception that rejected the row
+    """
+    try:
+        documents = normalize_dataframe(chunk, operation_type="insert", hidden_fields=True, cal_rate=True, schema=schema)
+    except Exception:
+        documents = []
+        for row in chunk.to_dict(orient="records"):
+            try:
+                documents.append(_normalize_row(row, schema=schema))
+            except Exception as e:
+                documents.append(e)
+        return documents
+    return [
+        document if any(not key.startswith("_") for key in document) else ValueError("Row has no values.")
+        for document in documents
+    ]
+
+def _write_batch(collection, batch: list, result: dict) -> list:
+    """
+    Insert a batch of (row number, document) with one unordered bulk_write and record the rejected rows.
+
+    Returns:
+        list: The inserted documents
+    """
+    try:
+        write_result = collection.bulk_write([InsertOne(document) for _, document in batch], ordered=False)
+        result["inserted"] += write_result.inserted_count
+        return [document for _, document in batch]
+    except BulkWriteError as e:
+        result["inserted"] += e.details.get("nInserted", 0)
+        failed = {error["index"] for error in e.details.get("writeErrors", [])}
+        for error in e.details.get("writeErrors", []):
+            if is_duplicate_transaction(error):
+                result["duplicates"] += 1
+                reason = DUPLICATE_TRANSACTION_MESSAGE
+            else:
+                reason = error.get("errmsg", "Write error")
+            result["rejected"].append({"row": batch[error["index"]][0], "reason": reason})
+        return [document for index, (_, document) in enumerate(batch) if index not in failed]
+    except Exception as e:
+        for row_number, _ in batch:
+            result["rejected"].append({"row": row_number, "reason": f"Batch failed: {e}"})
+        return []
+
+def import_documents(client: MongoClient, db_name: str, collection_name: str, chunks, batch_size: int = 500, progress_callback=None, schema: dict | None = None, owner: str | None = None, actor: str | None = None) -> dict:
+    """
+    Normalize and insert rows into a collection with unordered bulk_write batches.
+
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        collection_name: The name of the collection
+        chunks: Iterable of DataFrames (or lists of row dicts), e.g. from read_import_chunks
+        batch_size: The number of documents per bulk_write
+        progress_callback: Optional function called with the result so far after each batch
+        schema: The field types of the collection from the schema registry, None to guess every type
+        owner: The username stamped as the owner of every imported document
+        actor: The username recorded in the audit log for the inserts
+
+    Returns:
+        dict: The number of rows read and inserted, the number rejected as duplicate transactions,
+              and the rejected rows with their 1-based row number and reason
+    """
+    from functions.db.mongo_audit import audit_writes
+    from functions.db.query_cache import bump_collection_version
+    collection = client[db_name][collection_name]
+    result = {"total": 0, "inserted": 0, "duplicates": 0, "rejected": []}
+    batch = []
+    try:
+        for chunk in chunks:
+            if not isinstance(chunk, pd.DataFrame):
+                chunk = pd.DataFrame(list(chunk))
+            for document in _normalize_chunk(chunk, schema=schema):
+                result["total"] += 1
+                if isinstance(document, Exception):
+                    result["rejected"].append({"row": result["total"], "reason": str(document)})
+                else:
+                    if owner:
+                        document[OWNER_FIELD] = owner
+                    batch.append((result["total"], document))
+                if len(batch) >= batch_size:
+                    audit_writes(client, db_name, collection_name, "insert", _write_batch(collection, batch, result), actor=actor)
+                    batch = []
+                    if progress_callback:
+                        progress_callback(result)
+        if batch:
+            audit_writes(client, db_name, collection_name, "insert", _write_batch(collection, batch, result), actor=actor)
+            if progress_callback:
+                progress_callback(result)
+    finally:
+        bump_collection_version(db_name, collection_name)
+    print(f"Imported {result['inserted']} of {result['total']} row(s) into '{db_name}.{collection_name}', {len(result['rejected'])} rejected.")
+    return result
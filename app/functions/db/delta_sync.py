@@ -0,0 +1,240 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+from pymongo.mongo_client import MongoClient
+
+# Deleted document ids of every collection in the database, written by the delete paths
+TOMBSTONE_COLLECTION = "_tombstones"
+WATERMARK_FIELD = "_updated_at"
+
+# Local copy of each synced collection: {(db, collection, query): state}
+_SYNC_STATES = {}
+_SYNC_STATES_LOCK = threading.Lock()
+
+def record_tombstones(client: MongoClient, db_name: str, collection_name: str, doc_ids: list) -> None:
+    """
+    Record the ids of deleted documents so that incremental loaders can drop them.
+    Tombstones are dropped by the TTL index of the registry after app.tombstone_retention_days.
+    """
+    if not doc_ids:
+        return
+    deleted_at = datetime.now()
+    client[db_name][TOMBSTONE_COLLECTION].insert_many(
+        [{"collection": collection_name, "doc_id": doc_id, "_deleted_at": deleted_at} for doc_id in doc_ids],
+        ordered=False,
+    )
+
+def _get_latest_tombstone(client: MongoClient, db_name: str, collection_name: str) -> datetime | None:
+    tombstone = client[db_name][TOMBSTONE_COLLECTION].find_one(
+        {"collection": collection_name}, sort=[("_deleted_at", -1)]
+    )
+    return tombstone["_deleted_at"] if tombstone else None
+
+def _get_watermark(data: pd.DataFrame, previous: datetime | None = None) -> datetime | None:
+    """
+    Get the latest _updated_at of the documents, keeping the previous watermark if it is later.
+    """
+    if data.empty or WATERMARK_FIELD not in data.columns:
+        return previous
+    latest = pd.to_datetime(data[WATERMARK_FIELD], errors="coerce").max()
+    if pd.isna(latest):
+        return previous
+    latest = latest.to_pydatetime()
+    return latest if previous is None or latest > previous else previous
+
+def _get_unchanged(delta: pd.DataFrame, data: pd.DataFrame) -> pd.Series:
+    """
+    Get the fetched rows the local copy already has, i.e. the rows whose _id is in the copy with the same _updated_at.
+    """
+    if data.empty or WATERMARK_FIELD not in data.columns:
+        return pd.Series(False, index=delta.index)
+    current = pd.to_datetime(delta["_id"].map(data.set_index("_id")[WATERMARK_FIELD]), errors="coerce")
+    return current == pd.to_datetime(delta[WATERMARK_FIELD], errors="coerce")
+
+def _combine_queries(*queries) -> dict:
+    queries = [query for query in queries if query]
+    if not queries:
+        return {}
+    return queries[0] if len(queries) == 1 else {"$and": queries}
+
+def _get_sync_state(key: tuple) -> dict:
+    with _SYNC_STATES_LOCK:
+        if key not in _SYNC_STATES:
+            _SYNC_STATES[key] = {"lock": threading.Lock(), "data": None, "result": None, "watermark": None, "tombstone_watermark": None, "tombstones_read_at": None, "version": None, "synced_at": None, "dirty": False, "saved_at": None, "saving": False}
+        return _SYNC_STATES[key]
+
+def reset_sync_state(db_name: str, collection_name: str) -> None:
+    """
+    Drop the local copies of a collection, so the next sync reloads it in full.
+    Used when a write may have been partially applied and its tombstones are unknown.
+    """
+    from functions.db.sync_snapshot import delete_sync_snapshots
+    with _SYNC_STATES_LOCK:
+        for key in [key for key in _SYNC_STATES if key[:2] == (db_name, collection_name)]:
+            del _SYNC_STATES[key]
+    try:
+        delete_sync_snapshots(db_name, collection_name)
+    except OSError as e:
+        print(f"Failed to delete the sync snapshots of '{db_name}.{collection_name}': {e}")
+
+def get_last_sync_result(db_name: str, collection_name: str, query: dict | None = None, projection: dict | None = None):
+    """
+    Get the result of the last sync of a collection without contacting the server, e.g. while it is unreachable.
+
+    Returns:
+        The materialized DataFrame of the last sync, or None if the collection was never synced or is empty
+    """
+    from functions.db.query_cache import freeze
+    with _SYNC_STATES_LOCK:
+        state = _SYNC_STATES.get((db_name, collection_name, freeze(query), freeze(projection)))
+    return state["result"] if state is not None else None
+
+def _get_snapshot_settings() -> dict:
+    from functions.utils import _get_setting
+    return {
+        "enabled": bool(_get_setting("app", "sync_snapshots", True)),
+        "interval": float(_get_setting("app", "sync_snapshot_interval", 60.0)),
+    }
+
+def _get_skew_window() -> timedelta:
+    from functions.utils import _get_setting
+    return timedelta(seconds=float(_get_setting("app", "sync_skew_window", 300.0)))
+
+def get_tombstone_retention() -> timedelta:
+    """
+    Get how long tombstones are kept before the TTL index drops them (app.tombstone_retention_days, default 30).
+    """
+    from functions.utils import _get_setting
+    return timedelta(days=float(_get_setting("app", "tombstone_retention_days", 30)))
+
+def _save_snapshot(key: tuple, state: dict, fields: dict) -> None:
+    from functions.db.sync_snapshot import delete_sync_snapshot, save_sync_snapshot
+    try:
+        save_sync_snapshot(key, **fields)
+        with _SYNC_STATES_LOCK:
+            dropped = _SYNC_STATES.get(key) is not state
+        if dropped:
+            # The state was reset while it was being saved, the snapshot may hold documents deleted since
+            delete_sync_snapshot(key)
+    except Exception as e:
+        print(f"Failed to save the sync snapshot of '{key[0]}.{key[1]}': {e}")
+    finally:
+        state["saving"] = False
+
+def _save_snapshot_if_due(key: tuple, state: dict, interval: float) -> None:
+    """
+    Save the local copy of a collection in the background when it changed since its last snapshot,
+    at most once every interval seconds. Called with the lock of the state held.
+    """
+    if not state["dirty"] or state["saving"] or (state["saved_at"] is not None and time.monotonic() - state["saved_at"] < interval):
+        return
+    # The DataFrame is replaced rather than changed by the syncs, so the thread can read it without the lock
+    fields = {field: state[field] for field in ("data", "watermark", "tombstone_watermark", "tombstones_read_at")}
+    state["dirty"] = False
+    state["saving"] = True
+    state["saved_at"] = time.monotonic()
+    threading.Thread(target=_save_snapshot, args=(key, state, fields), name="delta-sync-snapshot", daemon=True).start()
+
+def sync_collection(client: MongoClient, db_name: str, collection_name: str, query: dict | None = None, materialize=None, version: int | None = None, min_interval: float = 0.0, projection: dict | None = None):
+    """
+    Keep a local DataFrame of a collection up to date by fetching only the documents
+    changed since the last sync (by their _updated_at watermark) and dropping the
+    documents recorded as deleted in the tombstone collection.
+    Writers stamp _updated_at and _deleted_at with their own clocks, so the changes are re-read from
+    app.sync_skew_window seconds (default 300) before the watermarks: a change stamped by a writer whose
+    clock runs behind the others by less than the window is not missed. A copy whose tombstones were last read
+    longer ago than the tombstone retention may have missed deletes whose tombstones expired, so it is reloaded in full.
+    The first call loads the whole collection, or the snapshot saved on disk by a previous process
+    (app.sync_snapshots) and only the changes since it.
+
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        collection_name: The name of the collection
+        query: An optional query restricting the synced documents
+        materialize: Optional function applied to the merged DataFrame when it changed (e.g. casting dates)
+        version: The collection version of the query cache; the sync is skipped while it is unchanged
+                 and the last sync is more recent than min_interval seconds
+        min_interval: Minimum number of seconds between two syncs of an unchanged collection
+        projection: An optional projection of the synced fields, _id and the watermark field are always synced
+
+    Returns:
+        The materialized DataFrame of the collection, or None if it is empty
+    """
+    from functions.db.query_cache import freeze
+    from functions.db.mongo_collection_management import require_fields
+    from functions.db.sync_snapshot import load_sync_snapshot
+    key = (db_name, collection_name, freeze(query), freeze(projection))
+    state = _get_sync_state(key)
+    projection = require_fields(projection, ("_id", WATERMARK_FIELD))
+    snapshot_settings = _get_snapshot_settings()
+    skew_window = _get_skew_window()
+    retention = get_tombstone_retention()
+    with state["lock"]:
+        if state["synced_at"] is not None and version is not None and state["version"] == version and time.monotonic() - state["synced_at"] < min_interval:
+            return state["result"]
+
+        collection = client[db_name][collection_name]
+        tombstones = client[db_name][TOMBSTONE_COLLECTION]
+        changed = False
+        if state["data"] is None and snapshot_settings["enabled"]:
+            # The snapshot takes the place of the full load, the changes since its watermarks are fetched below
+            snapshot = load_sync_snapshot(key)
+            if snapshot is not None:
+                state.update(snapshot)
+                state["saved_at"] = time.monotonic()
+        if state["data"] is not None and (state["tombstones_read_at"] is None or datetime.now() - state["tombstones_read_at"] > retention - skew_window):
+            print(f"The local copy of '{db_name}.{collection_name}' is older than the tombstone retention, reloading it in full.")
+            state["data"] = None
+        if state["data"] is None:
+            # Deletes that happen during the full load are picked up by the next sync
+            state["tombstones_read_at"] = datetime.now()
+            state["tombstone_watermark"] = _get_latest_tombstone(client, db_name, collection_name)
+            state["data"] = pd.DataFrame(list(collection.find(_combine_queries(query), projection)))
+            state["watermark"] = _get_watermark(state["data"])
+            changed = True
+        else:
+            data = state["data"]
+            # The documents re-read from the window that the copy already has are skipped below, and the others
+            # (including those written in the same millisecond as the watermark) are merged by _id
+            delta_query = {WATERMARK_FIELD: {"$gte": state["watermark"] - skew_window}} if state["watermark"] is not None else {WATERMARK_FIELD: {"$exists": True}}
+            delta = pd.DataFrame(list(collection.find(_combine_queries(query, delta_query), projection)))
+            tombstone_query = {"collection": collection_name}
+            if state["tombstone_watermark"] is not None:
+                # Dropping an id twice is harmless, so tombstones are re-read from the window too
+                tombstone_query["_deleted_at"] = {"$gte": state["tombstone_watermark"] - skew_window}
+            # Both reads are done before the state changes, so a sync that fails on a connection error leaves it as it was
+            tombstones_read_at = datetime.now()
+            tombstones_found = list(tombstones.find(tombstone_query, {"doc_id": 1, "_deleted_at": 1}))
+            state["tombstones_read_at"] = tombstones_read_at
+            if not delta.empty:
+                delta = delta[~_get_unchanged(delta, data)]
+            if not delta.empty:
+                data = pd.concat([data[~data["_id"].isin(delta["_id"])], delta], ignore_index=True) if not data.empty else delta
+                state["watermark"] = _get_watermark(delta, state["watermark"])
+                changed = True
+
+            if tombstones_found:
+                tombstone_watermark = max(tombstone["_deleted_at"] for tombstone in tombstones_found)
+                if state["tombstone_watermark"] is None or tombstone_watermark > state["tombstone_watermark"]:
+                    state["tombstone_watermark"] = tombstone_watermark
+                if not data.empty:
+                    deleted = data["_id"].isin([tombstone["doc_id"] for tombstone in tombstones_found])
+                    if deleted.any():
+                        data = data[~deleted].reset_index(drop=True)
+                        changed = True
+            state["data"] = data
+
+        if changed:
+            state["dirty"] = True
+        if snapshot_settings["enabled"]:
+            _save_snapshot_if_due(key, state, snapshot_settings["interval"])
+        if changed or state["synced_at"] is None:
+            if state["data"].empty:
+                state["result"] = None
+            else:
+                state["result"] = materialize(state["data"]) if materialize else state["data"]
+        state["version"] = version
+        state["synced_at"] = time.monotonic()
+        return state["result"]
@@ -0,0 +1,68 @@
+from pymongo.mongo_client import MongoClient
+
+def _match_stage(query: dict | None) -> list:
+    return [{"$match": query}] if query else []
+
+def get_pair_summary(client: MongoClient, db_name: str, collection_name: str, query: dict | None = None) -> list:
+    """
+    Get the total amounts and the rate statistics of each currency pair, computed by the server.
+
+    Returns:
+        list: One dict per from_curr -> to_curr pair with the total amounts and the count, min, max and average rate
+    """
+    pipeline = _match_stage(query) + [
+        {"$group": {
+            "_id": {"from_curr": "$from_curr", "to_curr": "$to_curr"},
+            "total_from_amt": {"$sum": "$from_amt"},
+            "total_to_amt": {"$sum": "$to_amt"},
+            "count": {"$sum": 1},
+            "min_rate": {"$min": "$_rate"},
+            "max_rate": {"$max": "$_rate"},
+            "avg_rate": {"$avg": "$_rate"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "from_curr": "$_id.from_curr",
+            "to_curr": "$_id.to_curr",
+            "total_from_amt": 1,
+            "total_to_amt": 1,
+            "count": 1,
+            "min_rate": 1,
+            "max_rate": 1,
+            "avg_rate": 1,
+        }},
+        {"$sort": {"from_curr": 1, "to_curr": 1}},
+    ]
+    return list(client[db_name][collection_name].aggregate(pipeline))
+
+def get_monthly_weighted_rate(client: MongoClient, db_name: str, collection_name: str, query: dict | None = None) -> list:
+    """
+    Get the volume-weighted average rate of each currency pair and month, weighting each transaction's _rate
+    by its from_amt. Pairs are never averaged together, since their rates and amounts are in different currencies.
+
+    Returns:
+        list: One dict per pair and month with the currencies, year, month, traded volume (in from_curr),
+              number of transactions and weighted rate
+    """
+    pipeline = _match_stage(query) + [
+        # Only transactions with a date, a rate and an amount take part in the average
+        {"$match": {"date": {"$type": "date"}, "_rate": {"$type": "number"}, "from_amt": {"$type": "number"}}},
+        {"$group": {
+            "_id": {"from_curr": "$from_curr", "to_curr": "$to_curr", "year": {"$year": "$date"}, "month": {"$month": "$date"}},
+            "weighted_rate_sum": {"$sum": {"$multiply": ["$_rate", "$from_amt"]}},
+            "volume": {"$sum": "$from_amt"},
+            "count": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": 0,
+            "from_curr": "$_id.from_curr",
+            "to_curr": "$_id.to_curr",
+            "year": "$_id.year",
+            "month": "$_id.month",
+            "volume": 1,
+            "count": 1,
+            "weighted_rate": {"$cond": [{"$eq": ["$volume", 0]}, None, {"$divide": ["$weighted_rate_sum", "$volume"]}]},
+        }},
+        {"$sort": {"from_curr": 1, "to_curr": 1, "year": 1, "month": 1}},
+    ]
+    return list(client[db_name][collection_name].aggregate(pipeline))
@@ -0,0 +1,188 @@
+import datetime
+import glob
+import json
+import os
+import uuid
+import pandas as pd
+from pymongo.mongo_client import MongoClient
+
+# Transactions older than the cutoff are moved from the hot collection to Parquet files partitioned by month:
+# {archive_dir}/{db}/{collection}/year=YYYY/month=MM/part-*.parquet, with a manifest of the latest cutoff.
+# A file is written before its documents are deleted, so an interrupted archive run leaves duplicates
+# in the archive rather than lost documents; the reads drop the duplicates by _id.
+MANIFEST_FILE = "_manifest.json"
+DATE_FIELD = "date"
+
+def get_archive_dir() -> str:
+    from functions.utils import _get_setting
+    return _get_setting("app", "archive_dir", os.path.join("data", "archive"))
+
+def _get_collection_dir(db_name: str, collection_name: str, archive_dir: str | None = None) -> str:
+    return os.path.join(archive_dir or get_archive_dir(), db_name, collection_name)
+
+def get_archive_manifest(db_name: str, collection_name: str, archive_dir: str | None = None) -> dict | None:
+    """
+    Get the manifest of the archive of a collection: the cutoff (documents dated before it are archived),
+    the number of archived documents and the time of the last run.
+
+    Returns:
+        dict: The manifest, or None if the collection has no archive
+    """
+    path = os.path.join(_get_collection_dir(db_name, collection_name, archive_dir), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    manifest["cutoff"] = datetime.datetime.fromisoformat(manifest["cutoff"])
+    return manifest
+
+def _save_archive_manifest(collection_dir: str, cutoff: datetime.datetime, archived: int) -> None:
+    path = os.path.join(collection_dir, MANIFEST_FILE)
+    previous = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as file:
+            previous = json.load(file)
+    # A later run with an earlier cutoff does not move the cutoff back, the archive still holds the later months
+    if previous.get("cutoff") and datetime.datetime.fromisoformat(previous["cutoff"]) > cutoff:
+        cutoff = datetime.datetime.fromisoformat(previous["cutoff"])
+    manifest = {
+        "cutoff": cutoff.isoformat(),
+        "archived": previous.get("archived", 0) + archived,
+        "last_run": datetime.datetime.now().isoformat(),
+    }
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temp_path, path)
+
+def _write_partition(collection_dir: str, year: int, month: int, documents: list) -> str:
+    """
+    Write the documents of one month to a new Parquet file of its partition, atomically.
+    """
+    import pyarrow.parquet as pq
+    from functions.db.mongo_export import documents_to_table
+    partition_dir = os.path.join(collection_dir, f"year={year:04d}", f"month={month:02d}")
+    os.makedirs(partition_dir, exist_ok=True)
+    path = os.path.join(partition_dir, f"part-{datetime.datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+    table = documents_to_table(documents)
+    temp_path = f"{path}.tmp"
+    pq.write_table(table, temp_path)
+    os.replace(temp_path, path)
+    return path
+
+def archive_collection(client: MongoClient, db_name: str, collection_name: str, cutoff: datetime.datetime, batch_size: int = 5000, archive_dir: str | None = None, progress_callback=None) -> dict:
+    """
+    Move the documents dated before the cutoff from a collection to the Parquet archive.
+    Each batch is written to the archive first and then deleted from the collection, with tombstones
+    so that local copies kept by the delta sync drop the archived documents.
+
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        collection_name: The name of the collection
+        cutoff: Documents whose date is before the cutoff are archived
+        batch_size: The number of documents per batch
+        archive_dir: The root directory of the archive, defaults to app.archive_dir
+        progress_callback: Optional function called with the number of archived documents after each batch
+
+    Returns:
+        dict: The number of archived documents ("archived"), the written files ("files") and the cutoff
+    """
+    from functions.db.delta_sync import record_tombstones
+    from functions.db.mongo_audit import audit_writes
+    from functions.db.query_cache import bump_collection_version
+    collection = client[db_name][collection_name]
+    collection_dir = _get_collection_dir(db_name, collection_name, archive_dir)
+    result = {"archived": 0, "files": [], "cutoff": cutoff}
+    while True:
+        # Archived documents are deleted, so each batch starts again from the oldest remaining one
+        batch = list(collection.find({DATE_FIELD: {"$lt": cutoff}}).sort([(DATE_FIELD, 1), ("_id", 1)]).limit(batch_size))
+        if not batch:
+            break
+        partitions = {}
+        for document in batch:
+            partitions.setdefault((document[DATE_FIELD].year, document[DATE_FIELD].month), []).append(document)
+        for (year, month), documents in partitions.items():
+            result["files"].append(_write_partition(collection_dir, year, month, documents))
+        doc_ids = [document["_id"] for document in batch]
+        collection.delete_many({"_id": {"$in": doc_ids}})
+        record_tombstones(client, db_name, collection_name, doc_ids)
+        audit_writes(client, db_name, collection_name, "delete", doc_ids, actor="archive")
+        result["archived"] += len(batch)
+        if progress_callback:
+            progress_callback(result["archived"])
+        if len(batch) < batch_size:
+            break
+    if result["archived"]:
+        _save_archive_manifest(collection_dir, cutoff, result["archived"])
+        bump_collection_version(db_name, collection_name)
+    print(f"Archived {result['archived']} document(s) of '{db_name}.{collection_name}' dated before {cutoff:%Y-%m-%d} in {len(result['files'])} file(s).")
+    return result
+
+def _get_partition_files(collection_dir: str, start: datetime.datetime | None, end: datetime.datetime | None) -> list:
+    """
+    Get the files of the monthly partitions that overlap [start, end), without opening the other ones.
+    """
+    files = []
+    for partition_dir in sorted(glob.glob(os.path.join(collection_dir, "year=*", "month=*"))):
+        month_dir, year_dir = os.path.basename(partition_dir), os.path.basename(os.path.dirname(partition_dir))
+        month_start = datetime.datetime(int(year_dir.split("=")[1]), int(month_dir.split("=")[1]), 1)
+        month_end = datetime.datetime(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+        if (start is None or month_end > start) and (end is None or month_start < end):
+            files.extend(sorted(glob.glob(os.path.join(partition_dir, "*.parquet"))))
+    return files
+
+def read_archive(db_name: str, collection_name: str, start: datetime.datetime | None = None, end: datetime.datetime | None = None, projection: dict | None = None, archive_dir: str | None = None, match: dict | None = None) -> pd.DataFrame | None:
+    """
+    Read the archived documents of a collection dated in [start, end), opening only the partitions of those months.
+
+    Args:
+        db_name: The name of the database
+        collection_name: The name of the collection
+        start: The earliest date, None for the beginning of the archive
+        end: The date after the last one, None for the end of the archive
+        projection: An optional inclusion or exclusion projection, _id is always returned
+        archive_dir: The root directory of the archive, defaults to app.archive_dir
+        match: Optional field values the documents must have, e.g. {"_owner": username}
+
+    Returns:
+        pd.DataFrame: The archived documents, or None if none are in the range
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    files = _get_partition_files(_get_collection_dir(db_name, collection_name, archive_dir), start, end)
+    if not files:
+        return None
+    # Files of different runs can have different fields, the missing ones are null, and a month of whole amounts
+    # has integer columns where another has floats, which are promoted to floats. The files are read without
+    # partitioning, so the year=/month= directories do not add columns.
+    table = pa.concat_tables([pq.ParquetFile(path).read() for path in files], promote_options="permissive")
+    if start is not None:
+        table = table.filter(pc.greater_equal(table[DATE_FIELD], pa.scalar(start, type=table[DATE_FIELD].type)))
+    if end is not None:
+        table = table.filter(pc.less(table[DATE_FIELD], pa.scalar(end, type=table[DATE_FIELD].type)))
+    for field, value in (match or {}).items():
+        if field not in table.column_names or pa.types.is_null(table[field].type):
+            # Documents archived without the field cannot match
+            return None
+        table = table.filter(pc.equal(table[field], pa.scalar(value, type=table[field].type)))
+    if projection:
+        inclusion = any(value for field, value in projection.items() if field != "_id")
+        columns = [
+            column for column in table.column_names
+            if column == "_id" or (projection.get(column) if inclusion else column not in projection)
+        ]
+        table = table.select(columns)
+    if table.num_rows == 0:
+        return None
+    data = table.to_pandas()
+    # Documents archived twice by an interrupted run are kept once
+    return data.drop_duplicates(subset="_id", keep="last").reset_index(drop=True)
+
+def reaches_archive(db_name: str, collection_name: str, start: datetime.datetime | None, archive_dir: str | None = None) -> bool:
+    """
+    Check whether a date range starting at start includes archived documents.
+    """
+    manifest = get_archive_manifest(db_name, collection_name, archive_dir)
+    return manifest is not None and (start is None or start < manifest["cutoff"])
@@ -0,0 +1,161 @@
+from typing import Iterable
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pymongo.mongo_client import MongoClient
+
+# Arrow types of the field types of the schema registry. Date and Datetime values are decoded as
+# timestamps first, BSON datetimes have millisecond precision.
+ARROW_TYPES = {
+    "String": pa.string(),
+    "Integer": pa.int64(),
+    "Float": pa.float64(),
+    "Boolean": pa.bool_(),
+    "Date": pa.timestamp("ms"),
+    "Datetime": pa.timestamp("ms"),
+}
+_TICKS_PER_DAY = {"s": 86_400, "ms": 86_400_000, "us": 86_400_000_000, "ns": 86_400_000_000_000}
+
+def decode_columns(documents: Iterable[dict]) -> tuple[dict, int]:
+    """
+    Decode documents into one list of values per field, in the order the fields are first seen.
+    Documents are consumed one at a time, so a cursor is never held in memory as a list of dicts.
+
+    Returns:
+        tuple: The values keyed by field, with None where a document has no such field, and the number of documents
+    """
+    columns = {}
+    n_rows = 0
+    for document in documents:
+        for field, value in document.items():
+            column = columns.get(field)
+            if column is None:
+                # A field first seen in a later document is missing from the earlier ones
+                column = columns[field] = [None] * n_rows
+            column.append(value)
+        n_rows += 1
+        if len(document) < len(columns):
+            for column in columns.values():
+                if len(column) < n_rows:
+                    column.append(None)
+    return columns, n_rows
+
+def _can_cast(from_type: pa.DataType, to_type: pa.DataType) -> bool:
+    """
+    Check whether values typed from the data may be cast to a registered type: nulls to any type,
+    numbers to numbers and timestamps to timestamps. Strings are never parsed and numbers never formatted.
+    """
+    if pa.types.is_null(from_type):
+        return True
+    if pa.types.is_integer(from_type) or pa.types.is_floating(from_type):
+        return pa.types.is_integer(to_type) or pa.types.is_floating(to_type)
+    return (pa.types.is_timestamp(from_type) and pa.types.is_timestamp(to_type))
+
+def _to_arrow_array(values: list, field_type: str | None) -> pa.Array | None:
+    """
+    Build a typed Arrow array of a column, using the registered field type when there is one.
+    The values are typed first and only cast to the registered type when no value changes, so floats
+    under an Integer schema keep their fractions. Returns None for columns Arrow cannot hold as a flat
+    column (ObjectId, mixed types, documents, arrays), which are kept as Python objects.
+    """
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, OverflowError):
+        return None
+    if pa.types.is_nested(array.type):
+        return None
+    arrow_type = ARROW_TYPES.get(field_type)
+    if arrow_type is not None and array.type != arrow_type and _can_cast(array.type, arrow_type):
+        try:
+            return array.cast(arrow_type, safe=True)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass  # Values that do not fit the schema keep the type of the values
+    return array
+
+def _is_date_only(array: pa.Array) -> bool:
+    """
+    Check whether every value of a timestamp array is at midnight, without formatting the values.
+    """
+    # Compared in the unit of the array: MongoDB dates are in ms, the embedded backend keeps microseconds
+    ticks, ticks_per_day = pc.cast(array, pa.int64()), _TICKS_PER_DAY[array.type.unit]
+    at_midnight = pc.equal(pc.subtract(ticks, pc.multiply(pc.divide(ticks, ticks_per_day), ticks_per_day)), 0)
+    return array.null_count < len(array) and pc.all(at_midnight).as_py()
+
+def _cast_dates(array: pa.Array, field_type: str | None) -> pa.Array:
+    """
+    Cast a timestamp array to dates when the field is registered as Date, or when it is not
+    registered and every value is at midnight.
+    """
+    if not pa.types.is_timestamp(array.type) or field_type == "Datetime":
+        return array
+    if field_type == "Date" or (field_type is None and _is_date_only(array)):
+        return pc.cast(array, pa.date32(), safe=False)
+    return array
+
+def columns_to_dataframe(columns: dict, n_rows: int, schema: dict | None = None, arrow_backed: bool = False) -> pd.DataFrame:
+    """
+    Build a DataFrame from decoded columns. Each column is converted to a typed Arrow array once,
+    and date-only timestamp columns are cast to dates with vectorized arithmetic.
+
+    Args:
+        columns: The values keyed by field, from decode_columns
+        n_rows: The number of documents
+        schema: The field types of the collection from the schema registry
+        arrow_backed: Keep the columns in Arrow memory (pd.ArrowDtype) instead of converting them to NumPy,
+            for read-only views. Columns Arrow cannot hold are object columns either way.
+
+    Returns:
+        pd.DataFrame: The documents with one column per field
+    """
+    arrays, object_columns = {}, {}
+    for field, values in columns.items():
+        field_type = (schema or {}).get(field)
+        array = _to_arrow_array(values, field_type)
+        if array is None:
+            object_columns[field] = values
+        else:
+            arrays[field] = _cast_dates(array, field_type)
+
+    if arrays:
+        table = pa.table(arrays)
+        data = table.to_pandas(types_mapper=pd.ArrowDtype) if arrow_backed else table.to_pandas()
+    else:
+        data = pd.DataFrame(index=pd.RangeIndex(n_rows))
+    for field, values in object_columns.items():
+        data[field] = pd.Series(values, index=data.index, dtype=object)
+    return data[list(columns)]
+
+def documents_to_dataframe(documents: Iterable[dict], schema: dict | None = None, arrow_backed: bool = False) -> pd.DataFrame | None:
+    """
+    Decode documents column by column into a DataFrame, see columns_to_dataframe.
+
+    Returns:
+        pd.DataFrame: The documents, or None if there are none
+    """
+    columns, n_rows = decode_columns(documents)
+    if n_rows == 0:
+        return None
+    return columns_to_dataframe(columns, n_rows, schema=schema, arrow_backed=arrow_backed)
+
+def get_collection_frame(client: MongoClient, db_name: str, collection_name: str, query: dict | None = None, schema: dict | None = None, arrow_backed: bool = False, batch_size: int = 1000, projection: dict | None = None) -> pd.DataFrame | None:
+    """
+    Read a collection straight from the cursor into columns, without building a list of documents first.
+
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        collection_name: The name of the collection
+        query: An optional query to filter the documents
+        schema: The field types of the collection from the schema registry
+        arrow_backed: Return an Arrow-backed DataFrame for read-only views
+        batch_size: The number of documents per cursor batch
+        projection: An optional projection, so only the fields that are used are sent and decoded
+
+    Returns:
+        pd.DataFrame: The documents of the collection, or None if there are none
+    """
+    cursor = client[db_name][collection_name].find(query or {}, projection).batch_size(batch_size)
+    try:
+        return documents_to_dataframe(cursor, schema=schema, arrow_backed=arrow_backed)
+    finally:
+        cursor.close()
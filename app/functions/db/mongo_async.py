@@ -0,0 +1,123 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.collection import Collection
+from pymongo.mongo_client import MongoClient
+from functions.db.mongo_crud import insert_data, fetch_data, update_data, delete_data
+from functions.db.mongo_collection_management import get_all_databases, get_all_collections, get_cached_databases, get_cached_collections, get_collection_data, get_collection_page
+
+# pymongo is blocking, so the coroutines below run the synchronous functions on a shared thread pool.
+# The shared MongoClient is thread-safe and its connection pool serves the concurrent reads.
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool used by the async data-access functions, creating it on first use.
+    """
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            from functions.utils import _get_setting
+            max_workers = int(_get_setting("mongo", "async_workers", 8))
+            _EXECUTOR = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mongo-async")
+    return _EXECUTOR
+
+async def run_in_thread(func, *args, **kwargs):
+    """
+    Run a blocking function on the thread pool and await its result.
+    """
+    loop = asyncio.get_running_loop()
+    # The context is copied like asyncio.to_thread does, so context variables (e.g. the query action label) follow the call
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+async def gather_reads(*coroutines) -> list:
+    """
+    Await independent reads together, so the total latency is that of the slowest one.
+    """
+    return list(await asyncio.gather(*coroutines))
+
+def run_concurrently(*coroutines) -> list:
+    """
+    Run independent reads concurrently from synchronous code (e.g. a Streamlit script) and wait for all of them.
+
+    Returns:
+        list: The results in the same order as the coroutines
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(gather_reads(*coroutines))
+    raise RuntimeError("run_concurrently cannot be called from a running event loop, await gather_reads instead.")
+
+async def insert_data_async(collection: Collection, data: dict):
+    """
+    Insert data into the specified collection.
+    """
+    return await run_in_thread(insert_data, collection, data)
+
+async def fetch_data_async(collection: Collection, query: dict, projection: dict | None = None) -> list:
+    """
+    Fetch data from the specified collection based on the query.
+    """
+    return await run_in_thread(fetch_data, collection, query, projection)
+
+async def update_data_async(collection: Collection, query: dict, new_values: dict):
+    """
+    Update data in the specified collection based on the query.
+    """
+    return await run_in_thread(update_data, collection, query, new_values)
+
+async def delete_data_async(collection: Collection, query: dict):
+    """
+    Delete data from the specified collection based on the query.
+    """
+    return await run_in_thread(delete_data, collection, query)
+
+async def get_all_databases_async(client: MongoClient) -> list:
+    """
+    Get a list of all databases in the MongoDB server.
+    """
+    return await run_in_thread(get_all_databases, client)
+
+async def get_all_collections_async(client: MongoClient, db_name: str) -> list:
+    """
+    Get a list of all collections in the specified database.
+    """
+    return await run_in_thread(get_all_collections, client, db_name)
+
+async def get_cached_databases_async(client: MongoClient) -> list:
+    """
+    Get a list of all databases from the catalog cache, fetching them on a miss.
+    """
+    return await run_in_thread(get_cached_databases, client)
+
+async def get_cached_collections_async(client: MongoClient, db_name: str) -> list:
+    """
+    Get a list of all collections in the specified database from the catalog cache, fetching them on a miss.
+    """
+    return await run_in_thread(get_cached_collections, client, db_name)
+
+async def get_collection_data_async(client: MongoClient, db_name: str, collection_name: str, projection: dict | None = None) -> list:
+    """
+    Get all data from the specified collection.
+    """
+    return await run_in_thread(get_collection_data, client, db_name, collection_name, projection)
+
+async def get_collection_page_async(client: MongoClient, db_name: str, collection_name: str, page_size: int = 50, after: dict | None = None, sort_field: str = "date", query: dict | None = None, projection: dict | None = None) -> tuple[list, dict | None]:
+    """
+    Get one page of data from the specified collection, see get_collection_page.
+    """
+    return await run_in_thread(get_collection_page, client, db_name, collection_name, page_size=page_size, after=after, sort_field=sort_field, query=query, projection=projection)
+
+async def get_document_count_async(client: MongoClient, db_name: str, collection_name: str, query: dict | None = None) -> int:
+    """
+    Get the estimated number of documents in the specified collection from its metadata,
+    or the number of documents matching a query.
+    """
+    if query:
+        return await run_in_thread(client[db_name][collection_name].count_documents, query)
+    return await run_in_thread(client[db_name][collection_name].estimated_document_count)
@@ -0,0 +1,224 @@
+import atexit
+import datetime
+import itertools
+import threading
+from typing import Literal
+from pymongo import DESCENDING
+from pymongo.mongo_client import MongoClient
+
+# Append-only history of the writes of every collection in the database:
+# {collection, doc_id, operation, changes, actor, _at, seq}, where changes are the inserted document without its _id,
+# the fields set by an update, or None for a delete. Records are buffered in the process and written in batches
+# by a background flusher, so a write only pays for appending to a list.
+AUDIT_COLLECTION = "_audit_log"
+# Full copies of a collection taken periodically: {collection, taken_at, doc}, with one record with doc None per
+# snapshot so that a snapshot of an empty collection is found too. The state at a time is rebuilt from the latest
+# snapshot before it and the audit records since that snapshot.
+SNAPSHOT_COLLECTION = "_audit_snapshots"
+AUDIT_OPERATIONS = ("insert", "update", "delete")
+
+_BUFFER = []
+_BUFFER_LOCK = threading.Lock()
+_FLUSH_LOCK = threading.Lock()
+_FLUSH_REQUESTED = threading.Event()
+_FLUSHER = None
+# Orders the records of the same millisecond, in the order they were appended
+_SEQUENCE = itertools.count()
+
+def _get_audit_settings() -> dict:
+    from functions.utils import _get_setting
+    return {
+        "flush_interval": float(_get_setting("app", "audit_flush_interval", 1.0)),
+        "batch_size": int(_get_setting("app", "audit_batch_size", 500)),
+        "max_buffer": int(_get_setting("app", "audit_max_buffer", 100000)),
+        "snapshot_keep": int(_get_setting("app", "audit_snapshot_keep", 7)),
+    }
+
+def _start_flusher(settings: dict) -> None:
+    global _FLUSHER
+    if _FLUSHER is None or not _FLUSHER.is_alive():
+        if _FLUSHER is None:
+            # Buffered records are written before the process exits
+            atexit.register(flush_audit_log)
+        _FLUSHER = threading.Thread(target=_run_flusher, args=(settings["flush_interval"],), name="mongo-audit-flusher", daemon=True)
+        _FLUSHER.start()
+
+def _run_flusher(flush_interval: float) -> None:
+    while True:
+        _FLUSH_REQUESTED.wait(flush_interval)
+        _FLUSH_REQUESTED.clear()
+        flush_audit_log()
+
+def audit_writes(client: MongoClient, db_name: str, collection_name: str, operation: Literal["insert", "update", "delete"], records, actor: str | None = None) -> None:
+    """
+    Append the writes to the audit log buffer. Only called after the writes succeeded.
+
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        collection_name: The name of the collection
+        operation: The type of the writes ("insert", "update" or "delete")
+        records: The inserted documents, a dict mapping the updated _ids to their changed fields, or the deleted _ids
+        actor: The username of the user that made the writes
+    """
+    if operation not in AUDIT_OPERATIONS:
+        raise ValueError(f"Unsupported operation type: {operation}")
+    if not records:
+        return
+    now = datetime.datetime.now()
+    if operation == "insert":
+        entries = [(document["_id"], {field: value for field, value in document.items() if field != "_id"}) for document in records]
+    elif operation == "update":
+        entries = [(doc_id, dict(changes)) for doc_id, changes in records.items()]
+    else:
+        entries = [(doc_id, None) for doc_id in records]
+    settings = _get_audit_settings()
+    with _BUFFER_LOCK:
+        for doc_id, changes in entries:
+            _BUFFER.append((client, db_name, {
+                "collection": collection_name, "doc_id": doc_id, "operation": operation,
+                "changes": changes, "actor": actor, "_at": now, "seq": next(_SEQUENCE),
+            }))
+        overflow = len(_BUFFER) - settings["max_buffer"]
+        if overflow > 0:
+            # The database has been unreachable for a long time, the oldest records are dropped
+            del _BUFFER[:overflow]
+            print(f"Audit log buffer is full, {overflow} record(s) dropped.")
+        full = len(_BUFFER) >= settings["batch_size"]
+    _start_flusher(settings)
+    if full:
+        _FLUSH_REQUESTED.set()
+
+def flush_audit_log() -> int:
+    """
+    Write the buffered audit records, one insert_many per database.
+    Records of a database that cannot be written are put back in the buffer for the next flush.
+
+    Returns:
+        int: The number of records written
+    """
+    with _FLUSH_LOCK:
+        with _BUFFER_LOCK:
+            pending = list(_BUFFER)
+            _BUFFER.clear()
+        if not pending:
+            return 0
+        groups = {}
+        for client, db_name, record in pending:
+            groups.setdefault((id(client), db_name), (client, db_name, []))[2].append(record)
+        written = 0
+        failed = []
+        for client, db_name, records in groups.values():
+            try:
+                client[db_name][AUDIT_COLLECTION].insert_many(records, ordered=False)
+                written += len(records)
+            except Exception as e:
+                print(f"Failed to write {len(records)} audit record(s) to '{db_name}': {e}")
+                failed.extend((client, db_name, record) for record in records)
+        if failed:
+            with _BUFFER_LOCK:
+                _BUFFER[:0] = failed
+        return written
+
+def get_audit_records(client: MongoClient, db_name: str, collection_name: str, doc_id=None, limit: int = 100) -> list:
+    """
+    Get the latest audit records of a collection, or of one of its documents, newest first.
+    """
+    flush_audit_log()
+    query = {"collection": collection_name}
+    if doc_id is not None:
+        query["doc_id"] = doc_id
+    return list(client[db_name][AUDIT_COLLECTION].find(query, {"_id": 0}).sort([("_at", DESCENDING), ("seq", DESCENDING)]).limit(limit))
+
+def get_latest_snapshot_time(client: MongoClient, db_name: str, collection_name: str, before: datetime.datetime | None = None) -> datetime.datetime | None:
+    """
+    Get the time of the latest snapshot of a collection, optionally taken at or before a time.
+    """
+    query = {"collection": collection_name, "doc": None}
+    if before is not None:
+        query["taken_at"] = {"$lte": before}
+    snapshot = client[db_name][SNAPSHOT_COLLECTION].find_one(query, {"taken_at": 1}, sort=[("taken_at", DESCENDING)])
+    return snapshot["taken_at"] if snapshot else None
+
+def take_audit_snapshot(client: MongoClient, db_name: str, collection_name: str, batch_size: int = 1000) -> dict:
+    """
+    Copy the current documents of a collection to the snapshot collection and drop the oldest snapshots
+    beyond app.audit_snapshot_keep.
+
+    Returns:
+        dict: The time of the snapshot ("taken_at") and the number of copied documents ("documents")
+    """
+    # The time is taken before the read, so writes made during the read are replayed on top of the snapshot,
+    # which is harmless since replaying an insert, update or delete twice gives the same document
+    taken_at = datetime.datetime.now()
+    snapshots = client[db_name][SNAPSHOT_COLLECTION]
+    snapshots.insert_one({"collection": collection_name, "taken_at": taken_at, "doc": None})
+    count = 0
+    batch = []
+    for document in client[db_name][collection_name].find({}):
+        batch.append({"collection": collection_name, "taken_at": taken_at, "doc": document})
+        if len(batch) >= batch_size:
+            snapshots.insert_many(batch, ordered=False)
+            count += len(batch)
+            batch = []
+    if batch:
+        snapshots.insert_many(batch, ordered=False)
+        count += len(batch)
+    kept = [
+        snapshot["taken_at"] for snapshot in
+        snapshots.find({"collection": collection_name, "doc": None}, {"taken_at": 1}).sort("taken_at", DESCENDING).limit(_get_audit_settings()["snapshot_keep"])
+    ]
+    if kept:
+        snapshots.delete_many({"collection": collection_name, "taken_at": {"$lt": kept[-1]}})
+    print(f"Snapshot of {count} document(s) of '{db_name}.{collection_name}' taken at {taken_at:%Y-%m-%d %H:%M:%S}.")
+    return {"taken_at": taken_at, "documents": count}
+
+def take_snapshot_if_due(client: MongoClient, db_name: str, collection_name: str, min_interval: float) -> dict | None:
+    """
+    Take a snapshot of a collection unless its latest snapshot is more recent than min_interval seconds.
+
+    Returns:
+        dict: The snapshot from take_audit_snapshot, or None if it was skipped
+    """
+    latest = get_latest_snapshot_time(client, db_name, collection_name)
+    if latest is not None and (datetime.datetime.now() - latest).total_seconds() < min_interval:
+        return None
+    return take_audit_snapshot(client, db_name, collection_name)
+
+def get_collection_at(client: MongoClient, db_name: str, collection_name: str, at: datetime.datetime) -> dict:
+    """
+    Rebuild the documents of a collection as they were at a time, from the latest snapshot taken
+    at or before that time and the audit records since the snapshot.
+    Without a snapshot the whole audit log is replayed, so documents written before auditing started are missing.
+
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        collection_name: The name of the collection
+        at: The time to rebuild the collection at
+
+    Returns:
+        dict: The documents ("documents"), the time of the snapshot used ("snapshot_at", None if none)
+              and the number of replayed audit records ("replayed")
+    """
+    flush_audit_log()
+    snapshot_at = get_latest_snapshot_time(client, db_name, collection_name, before=at)
+    documents = {}
+    if snapshot_at is not None:
+        for snapshot in client[db_name][SNAPSHOT_COLLECTION].find({"collection": collection_name, "taken_at": snapshot_at, "doc": {"$ne": None}}, {"doc": 1}):
+            documents[snapshot["doc"]["_id"]] = snapshot["doc"]
+    log_query = {"collection": collection_name, "_at": {"$lte": at}}
+    if snapshot_at is not None:
+        log_query["_at"]["$gte"] = snapshot_at
+    replayed = 0
+    for record in client[db_name][AUDIT_COLLECTION].find(log_query).sort([("_at", 1), ("seq", 1)]):
+        replayed += 1
+        doc_id = record["doc_id"]
+        if record["operation"] == "insert":
+            documents[doc_id] = {"_id": doc_id, **record["changes"]}
+        elif record["operation"] == "update":
+            if doc_id in documents:
+                documents[doc_id].update(record["changes"])
+        elif record["operation"] == "delete":
+            documents.pop(doc_id, None)
+    return {"documents": list(documents.values()), "snapshot_at": snapshot_at, "replayed": replayed}
@@ -0,0 +1,207 @@
+import time
+from typing import Literal
+from pymongo.errors import BulkWriteError, ConnectionFailure
+from pymongo.mongo_client import MongoClient
+from pymongo.operations import InsertOne, UpdateMany, UpdateOne
+from functions.db.query_cache import freeze
+from functions.normalization import FINGERPRINT_FIELD
+
+DUPLICATE_KEY_ERROR = 11000
+DUPLICATE_TRANSACTION_MESSAGE = "Duplicate of an existing transaction"
+# Network errors, elections and server selection timeouts; the write may or may not have been applied
+TRANSIENT_ERRORS = (ConnectionFailure,)
+
+def _get_batch_settings() -> tuple[int, int, float]:
+    from functions.utils import _get_setting
+    return (
+        int(_get_setting("mongo", "batch_chunk_size", 1000)),
+        int(_get_setting("mongo", "batch_max_retries", 3)),
+        float(_get_setting("mongo", "batch_retry_backoff", 0.5)),
+    )
+
+def _chunks(items: list, chunk_size: int):
+    for start in range(0, len(items), chunk_size):
+        yield items[start:start + chunk_size]
+
+def _group_updates(updates: dict) -> list:
+    """
+    Group documents that get the same changes, ignoring their _updated_at stamps.
+
+    Returns:
+        list: (ids, changes) pairs, in the order the changes are first seen
+    """
+    groups = {}
+    for doc_id, changes in updates.items():
+        key = freeze({field: value for field, value in changes.items() if field != "_updated_at"})
+        if key not in groups:
+            groups[key] = ([], dict(changes))
+        ids, group_changes = groups[key]
+        ids.append(doc_id)
+        # The group is stamped with the latest _updated_at of its documents
+        if "_updated_at" in changes and changes["_updated_at"] > group_changes.get("_updated_at", changes["_updated_at"]):
+            group_changes["_updated_at"] = changes["_updated_at"]
+    return list(groups.values())
+
+def _with_retries(write, result: dict, max_retries: int, backoff: float):
+    """
+    Call write(attempt) and retry it with exponential backoff while it fails with a transient error.
+    """
+    attempt = 0
+    while True:
+        try:
+            return write(attempt)
+        except TRANSIENT_ERRORS as e:
+            if attempt >= max_retries:
+                raise
+            print(f"Transient error, retrying in {backoff * 2 ** attempt:.1f}s: {e}")
+            time.sleep(backoff * 2 ** attempt)
+            attempt += 1
+            result["retries"] += 1
+
+def is_duplicate_transaction(error: dict) -> bool:
+    """
+    Check whether a write error (or the details of a DuplicateKeyError) was raised by the fingerprint index,
+    i.e. the document repeats a transaction of the same owner, rather than by a duplicate _id.
+    """
+    if error.get("code") != DUPLICATE_KEY_ERROR:
+        return False
+    return FINGERPRINT_FIELD in (error.get("keyPattern") or {}) or FINGERPRINT_FIELD in str(error.get("errmsg", ""))
+
+def _add_failures(result: dict, targets: list, error: Exception | str, code=None) -> None:
+    for target in targets:
+        result["failures"].append({"target": target, "code": code, "error": str(error)})
+
+def _insert_chunk(collection, documents: list, result: dict, max_retries: int, backoff: float) -> None:
+    def write(attempt):
+        try:
+            return collection.bulk_write([InsertOne(document) for document in documents], ordered=False).inserted_count, []
+        except BulkWriteError as e:
+            write_errors = []
+            inserted = e.details.get("nInserted", 0)
+            for error in e.details.get("writeErrors", []):
+                if attempt > 0 and error.get("code") == DUPLICATE_KEY_ERROR and not is_duplicate_transaction(error):
+                    # The document was inserted by an attempt whose acknowledgement was lost
+                    inserted += 1
+                else:
+                    write_errors.append(error)
+            return inserted, write_errors
+
+    inserted, write_errors = _with_retries(write, result, max_retries, backoff)
+    result["success"] += inserted
+    for error in write_errors:
+        document = documents[error["index"]]
+        if is_duplicate_transaction(error):
+            result["duplicates"] += 1
+            message = DUPLICATE_TRANSACTION_MESSAGE
+        else:
+            message = error.get("errmsg", "Write error")
+        result["failures"].append({"target": document.get("_id", error["index"]), "code": error.get("code"), "error": message})
+
+def _update_chunk(collection, groups: list, result: dict, max_retries: int, backoff: float) -> None:
+    operations = [
+        UpdateOne({"_id": ids[0]}, {"$set": changes}) if len(ids) == 1 else UpdateMany({"_id": {"$in": ids}}, {"$set": changes})
+        for ids, changes in groups
+    ]
+
+    def write(attempt):
+        # $set is idempotent, so a retried chunk does not change the result
+        try:
+            write_result = collection.bulk_write(operations, ordered=False)
+            return write_result.matched_count, write_result.modified_count, []
+        except BulkWriteError as e:
+            return e.details.get("nMatched", 0), e.details.get("nModified", 0), e.details.get("writeErrors", [])
+
+    matched, modified, write_errors = _with_retries(write, result, max_retries, backoff)
+    result["success"] += matched
+    result["modified"] += modified
+    for error in write_errors:
+        if is_duplicate_transaction(error):
+            result["duplicates"] += len(groups[error["index"]][0])
+            _add_failures(result, groups[error["index"]][0], DUPLICATE_TRANSACTION_MESSAGE, error.get("code"))
+        else:
+            _add_failures(result, groups[error["index"]][0], error.get("errmsg", "Write error"), error.get("code"))
+
+def _delete_chunk(collection, doc_ids: list, result: dict, max_retries: int, backoff: float) -> None:
+    # The _ids that exist are read first, so only the deleted documents are audited and tombstoned
+    existing_ids = _with_retries(lambda attempt: [document["_id"] for document in collection.find({"_id": {"$in": doc_ids}}, {"_id": 1})], result, max_retries, backoff)
+    if not existing_ids:
+        return
+    # Deleting by _id is idempotent, so a retried chunk does not change the result
+    delete_result = _with_retries(lambda attempt: collection.delete_many({"_id": {"$in": existing_ids}}), result, max_retries, backoff)
+    result["success"] += delete_result.deleted_count
+    result["deleted_ids"].extend(existing_ids)
+
+def execute_batch(client: MongoClient, db_name: str, collection_name: str, operation_type: Literal["insert", "update", "delete"], operations_data, chunk_size: int | None = None, max_retries: int | None = None, backoff: float | None = None) -> dict:
+    """
+    Execute a batch of inserts, updates or deletes in chunks of unordered writes.
+    Updates with the same changes become one update_many, and deletes become one delete_many per chunk.
+    Transient errors are retried with exponential backoff; on a retried insert, a duplicate _id
+    means the document was already written by the previous attempt. Documents that repeat a transaction
+    of the same owner are rejected by the fingerprint index and counted as duplicates.
+
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        collection_name: The name of the collection
+        operation_type: The type of operation ("insert", "update" or "delete")
+        operations_data: The documents to insert, a dict mapping _ids to the changed fields, or the _ids to delete
+        chunk_size: The maximum number of documents per write, defaults to mongo.batch_chunk_size
+        max_retries: The number of retries of a chunk, defaults to mongo.batch_max_retries
+        backoff: The delay before the first retry in seconds, doubled on each retry, defaults to mongo.batch_retry_backoff
+
+    Returns:
+        dict: The operation type, the number of documents requested ("total"), written ("success", i.e. inserted,
+        matched or deleted), modified (updates), failed ("errors"), rejected as duplicate transactions ("duplicates", also counted
+        in the errors) and not found ("not_found"), the failed documents
+        with their error ("failures"), the _ids of the deleted documents ("deleted_ids"), and the number of chunks and retries
+    """
+    default_chunk_size, default_max_retries, default_backoff = _get_batch_settings()
+    chunk_size = chunk_size or default_chunk_size
+    max_retries = default_max_retries if max_retries is None else max_retries
+    backoff = default_backoff if backoff is None else backoff
+
+    collection = client[db_name][collection_name]
+    result = {
+        "operation": operation_type, "total": len(operations_data), "success": 0, "modified": 0, "errors": 0,
+        "not_found": 0, "duplicates": 0, "failures": [], "deleted_ids": [], "chunks": 0, "retries": 0,
+    }
+    if operation_type == "insert":
+        chunks = list(_chunks(list(operations_data), chunk_size))
+        write_chunk = _insert_chunk
+    elif operation_type == "update":
+        # Groups are packed into chunks of at most chunk_size _ids, a large group is split into several update_many
+        chunks, chunk, chunk_ids = [], [], 0
+        for ids, changes in _group_updates(operations_data):
+            for id_chunk in _chunks(ids, chunk_size):
+                if chunk and chunk_ids + len(id_chunk) > chunk_size:
+                    chunks.append(chunk)
+                    chunk, chunk_ids = [], 0
+                chunk.append((id_chunk, changes))
+                chunk_ids += len(id_chunk)
+        if chunk:
+            chunks.append(chunk)
+        write_chunk = _update_chunk
+    elif operation_type == "delete":
+        chunks = list(_chunks(list(operations_data), chunk_size))
+        write_chunk = _delete_chunk
+    else:
+        raise ValueError(f"Unsupported operation type: {operation_type}")
+
+    for chunk in chunks:
+        result["chunks"] += 1
+        try:
+            write_chunk(collection, chunk, result, max_retries, backoff)
+        except Exception as e:
+            print(f"Batch {operation_type} chunk failed: {e}")
+            if operation_type == "update":
+                _add_failures(result, [doc_id for ids, _ in chunk for doc_id in ids], e)
+            elif operation_type == "insert":
+                _add_failures(result, [document.get("_id") for document in chunk], e)
+            else:
+                _add_failures(result, chunk, e)
+
+    result["errors"] = len(result["failures"])
+    # Updates and deletes of _ids that no longer exist are neither written nor failed
+    result["not_found"] = max(result["total"] - result["success"] - result["errors"], 0)
+    print(f"Batch {operation_type} on '{db_name}.{collection_name}': {result['success']} of {result['total']} succeeded, {result['errors']} failed, {result['retries']} retries in {result['chunks']} chunk(s).")
+    return result
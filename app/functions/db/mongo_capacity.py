@@ -0,0 +1,168 @@
+import datetime
+from pymongo import DESCENDING
+from pymongo.errors import OperationFailure
+from pymongo.mongo_client import MongoClient
+from functions.db.mongo_collection_management import get_all_databases, get_all_collections
+
+# Snapshots of dbStats/collStats of every database and collection, kept in the default database:
+# {database, collection (None for the database totals), count, avg_obj_size, data_size, storage_size, index_size, indexes, _captured_at}
+CAPACITY_COLLECTION = "_capacity_metrics"
+CAPACITY_FIELDS = ["count", "avg_obj_size", "data_size", "storage_size", "index_size", "indexes"]
+# Snapshots older than this are dropped by the TTL index of the registry
+CAPACITY_RETENTION_DAYS = 730
+
+def get_database_stats(client: MongoClient, db_name: str) -> dict:
+    """
+    Get the size of a database from dbStats.
+
+    Returns:
+        dict: The number of collections and documents, the average document size, and the data, storage and index sizes in bytes
+    """
+    stats = client[db_name].command("dbStats")
+    return {
+        "collections": int(stats.get("collections", 0)),
+        "count": int(stats.get("objects", 0)),
+        "avg_obj_size": float(stats.get("avgObjSize", 0)),
+        "data_size": int(stats.get("dataSize", 0)),
+        "storage_size": int(stats.get("storageSize", 0)),
+        "index_size": int(stats.get("indexSize", 0)),
+        "indexes": int(stats.get("indexes", 0)),
+    }
+
+def get_collection_stats(client: MongoClient, db_name: str, collection_name: str) -> dict:
+    """
+    Get the size of a collection from collStats, or from the $collStats stage on servers without the command.
+
+    Returns:
+        dict: The number of documents, the average document size, and the data, storage and index sizes in bytes
+    """
+    try:
+        stats = client[db_name].command("collStats", collection_name)
+    except OperationFailure:
+        result = list(client[db_name][collection_name].aggregate([{"$collStats": {"storageStats": {}}}]))
+        stats = result[0].get("storageStats", {}) if result else {}
+    return {
+        "count": int(stats.get("count", 0)),
+        "avg_obj_size": float(stats.get("avgObjSize", 0)),
+        "data_size": int(stats.get("size", 0)),
+        "storage_size": int(stats.get("storageSize", 0)),
+        "index_size": int(stats.get("totalIndexSize", 0)),
+        "indexes": int(stats.get("nindexes", 0)),
+    }
+
+def get_capacity_snapshot(client: MongoClient, db_names: list | None = None) -> list:
+    """
+    Get the current size of every database and of each of its collections.
+
+    Args:
+        client: The MongoDB client
+        db_names: The databases to measure, defaults to every database except admin, local and config
+
+    Returns:
+        list: One row per database (collection None) and per collection, with the fields of CAPACITY_FIELDS
+    """
+    rows = []
+    captured_at = datetime.datetime.now()
+    for db_name in db_names or get_all_databases(client):
+        try:
+            database_stats = get_database_stats(client, db_name)
+        except Exception as e:
+            print(f"Failed to read the stats of '{db_name}': {e}")
+            continue
+        rows.append({"database": db_name, "collection": None, **{field: database_stats[field] for field in CAPACITY_FIELDS}, "_captured_at": captured_at})
+        for collection_name in get_all_collections(client, db_name):
+            if collection_name.startswith("system."):
+                continue
+            try:
+                collection_stats = get_collection_stats(client, db_name, collection_name)
+            except Exception as e:
+                print(f"Failed to read the stats of '{db_name}.{collection_name}': {e}")
+                continue
+            rows.append({"database": db_name, "collection": collection_name, **collection_stats, "_captured_at": captured_at})
+    return rows
+
+def get_last_capture_time(client: MongoClient, metrics_db: str) -> datetime.datetime | None:
+    """
+    Get the time of the latest recorded snapshot, or None if none was recorded.
+    """
+    latest = client[metrics_db][CAPACITY_COLLECTION].find_one({}, {"_captured_at": 1}, sort=[("_captured_at", DESCENDING)])
+    return latest["_captured_at"] if latest else None
+
+def record_capacity_snapshot(client: MongoClient, metrics_db: str, min_interval: float = 0.0) -> list:
+    """
+    Record the current size of every database and collection in the metrics collection,
+    unless the latest snapshot is more recent than min_interval seconds.
+
+    Args:
+        client: The MongoDB client
+        metrics_db: The database of the metrics collection
+        min_interval: Minimum number of seconds between two snapshots
+
+    Returns:
+        list: The recorded rows, empty if the snapshot was skipped
+    """
+    last_captured_at = get_last_capture_time(client, metrics_db)
+    if last_captured_at is not None and (datetime.datetime.now() - last_captured_at).total_seconds() < min_interval:
+        return []
+    rows = get_capacity_snapshot(client)
+    if rows:
+        client[metrics_db][CAPACITY_COLLECTION].insert_many([dict(row) for row in rows], ordered=False)
+        print(f"Capacity snapshot of {sum(row['collection'] is None for row in rows)} database(s) recorded in '{metrics_db}.{CAPACITY_COLLECTION}'.")
+    return rows
+
+def get_latest_snapshot(client: MongoClient, metrics_db: str) -> list:
+    """
+    Get the rows of the latest recorded snapshot.
+    """
+    last_captured_at = get_last_capture_time(client, metrics_db)
+    if last_captured_at is None:
+        return []
+    return list(client[metrics_db][CAPACITY_COLLECTION].find({"_captured_at": last_captured_at}, {"_id": 0}))
+
+def get_capacity_history(client: MongoClient, metrics_db: str, db_name: str, collection_name: str | None = None, since: datetime.datetime | None = None) -> list:
+    """
+    Get the recorded sizes of a database (collection None) or of a collection, oldest first.
+
+    Returns:
+        list: The snapshot rows of the database or collection
+    """
+    query = {"database": db_name, "collection": collection_name}
+    if since is not None:
+        query["_captured_at"] = {"$gte": since}
+    return list(client[metrics_db][CAPACITY_COLLECTION].find(query, {"_id": 0}).sort("_captured_at", 1))
+
+def get_growth(history: list, field: str = "storage_size") -> dict | None:
+    """
+    Get the change of a field between the first and the last snapshot of a history and its daily rate.
+
+    Returns:
+        dict: The change, the number of days between the snapshots and the change per day, or None with fewer than two snapshots
+    """
+    if len(history) < 2:
+        return None
+    first, last = history[0], history[-1]
+    days = (last["_captured_at"] - first["_captured_at"]).total_seconds() / 86400
+    change = last[field] - first[field]
+    return {"change": change, "days": days, "per_day": change / days if days > 0 else None}
+
+def get_capacity_growth(client: MongoClient, metrics_db: str, since: datetime.datetime) -> dict:
+    """
+    Get the growth of every database and collection between its first snapshot since a time and its latest one.
+
+    Returns:
+        dict: The growth of the document count ("count") and of the storage size ("storage_size") from get_growth,
+              keyed by (database, collection), with collection None for the database totals
+    """
+    pipeline = [
+        {"$match": {"_captured_at": {"$gte": since}}},
+        {"$sort": {"_captured_at": 1}},
+        {"$group": {"_id": {"database": "$database", "collection": "$collection"}, "first": {"$first": "$$ROOT"}, "last": {"$last": "$$ROOT"}}},
+    ]
+    growth = {}
+    for group in client[metrics_db][CAPACITY_COLLECTION].aggregate(pipeline):
+        history = [group["first"], group["last"]] if group["first"]["_id"] != group["last"]["_id"] else [group["first"]]
+        growth[(group["_id"]["database"], group["_id"].get("collection"))] = {
+            "count": get_growth(history, "count"),
+            "storage_size": get_growth(history, "storage_size"),
+        }
+    return growth
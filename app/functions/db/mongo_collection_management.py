@@ -1,13 +1,23 @@
+import threading
+import time
 from pymongo.collection import Collection
 from pymongo.mongo_client import MongoClient
 
+# Cache of database and collection names: {key: (expires_at, names)}
+_CATALOG_CACHE = {}
+_CATALOG_CACHE_LOCK = threading.Lock()
+
 def create_collection(client: MongoClient, db_name: str, collection_name: str) -> Collection:
     """
     Create a new collection in the specified database.
     """
     # Create a new collection
     db = client[db_name]
+    # Collections are otherwise only created on the first insert, which hides them from the catalog
+    if collection_name not in db.list_collection_names():
+        db.create_collection(collection_name)
     collection = db[collection_name]
+    invalidate_catalog(db_name)
     print(f"Collection '{collection_name}' created successfully.")
     return collection
 
@@ -29,6 +39,49 @@ def get_all_collections(client: MongoClient, db_name: str) -> list:
     collections = db.list_collection_names()
     return collections
 
+def _get_catalog_ttl() -> float:
+    from functions.utils import _get_setting
+    return float(_get_setting("app", "catalog_ttl", 300))
+
+def _get_cached_catalog(key: tuple, fetch, ttl: float | None) -> list:
+    """
+    Get catalog names from the cache, fetching and caching them if missing or expired.
+    """
+    now = time.monotonic()
+    with _CATALOG_CACHE_LOCK:
+        cached = _CATALOG_CACHE.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    names = fetch()
+    ttl = _get_catalog_ttl() if ttl is None else ttl
+    with _CATALOG_CACHE_LOCK:
+        _CATALOG_CACHE[key] = (now + ttl, names)
+    return names
+
+def get_cached_databases(client: MongoClient, ttl: float | None = None) -> list:
+    """
+    Get a list of all databases, served from the catalog cache until the TTL expires.
+    """
+    return _get_cached_catalog(("databases",), lambda: get_all_databases(client), ttl)
+
+def get_cached_collections(client: MongoClient, db_name: str, ttl: float | None = None) -> list:
+    """
+    Get a list of all collections in the specified database, served from the catalog cache until the TTL expires.
+    """
+    return _get_cached_catalog(("collections", db_name), lambda: get_all_collections(client, db_name), ttl)
+
+def invalidate_catalog(db_name: str | None = None) -> None:
+    """
+    Drop cached catalog entries. With a database name, only the database list and
+    that database's collections are dropped, otherwise the whole catalog is.
+    """
+    with _CATALOG_CACHE_LOCK:
+        if db_name is None:
+            _CATALOG_CACHE.clear()
+        else:
+            _CATALOG_CACHE.pop(("databases",), None)
+            _CATALOG_CACHE.pop(("collections", db_name), None)
+
 def get_collection(client: MongoClient, db_name: str, collection_name: str) -> Collection:
     """
     Get a specific collection from the specified database.
@@ -38,11 +91,96 @@ def get_collection(client: MongoClient, db_name: str, collection_name: str) -> C
     collection = db[collection_name]
     return collection
 
-def get_collection_data(client: MongoClient, db_name: str, collection_name: str) -> list:
+def get_collection_data(client: MongoClient, db_name: str, collection_name: str, projection: dict | None = None) -> list:
     """
-    Get all data from the specified collection.
+    Get all data from the specified collection, with only the fields of the projection if one is given.
     """
     collection = get_collection(client, db_name, collection_name)
     # Get all data from the collection
-    data = collection.find()
+    data = collection.find({}, projection)
     return list(data)
+
+def require_fields(projection: dict | None, fields) -> dict | None:
+    """
+    Make sure a projection returns the given fields, e.g. the fields of a keyset cursor.
+    An inclusion projection gets the fields added, an exclusion projection gets them removed.
+    
+    Args:
+        projection: A MongoDB projection, None for whole documents
+        fields: The fields the caller cannot do without
+        
+    Returns:
+        dict: The projection with the fields, or None for whole documents
+    """
+    if not projection:
+        return None
+    projection = dict(projection)
+    # _id is returned unless it is excluded, the other fields follow the mode of the projection
+    inclusion = any(value for field, value in projection.items() if field != "_id")
+    for field in fields:
+        if inclusion or field == "_id":
+            if field == "_id":
+                projection.pop("_id", None)
+            else:
+                projection[field] = 1
+        else:
+            projection.pop(field, None)
+    return projection or None
+
+def _get_page_key(document: dict, sort_field: str) -> dict:
+    """
+    Get the keyset cursor for a document, i.e. the values of the sort field and _id.
+    """
+    return {sort_field: document.get(sort_field), "_id": document["_id"]}
+
+def _get_seek_query(after: dict, sort_field: str) -> dict:
+    """
+    Build the query that seeks past the given keyset cursor in descending (sort_field, _id) order.
+    """
+    if after[sort_field] is None:
+        # Documents without the sort field sort last, so only the _id tie-break is left
+        return {sort_field: None, "_id": {"$lt": after["_id"]}}
+    return {
+        "$or": [
+            {sort_field: {"$lt": after[sort_field]}},
+            {sort_field: after[sort_field], "_id": {"$lt": after["_id"]}},
+            # $lt never matches null or missing values, which sort after every other value
+            {sort_field: None},
+        ]
+    }
+
+def get_collection_page(client: MongoClient, db_name: str, collection_name: str, page_size: int = 50, after: dict | None = None, sort_field: str = "date", query: dict | None = None, projection: dict | None = None) -> tuple[list, dict | None]:
+    """
+    Get one page of data from the specified collection, sorted by sort_field and _id in descending order.
+    
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        collection_name: The name of the collection
+        page_size: The number of documents per page
+        after: The keyset cursor returned with the previous page, None for the first page
+        sort_field: The field to sort by, ties are broken by _id
+        query: An optional query to filter the documents
+        projection: An optional projection, the sort field and _id are always returned for the cursor
+        
+    Returns:
+        tuple: The documents of the page and the cursor for the next page (None if this is the last page)
+    """
+    collection = get_collection(client, db_name, collection_name)
+    filters = [query] if query else []
+    if after is not None:
+        filters.append(_get_seek_query(after, sort_field))
+    if not filters:
+        page_query = {}
+    elif len(filters) == 1:
+        page_query = filters[0]
+    else:
+        page_query = {"$and": filters}
+    
+    # Fetch one extra document to know whether there is a next page
+    cursor = collection.find(page_query, require_fields(projection, (sort_field, "_id"))).sort([(sort_field, -1), ("_id", -1)]).limit(page_size + 1)
+    data = list(cursor)
+    if len(data) > page_size:
+        data = data[:page_size]
+        return data, _get_page_key(data[-1], sort_field)
+    return data, None
@@ -1,4 +1,7 @@
+import threading
 from pymongo.mongo_client import MongoClient
+from functions.db.mongo_health import is_client_available, stop_health_monitor
+from functions.db.mongo_query_log import get_query_recorder, register_explain_client
 from pymongo.server_api import ServerApi
 from typing import Literal
     
@@ -38,21 +41,64 @@ def _get_mongo_connection_string_st() -> str:
         connection_string = f"{protocol}://{username}:{password}@{host}/{options}"
     return connection_string
 
-def get_mongo_client(approach: Literal['file', 'st']='st') -> MongoClient | None:
+# Process-wide registry of MongoDB clients keyed by connection settings.
+# A MongoClient owns a connection pool and is thread-safe, so one client per settings is shared by every caller.
+_CLIENT_REGISTRY = {}
+_CLIENT_REGISTRY_LOCK = threading.Lock()
+
+def _get_client_options(approach: Literal['file', 'st']='st') -> dict:
     """
-    Create a MongoDB client using the connection string from environment variables.
+    Get the connection pool settings for the MongoDB client, falling back to the defaults when not configured.
+    """
+    from functions.utils import _get_setting
+    return {
+        "maxPoolSize": int(_get_setting("mongo", "max_pool_size", 100, approach)),
+        "maxIdleTimeMS": int(_get_setting("mongo", "max_idle_time_ms", 60000, approach)),
+        "serverSelectionTimeoutMS": int(_get_setting("mongo", "server_selection_timeout_ms", 10000, approach)),
+    }
+
+def get_shared_mongo_client(approach: Literal['file', 'st']='st') -> MongoClient | None:
+    """
+    Get the process-wide MongoDB client for the configured connection settings.
+    The client is created on first use and reused afterwards, so callers share its connection pool.
+    Its health is checked by a background monitor, so an unreachable server is reported at once
+    instead of after the server selection timeout.
+    
+    Returns:
+        MongoClient: The shared client, or None if the server is unreachable or the circuit breaker is open
     """
     connection_str = _get_mongo_connection_string_file() if approach == 'file' else _get_mongo_connection_string_st()
+    options = _get_client_options(approach)
+    key = (connection_str, tuple(sorted(options.items())))
     
-    # Create a MongoDB client
-    client = MongoClient(connection_str, server_api=ServerApi('1'))
+    with _CLIENT_REGISTRY_LOCK:
+        entry = _CLIENT_REGISTRY.get(key)
+        if entry is None:
+            entry = {
+                # Every command of the client is recorded by query shape for the slow query log
+                "client": MongoClient(connection_str, server_api=ServerApi('1'), event_listeners=[get_query_recorder()], **options),
+            }
+            _CLIENT_REGISTRY[key] = entry
+            register_explain_client(entry["client"])
+            print("MongoDB client created")
     
-    try:
-        client.admin.command('ping')
-        print("MongoDB connection successful")
-    except Exception as e:
-        print(f"MongoDB connection failed: {e}")
-        client = None
-    # Return the client
-    return client
-    
\ No newline at end of file
+    if not is_client_available(entry["client"]):
+        return None
+    return entry["client"]
+
+def close_shared_mongo_clients() -> None:
+    """
+    Close every client in the registry, e.g. before the process exits.
+    """
+    with _CLIENT_REGISTRY_LOCK:
+        for entry in _CLIENT_REGISTRY.values():
+            stop_health_monitor(entry["client"])
+            entry["client"].close()
+        _CLIENT_REGISTRY.clear()
+
+def get_mongo_client(approach: Literal['file', 'st']='st') -> MongoClient | None:
+    """
+    Get a MongoDB client using the connection string from the secrets.
+    Deprecated: Use get_shared_mongo_client instead.
+    """
+    return get_shared_mongo_client(approach=approach)
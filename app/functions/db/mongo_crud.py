@@ -9,12 +9,12 @@ def insert_data(collection: Collection, data: dict) -> None:
     print(f"Data inserted with ID: {result.inserted_id}")
     return result
 
-def fetch_data(collection: Collection, query: dict) -> list:
+def fetch_data(collection: Collection, query: dict, projection: dict | None = None) -> list:
     """
-    Fetch data from the specified collection based on the query.
+    Fetch data from the specified collection based on the query, with only the fields of the projection if one is given.
     """
     # Fetch data from the collection
-    data = collection.find(query)
+    data = collection.find(query, projection)
     return list(data)
 
 def update_data(collection: Collection, query: dict, new_values: dict) -> None:
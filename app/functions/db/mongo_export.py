@@ -0,0 +1,221 @@
+import csv
+import os
+import shutil
+import tempfile
+from typing import Literal
+from bson import json_util
+from pymongo.mongo_client import MongoClient
+
+EXPORT_FORMATS = {"csv": ".csv", "ndjson": ".ndjson", "parquet": ".parquet"}
+
+def _iter_chunks(cursor, chunk_size: int):
+    """
+    Yield lists of at most chunk_size documents from a cursor, so only one chunk is held in memory.
+    """
+    chunk = []
+    for document in cursor:
+        chunk.append(document)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _get_fields(collection, query: dict | None, projection: dict | None) -> set:
+    """
+    Get the union of the top-level fields of the exported documents, with one aggregation that only returns the field names.
+    """
+    pipeline = [{"$match": query or {}}]
+    if projection:
+        pipeline.append({"$project": projection})
+    pipeline += [
+        {"$project": {"_id": 0, "fields": {"$map": {"input": {"$objectToArray": "$$ROOT"}, "as": "field", "in": "$$field.k"}}}},
+        {"$unwind": "$fields"},
+        {"$group": {"_id": "$fields"}},
+    ]
+    return {document["_id"] for document in collection.aggregate(pipeline, allowDiskUse=True)}
+
+def _get_header(chunk: list, projection: dict | None, fields: set | None = None) -> list:
+    """
+    Get the CSV header from an inclusion projection, or from the fields of the first chunk followed by
+    the other fields of the exported documents.
+    """
+    if projection and all(projection.values()):
+        included = list(projection.keys())
+        return included if "_id" in included else ["_id"] + included
+    header = []
+    for document in chunk:
+        for field in document:
+            if field not in header:
+                header.append(field)
+    return header + sorted(set(fields or ()) - set(header))
+
+def _to_arrow_value(value):
+    """
+    Convert BSON-only types (ObjectId, Decimal128, ...) to strings that Arrow can store.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value
+    if isinstance(value, dict):
+        return {key: _to_arrow_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_arrow_value(item) for item in value]
+    return str(value)
+
+def documents_to_table(documents: list):
+    """
+    Build an Arrow table from documents, with a column for every field of any document.
+    pa.Table.from_pylist takes the fields of the first document only, so later fields would be dropped.
+    """
+    import pyarrow as pa
+    fields = {}
+    for document in documents:
+        fields.update(dict.fromkeys(document))
+    return pa.table({field: [_to_arrow_value(document.get(field)) for document in documents] for field in fields})
+
+def _write_csv(chunks, file_path: str, projection: dict | None, fields: set | None, progress_callback) -> int:
+    """
+    Write the documents as CSV rows under a header of all their fields, leaving the fields a document does not have empty.
+    """
+    written = 0
+    with open(file_path, "w", newline="", encoding="utf-8") as file:
+        writer = None
+        for chunk in chunks:
+            if writer is None:
+                writer = csv.DictWriter(file, fieldnames=_get_header(chunk, projection, fields), restval="")
+                writer.writeheader()
+            # Only a field added by a write made during the export can be missing from the header
+            missing_fields = {field for document in chunk for field in document if field not in writer.fieldnames}
+            if missing_fields:
+                raise ValueError(
+                    f"Documents after the first {written} have fields added during the export: {', '.join(sorted(missing_fields))}. "
+                    "Export again, or export the fields as a comma-separated list."
+                )
+            writer.writerows(chunk)
+            written += len(chunk)
+            if progress_callback:
+                progress_callback(written)
+    return written
+
+def _write_ndjson(chunks, file_path: str, progress_callback) -> int:
+    written = 0
+    with open(file_path, "w", encoding="utf-8") as file:
+        for chunk in chunks:
+            file.writelines(json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS) + "\n" for document in chunk)
+            written += len(chunk)
+            if progress_callback:
+                progress_callback(written)
+    return written
+
+def _conform_table(table, schema):
+    """
+    Cast a table to the unified schema of the export, adding the fields it does not have as nulls.
+    """
+    import pyarrow as pa
+    columns = [
+        table[field.name].cast(field.type, safe=True) if field.name in table.column_names else pa.nulls(table.num_rows, type=field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def _write_parquet(chunks, file_path: str, progress_callback) -> int:
+    """
+    Write each chunk to a temporary file with the schema of its own documents, then write the file once
+    with the schema unified over all chunks: integers mixed with floats become floats, fields first seen
+    in a later chunk and fields null in the first one are kept.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    written = 0
+    temp_dir = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(os.path.abspath(file_path)))
+    try:
+        parts = []
+        for chunk in chunks:
+            try:
+                table = documents_to_table(chunk)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError) as e:
+                raise ValueError(f"Documents {written} to {written + len(chunk)} have fields with mixed types: {e}") from e
+            parts.append(os.path.join(temp_dir, f"part-{len(parts)}.parquet"))
+            pq.write_table(table, parts[-1])
+            written += len(chunk)
+            if progress_callback:
+                progress_callback(written)
+        if not parts:
+            return 0
+        try:
+            schema = pa.unify_schemas([pq.read_schema(path) for path in parts], promote_options="permissive")
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"The documents have fields with incompatible types: {e}") from e
+        with pq.ParquetWriter(file_path, schema) as writer:
+            for path in parts:
+                try:
+                    writer.write_table(_conform_table(pq.ParquetFile(path).read(), schema))
+                except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+                    raise ValueError(f"The documents have fields with incompatible types: {e}") from e
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return written
+
+def export_collection(client: MongoClient, db_name: str, collection_name: str, file_path: str, file_format: Literal["csv", "ndjson", "parquet"] = "csv", query: dict | None = None, projection: dict | None = None, batch_size: int = 1000, progress_callback=None) -> int:
+    """
+    Stream a collection into a CSV, NDJSON or Parquet file, one chunk of documents at a time.
+    Memory use depends on the batch size, not on the number of documents in the collection.
+
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        collection_name: The name of the collection
+        file_path: The path of the file to write
+        file_format: One of "csv", "ndjson" or "parquet"
+        query: An optional query to filter the documents
+        projection: An optional projection of the exported fields
+        batch_size: The number of documents per cursor batch and per written chunk
+        progress_callback: Optional function called with the number of documents written so far
+
+    Returns:
+        int: The number of documents written
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {file_format}. Use one of {', '.join(EXPORT_FORMATS)}.")
+    cursor = client[db_name][collection_name].find(query or {}, projection).batch_size(batch_size)
+    chunks = _iter_chunks(cursor, batch_size)
+    # The file is written under a temporary name, so a failed export neither leaves a partial file
+    # that looks complete nor removes an earlier export at the same path
+    temp_path = f"{file_path}.tmp"
+    try:
+        if file_format == "csv":
+            # The fields are listed before the rows are streamed, so the header has the fields of every document
+            fields = None if projection and all(projection.values()) else _get_fields(client[db_name][collection_name], query, projection)
+            written = _write_csv(chunks, temp_path, projection, fields, progress_callback)
+        elif file_format == "ndjson":
+            written = _write_ndjson(chunks, temp_path, progress_callback)
+        else:
+            written = _write_parquet(chunks, temp_path, progress_callback)
+        if os.path.exists(temp_path):
+            os.replace(temp_path, file_path)
+    finally:
+        cursor.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    print(f"Exported {written} document(s) from '{db_name}.{collection_name}' to '{file_path}'.")
+    return written
+
+def parse_export_query(query_text: str) -> dict | None:
+    """
+    Parse a filter written as (extended) JSON, e.g. {"from_curr": "HKD", "date": {"$gte": {"$date": "2024-01-01T00:00:00Z"}}}.
+    """
+    if not query_text or not query_text.strip():
+        return None
+    query = json_util.loads(query_text)
+    if not isinstance(query, dict):
+        raise ValueError("The filter must be a JSON object.")
+    return query
+
+def parse_export_projection(fields_text: str) -> dict | None:
+    """
+    Parse a comma-separated list of fields into an inclusion projection.
+    """
+    fields = [field.strip() for field in (fields_text or "").split(",") if field.strip()]
+    return {field: 1 for field in fields} if fields else None
@@ -0,0 +1,163 @@
+import datetime
+import threading
+import time
+from collections import deque
+from pymongo.mongo_client import MongoClient
+
+# Health of each shared client: {id(client): state}, kept up to date by one background monitor thread per client.
+# Pages read the state instead of pinging, so an unreachable server never blocks a page. After consecutive
+# failures the circuit breaker opens and the monitor only tries again after the reset timeout (half-open).
+_HEALTH_STATES = {}
+_HEALTH_LOCK = threading.Lock()
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+def _get_health_settings() -> dict:
+    from functions.utils import _get_setting
+    return {
+        "interval": float(_get_setting("mongo", "health_check_interval", 10)),
+        "failure_threshold": int(_get_setting("mongo", "breaker_failure_threshold", 3)),
+        "reset_timeout": float(_get_setting("mongo", "breaker_reset_timeout", 30)),
+        "first_check_wait": float(_get_setting("mongo", "health_first_check_wait", 5)),
+        "latency_window": int(_get_setting("mongo", "health_latency_window", 20)),
+    }
+
+def _record_result(state: dict, ok: bool, latency_ms: float | None = None, error: Exception | str | None = None) -> None:
+    """
+    Record the outcome of a ping or a read and move the circuit breaker.
+    """
+    with _HEALTH_LOCK:
+        state["last_checked"] = datetime.datetime.now()
+        if ok:
+            if state["breaker"] != BREAKER_CLOSED:
+                print(f"MongoDB is reachable again, circuit breaker closed after {state['consecutive_failures']} failure(s).")
+            state.update(status="up", breaker=BREAKER_CLOSED, consecutive_failures=0, last_error=None, opened_at=None, down_since=None)
+            if latency_ms is not None:
+                state["latency_ms"] = latency_ms
+                state["latencies"].append(latency_ms)
+            return
+        if state["status"] != "down":
+            state["down_since"] = state["last_checked"]
+        state["status"] = "down"
+        state["last_error"] = str(error)
+        state["consecutive_failures"] += 1
+        if state["breaker"] == BREAKER_HALF_OPEN or state["consecutive_failures"] >= state["settings"]["failure_threshold"]:
+            if state["breaker"] != BREAKER_OPEN:
+                print(f"MongoDB circuit breaker opened after {state['consecutive_failures']} failure(s): {error}")
+            state["breaker"] = BREAKER_OPEN
+            state["opened_at"] = time.monotonic()
+
+def _ping(state: dict) -> None:
+    start = time.perf_counter()
+    try:
+        state["client"].admin.command("ping")
+    except Exception as e:
+        print(f"MongoDB connection failed: {e}")
+        _record_result(state, ok=False, error=e)
+        return
+    _record_result(state, ok=True, latency_ms=(time.perf_counter() - start) * 1000)
+
+def _run_monitor(state: dict) -> None:
+    settings = state["settings"]
+    while not state["stop"].is_set():
+        with _HEALTH_LOCK:
+            breaker, opened_at = state["breaker"], state["opened_at"]
+        if breaker == BREAKER_OPEN:
+            remaining = settings["reset_timeout"] - (time.monotonic() - opened_at)
+            if remaining > 0:
+                # Pages keep failing fast while the breaker is open, the monitor waits before trying again
+                state["stop"].wait(remaining)
+                continue
+            with _HEALTH_LOCK:
+                state["breaker"] = BREAKER_HALF_OPEN
+        _ping(state)
+        state["checked"].set()
+        with _HEALTH_LOCK:
+            breaker = state["breaker"]
+        if breaker != BREAKER_OPEN:
+            state["stop"].wait(settings["interval"])
+
+def start_health_monitor(client: MongoClient) -> dict:
+    """
+    Start the background health monitor of a client, if it is not running yet.
+
+    Returns:
+        dict: The health state of the client, updated in place by the monitor
+    """
+    with _HEALTH_LOCK:
+        state = _HEALTH_STATES.get(id(client))
+        if state is not None and state["thread"].is_alive():
+            return state
+        settings = _get_health_settings()
+        state = {
+            "client": client, "settings": settings, "status": "unknown", "breaker": BREAKER_CLOSED,
+            "consecutive_failures": 0, "latency_ms": None, "latencies": deque(maxlen=settings["latency_window"]),
+            "last_checked": None, "last_error": None, "down_since": None, "opened_at": None,
+            "checked": threading.Event(), "stop": threading.Event(), "thread": None,
+        }
+        state["thread"] = threading.Thread(target=_run_monitor, args=(state,), name="mongo-health-monitor", daemon=True)
+        _HEALTH_STATES[id(client)] = state
+        state["thread"].start()
+        return state
+
+def stop_health_monitor(client: MongoClient) -> None:
+    """
+    Stop the health monitor of a client, e.g. before the client is closed.
+    """
+    with _HEALTH_LOCK:
+        state = _HEALTH_STATES.pop(id(client), None)
+    if state is not None:
+        state["stop"].set()
+
+def is_client_available(client: MongoClient) -> bool:
+    """
+    Check whether a client can be used, without contacting the server.
+    Only the first check of a new client waits for the first ping, at most mongo.health_first_check_wait seconds.
+
+    Returns:
+        bool: False if the last ping failed or the circuit breaker is open
+    """
+    state = start_health_monitor(client)
+    if not state["checked"].is_set():
+        state["checked"].wait(state["settings"]["first_check_wait"])
+    with _HEALTH_LOCK:
+        return state["status"] == "up" and state["breaker"] == BREAKER_CLOSED
+
+def report_connection_failure(client: MongoClient, error: Exception) -> None:
+    """
+    Count a read or write that failed with a connection error towards the circuit breaker of its client.
+    """
+    with _HEALTH_LOCK:
+        state = _HEALTH_STATES.get(id(client))
+    if state is not None:
+        _record_result(state, ok=False, error=error)
+
+def get_health_status(client: MongoClient | None = None) -> dict | None:
+    """
+    Get the health of a client: its status ("up", "down" or "unknown"), the circuit breaker state,
+    the last and average ping latency in milliseconds, the number of consecutive failures and the last error.
+    Without a client, the health of the most recently monitored client is returned.
+
+    Returns:
+        dict: The health of the client, or None if it is not monitored
+    """
+    with _HEALTH_LOCK:
+        if client is not None:
+            state = _HEALTH_STATES.get(id(client))
+        else:
+            state = next(reversed(_HEALTH_STATES.values()), None)
+        if state is None:
+            return None
+        latencies = list(state["latencies"])
+        return {
+            "status": state["status"],
+            "available": state["status"] == "up" and state["breaker"] == BREAKER_CLOSED,
+            "breaker": state["breaker"],
+            "latency_ms": state["latency_ms"],
+            "avg_latency_ms": sum(latencies) / len(latencies) if latencies else None,
+            "consecutive_failures": state["consecutive_failures"],
+            "last_checked": state["last_checked"],
+            "last_error": state["last_error"],
+            "down_since": state["down_since"],
+        }
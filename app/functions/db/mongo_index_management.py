@@ -0,0 +1,210 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.mongo_client import MongoClient
+from functions.db.mongo_audit import AUDIT_COLLECTION, SNAPSHOT_COLLECTION
+from functions.normalization import FINGERPRINT_FIELD, OWNER_FIELD
+from functions.db.delta_sync import TOMBSTONE_COLLECTION
+from functions.db.mongo_capacity import CAPACITY_COLLECTION, CAPACITY_RETENTION_DAYS
+
+USERS_COLLECTION = "users"
+
+# Indexes required by the app, keyed by the role of the collection.
+# The transaction collection name is configurable, so it is resolved when the indexes are applied.
+INDEX_REGISTRY = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "transactions": [
+        # _id is part of the key so the index also serves the keyset pagination tie-break
+        IndexModel([("date", DESCENDING), ("_id", DESCENDING)], name="date_id"),
+        # The pages of a user only read the transactions they own, newest first
+        IndexModel([(OWNER_FIELD, ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="owner_date_id"),
+        # Rejects a transaction entered twice by the same owner; documents without a fingerprint are not indexed
+        IndexModel(
+            [(OWNER_FIELD, ASCENDING), (FINGERPRINT_FIELD, ASCENDING)], name="owner_fingerprint_unique", unique=True,
+            partialFilterExpression={FINGERPRINT_FIELD: {"$exists": True}},
+        ),
+        IndexModel([("from_curr", ASCENDING), ("to_curr", ASCENDING), ("date", DESCENDING)], name="from_curr_to_curr_date"),
+    ],
+    "tombstones": [
+        IndexModel([("collection", ASCENDING), ("_deleted_at", ASCENDING)], name="collection_deleted_at"),
+    ],
+    "audit_log": [
+        IndexModel([("collection", ASCENDING), ("_at", ASCENDING), ("seq", ASCENDING)], name="collection_at_seq"),
+        IndexModel([("collection", ASCENDING), ("doc_id", ASCENDING), ("_at", DESCENDING)], name="collection_doc_id_at"),
+    ],
+    "audit_snapshots": [
+        IndexModel([("collection", ASCENDING), ("taken_at", DESCENDING)], name="collection_taken_at"),
+    ],
+    "capacity_metrics": [
+        IndexModel([("database", ASCENDING), ("collection", ASCENDING), ("_captured_at", ASCENDING)], name="database_collection_captured_at"),
+        # Also finds the latest snapshot, and drops the snapshots older than the retention
+        IndexModel([("_captured_at", ASCENDING)], name="captured_at_ttl", expireAfterSeconds=CAPACITY_RETENTION_DAYS * 86400),
+    ],
+}
+
+# Error code of create_indexes for an index that exists with other options, e.g. a changed TTL
+INDEX_OPTIONS_CONFLICT = 85
+
+def get_index_registry() -> dict:
+    """
+    Get the index registry, with the indexes whose options come from the settings:
+    the TTL of the tombstones, which drops them after app.tombstone_retention_days.
+    """
+    from functions.db.delta_sync import get_tombstone_retention
+    return {
+        **INDEX_REGISTRY,
+        "tombstones": INDEX_REGISTRY["tombstones"] + [
+            IndexModel([("_deleted_at", ASCENDING)], name="deleted_at_ttl", expireAfterSeconds=int(get_tombstone_retention().total_seconds())),
+        ],
+    }
+
+def get_registered_collections(transaction_collection: str) -> dict:
+    """
+    Map each collection role of the index registry to the actual collection name.
+    """
+    return {
+        "users": USERS_COLLECTION,
+        "transactions": transaction_collection,
+        "tombstones": TOMBSTONE_COLLECTION,
+        "audit_log": AUDIT_COLLECTION,
+        "audit_snapshots": SNAPSHOT_COLLECTION,
+        "capacity_metrics": CAPACITY_COLLECTION,
+    }
+
+def get_registered_index_names(role: str) -> list:
+    """
+    Get the names of the registered indexes for a collection role.
+    """
+    return [index.document["name"] for index in get_index_registry().get(role, [])]
+
+def ensure_indexes(client: MongoClient, db_name: str, transaction_collection: str) -> list:
+    """
+    Create the registered indexes in the specified database.
+    Creating an index that already exists with the same definition is a no-op,
+    so this is safe to run on every startup.
+
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        transaction_collection: The name of the transaction collection
+
+    Returns:
+        list: One dict per index with the collection, index name, status and error (if any)
+    """
+    from pymongo.errors import OperationFailure
+    results = []
+    db = client[db_name]
+    registry = get_index_registry()
+    for role, collection_name in get_registered_collections(transaction_collection).items():
+        if not collection_name:
+            continue
+        for index in registry[role]:
+            index_name = index.document["name"]
+            try:
+                # Create one index at a time so a failing index does not block the others
+                try:
+                    db[collection_name].create_indexes([index])
+                except OperationFailure as e:
+                    if e.code != INDEX_OPTIONS_CONFLICT or "expireAfterSeconds" not in index.document:
+                        raise
+                    # The retention setting changed since the TTL index was built
+                    db.command("collMod", collection_name, index={"name": index_name, "expireAfterSeconds": index.document["expireAfterSeconds"]})
+                results.append({"collection": collection_name, "index": index_name, "status": "ok", "error": None})
+            except Exception as e:
+                print(f"Failed to create index '{index_name}' on '{collection_name}': {e}")
+                results.append({"collection": collection_name, "index": index_name, "status": "failed", "error": str(e)})
+    return results
+
+def backfill_fingerprints(client: MongoClient, db_name: str, collection_name: str, batch_size: int = 1000) -> dict:
+    """
+    Stamp the fingerprint on the transactions written before fingerprints existed, so new entries that repeat
+    them are rejected by the owner_fingerprint_unique index. Run it before the index is built.
+    A transaction that repeats another one of the same owner keeps no fingerprint: the oldest of each group
+    is stamped and the others are reported, to be reviewed and deleted, so the unique index can be built.
+
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        collection_name: The name of the transaction collection
+        batch_size: The number of documents stamped per bulk write
+
+    Returns:
+        dict: The number of stamped documents ("stamped"), of documents without the fields of a fingerprint
+              ("skipped"), and the duplicate groups ("duplicates"), each with the owner, the fingerprint,
+              the _id that keeps it ("kept") and the _ids of the repeats ("duplicate_ids")
+    """
+    from functions.db.mongo_batch import DUPLICATE_KEY_ERROR
+    from functions.normalization import FINGERPRINT_FIELDS, compute_fingerprint
+    collection = client[db_name][collection_name]
+    result = {"stamped": 0, "skipped": 0, "duplicates": []}
+    # _updated_at is not stamped: the fingerprint is derived metadata, not a change of the transaction
+    rejected = []
+
+    def _write(operations: list, doc_ids: list) -> None:
+        try:
+            result["stamped"] += collection.bulk_write(operations, ordered=False).modified_count
+        except BulkWriteError as e:
+            result["stamped"] += e.details.get("nModified", 0)
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in e.details["writeErrors"]):
+                raise
+            # Only a built unique index rejects a stamp: the transaction repeats one that already has the fingerprint
+            rejected.extend(doc_ids[error["index"]] for error in e.details["writeErrors"])
+
+    operations, doc_ids = [], []
+    projection = {field: 1 for field in (*FINGERPRINT_FIELDS, OWNER_FIELD)}
+    # Oldest first, so the oldest transaction of a group is the one that keeps the fingerprint
+    for document in collection.find({FINGERPRINT_FIELD: {"$exists": False}}, projection).sort([("_created_at", ASCENDING), ("_id", ASCENDING)]).batch_size(batch_size):
+        fingerprint = compute_fingerprint(document)
+        if fingerprint is None:
+            result["skipped"] += 1
+            continue
+        operations.append(UpdateOne({"_id": document["_id"]}, {"$set": {FINGERPRINT_FIELD: fingerprint}}))
+        doc_ids.append(document["_id"])
+        if len(operations) >= batch_size:
+            _write(operations, doc_ids)
+            operations, doc_ids = [], []
+    if operations:
+        _write(operations, doc_ids)
+
+    # Without the index, repeats were stamped too: the fingerprint is removed from all but the oldest of each group
+    groups = collection.aggregate([
+        {"$match": {FINGERPRINT_FIELD: {"$exists": True}}},
+        {"$sort": {"_created_at": 1, "_id": 1}},
+        {"$group": {"_id": {"owner": f"${OWNER_FIELD}", "fingerprint": f"${FINGERPRINT_FIELD}"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    for group in groups:
+        kept, duplicate_ids = group["ids"][0], group["ids"][1:]
+        unset = collection.update_many({"_id": {"$in": duplicate_ids}}, {"$unset": {FINGERPRINT_FIELD: ""}})
+        result["stamped"] -= unset.modified_count
+        result["duplicates"].append({"owner": group["_id"].get("owner"), "fingerprint": group["_id"]["fingerprint"], "kept": kept, "duplicate_ids": duplicate_ids})
+    if rejected:
+        # Group the rejected stamps with the transaction that holds their fingerprint
+        for document in collection.find({"_id": {"$in": rejected}}, projection):
+            fingerprint = compute_fingerprint(document)
+            kept = collection.find_one({OWNER_FIELD: document.get(OWNER_FIELD), FINGERPRINT_FIELD: fingerprint}, {"_id": 1})
+            result["duplicates"].append({"owner": document.get(OWNER_FIELD), "fingerprint": fingerprint, "kept": kept["_id"] if kept else None, "duplicate_ids": [document["_id"]]})
+    print(f"Fingerprints of '{db_name}.{collection_name}': {result['stamped']} stamped, {result['skipped']} skipped, {len(result['duplicates'])} duplicate group(s).")
+    return result
+
+def get_index_stats(client: MongoClient, db_name: str, collection_name: str) -> list:
+    """
+    Get every index of the specified collection with its $indexStats usage counts.
+
+    Returns:
+        list: One dict per index with its name, key, number of accesses and the time counting started
+    """
+    collection = client[db_name][collection_name]
+    usage = {stat["name"]: stat for stat in collection.aggregate([{"$indexStats": {}}])}
+    stats = []
+    for index_name, info in collection.index_information().items():
+        accesses = usage.get(index_name, {}).get("accesses", {})
+        stats.append({
+            "name": index_name,
+            "key": ", ".join(f"{field}: {direction}" for field, direction in info["key"]),
+            "unique": info.get("unique", False),
+            "accesses": accesses.get("ops", 0),
+            "since": accesses.get("since"),
+        })
+    return stats
@@ -0,0 +1,285 @@
+import contextvars
+import datetime
+import json
+import queue
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pymongo import monitoring
+from pymongo.mongo_client import MongoClient
+
+# Commands of the data layer are aggregated by query shape: {(action, command, namespace, shape): stats}.
+# A shape is the filter, sort or pipeline with every value replaced by its type, so the same query with
+# other values is counted once. Slow shapes get their executionStats explain plan captured in the background.
+_QUERY_STATS = OrderedDict()
+_QUERY_STATS_LOCK = threading.Lock()
+_MAX_SHAPES = 500
+# Commands in flight {request_id: (key, command, cursor id)} and open cursors {cursor id: key}, so getMore batches count for their query
+_IN_FLIGHT = {}
+_CURSORS = OrderedDict()
+_MAX_CURSORS = 1000
+_EXPLAIN_QUEUE = queue.Queue(maxsize=100)
+_EXPLAIN_WORKER = None
+_EXPLAIN_LOCK = threading.Lock()
+_EXPLAIN_CLIENT = None
+# Commands of the driver and of the health monitor, which are not queries of the app
+IGNORED_COMMANDS = {
+    "ping", "hello", "ismaster", "isMaster", "buildInfo", "saslStart", "saslContinue", "authenticate",
+    "endSessions", "killCursors", "explain", "getnonce", "abortTransaction", "commitTransaction",
+}
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Fields added to a command by the driver, which are not part of the query
+_DRIVER_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "apiVersion", "apiStrict", "apiDeprecationErrors", "readConcern", "writeConcern"}
+
+# The UI action that issues the commands, e.g. "Fetch Data". A context variable rather than a thread-local,
+# so it follows the reads that run_in_thread hands to the thread pool.
+_ACTION = contextvars.ContextVar("mongo_query_action", default=None)
+
+def _get_slow_query_ms() -> float:
+    from functions.utils import _get_setting
+    return float(_get_setting("app", "slow_query_ms", 100))
+
+@contextmanager
+def query_action(label: str):
+    """
+    Label the commands issued inside the block with a UI action, so their cost is tied to the page that issued them.
+    """
+    token = _ACTION.set(label)
+    try:
+        yield
+    finally:
+        _ACTION.reset(token)
+
+def get_query_shape(value):
+    """
+    Replace the values of a filter, sort or pipeline with their type names, keeping field names and operators.
+    """
+    if isinstance(value, dict):
+        return {key: get_query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = [get_query_shape(item) for item in value]
+        # Lists of values ($in, $nin) have one shape, lists of clauses ($and, $or) and pipelines keep each stage
+        if shapes and all(not isinstance(shape, (dict, list)) for shape in shapes):
+            return sorted(set(shapes))
+        return shapes
+    return type(value).__name__
+
+def _get_command_query(command_name: str, command: dict):
+    """
+    Get the part of a command that determines its plan: the filter and sort of a find, the pipeline of
+    an aggregate, or the filters of the updates and deletes.
+    """
+    if command_name == "find":
+        return {"filter": command.get("filter", {}), "sort": command.get("sort"), "projection": command.get("projection")}
+    if command_name == "aggregate":
+        return command.get("pipeline", [])
+    if command_name in ("count", "distinct"):
+        return {"query": command.get("query", {}), "key": command.get("key")}
+    if command_name == "update":
+        return [{"q": update.get("q", {}), "multi": update.get("multi", False)} for update in command.get("updates", [])[:1]]
+    if command_name == "delete":
+        return [{"q": delete.get("q", {})} for delete in command.get("deletes", [])[:1]]
+    if command_name == "findAndModify":
+        return {"query": command.get("query", {}), "sort": command.get("sort")}
+    return None
+
+def _count_documents(command_name: str, reply: dict) -> int:
+    """
+    Get the number of documents a command returned or wrote.
+    """
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if command_name == "distinct":
+        return len(reply.get("values", []))
+    return int(reply.get("n", 0))
+
+def _record(key: tuple, duration_ms: float, n_documents: int, command: dict | None) -> None:
+    with _QUERY_STATS_LOCK:
+        stats = _QUERY_STATS.get(key)
+        if stats is None:
+            action, command_name, namespace, shape = key
+            stats = _QUERY_STATS[key] = {
+                "action": action, "command": command_name, "namespace": namespace, "shape": shape,
+                "count": 0, "total_ms": 0.0, "max_ms": 0.0, "documents": 0, "slow_count": 0,
+                "last_seen": None, "plan": None, "explain_pending": False,
+            }
+            while len(_QUERY_STATS) > _MAX_SHAPES:
+                _QUERY_STATS.popitem(last=False)
+        _QUERY_STATS.move_to_end(key)
+        stats["count"] += 1
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        stats["documents"] += n_documents
+        stats["last_seen"] = datetime.datetime.now()
+        is_slow = duration_ms >= _get_slow_query_ms()
+        if is_slow:
+            stats["slow_count"] += 1
+        explain = is_slow and command is not None and stats["plan"] is None and not stats["explain_pending"]
+        if explain:
+            stats["explain_pending"] = True
+    if explain:
+        _submit_explain(key, command)
+
+class QueryRecorder(monitoring.CommandListener):
+    """
+    Record the duration and returned documents of every command issued by the app, by query shape.
+    """
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        cursor_id = None
+        if event.command_name == "getMore":
+            cursor_id = event.command.get("getMore")
+            with _QUERY_STATS_LOCK:
+                key = _CURSORS.get(cursor_id)
+            command = None
+        else:
+            collection = event.command.get(event.command_name)
+            namespace = f"{event.database_name}.{collection}" if isinstance(collection, str) else event.database_name
+            shape = json.dumps(get_query_shape(_get_command_query(event.command_name, event.command)), sort_keys=True, default=str)
+            key = (_ACTION.get() or "Unlabelled", event.command_name, namespace, shape)
+            command = None
+            if event.command_name in EXPLAINABLE_COMMANDS:
+                command = {field: value for field, value in event.command.items() if field not in _DRIVER_FIELDS}
+                command["$db"] = event.database_name
+                # Write commands are explained with their first statement only
+                for statements in ("updates", "deletes"):
+                    if statements in command:
+                        command[statements] = command[statements][:1]
+        if key is not None:
+            _IN_FLIGHT[event.request_id] = (key, command, cursor_id)
+
+    def succeeded(self, event):
+        in_flight = _IN_FLIGHT.pop(event.request_id, None)
+        if in_flight is None:
+            return
+        key, command, cursor_id = in_flight
+        reply = event.reply or {}
+        cursor = reply.get("cursor")
+        if isinstance(cursor, dict):
+            with _QUERY_STATS_LOCK:
+                if cursor.get("id"):
+                    _CURSORS[cursor["id"]] = key
+                    while len(_CURSORS) > _MAX_CURSORS:
+                        _CURSORS.popitem(last=False)
+                elif cursor_id is not None:
+                    # The last batch of the cursor
+                    _CURSORS.pop(cursor_id, None)
+        _record(key, event.duration_micros / 1000, _count_documents(event.command_name, reply), command)
+
+    def failed(self, event):
+        in_flight = _IN_FLIGHT.pop(event.request_id, None)
+        if in_flight is not None:
+            _record(in_flight[0], event.duration_micros / 1000, 0, None)
+
+_RECORDER = QueryRecorder()
+
+def get_query_recorder() -> QueryRecorder:
+    """
+    Get the listener to pass to MongoClient(event_listeners=[...]).
+    """
+    return _RECORDER
+
+def register_explain_client(client: MongoClient) -> None:
+    """
+    Set the client the explain plans of slow queries are captured with.
+    """
+    global _EXPLAIN_CLIENT
+    _EXPLAIN_CLIENT = client
+
+def _find_values(document, field: str) -> list:
+    """
+    Find every value of a field in a nested explain output, e.g. the winning plans of the stages of a pipeline.
+    """
+    found = []
+    if isinstance(document, dict):
+        for key, value in document.items():
+            if key == field:
+                found.append(value)
+            else:
+                found.extend(_find_values(value, field))
+    elif isinstance(document, list):
+        for item in document:
+            found.extend(_find_values(item, field))
+    return found
+
+def summarize_plan(explain: dict) -> dict:
+    """
+    Summarize an explain("executionStats") output: the stages of the winning plan, the indexes used,
+    the keys and documents examined and the documents returned.
+    """
+    stages = [stage for plan in _find_values(explain, "winningPlan") for stage in _find_values(plan, "stage")]
+    indexes = sorted({name for plan in _find_values(explain, "winningPlan") for name in _find_values(plan, "indexName")})
+    execution_stats = _find_values(explain, "executionStats")
+    return {
+        "stages": stages,
+        "scan": "COLLSCAN" if "COLLSCAN" in stages else "IXSCAN" if "IXSCAN" in stages else (stages[-1] if stages else None),
+        "indexes": indexes,
+        "keys_examined": sum(stats.get("totalKeysExamined", 0) for stats in execution_stats),
+        "docs_examined": sum(stats.get("totalDocsExamined", 0) for stats in execution_stats),
+        "returned": sum(stats.get("nReturned", 0) for stats in execution_stats),
+        "execution_ms": sum(stats.get("executionTimeMillis", 0) for stats in execution_stats),
+        "explain": explain,
+        "captured_at": datetime.datetime.now(),
+    }
+
+def _run_explains() -> None:
+    while True:
+        key, command = _EXPLAIN_QUEUE.get()
+        plan = None
+        try:
+            if _EXPLAIN_CLIENT is not None:
+                db_name = command.pop("$db")
+                with query_action("Explain"):
+                    explain = _EXPLAIN_CLIENT[db_name].command("explain", command, verbosity="executionStats")
+                plan = summarize_plan(explain)
+        except Exception as e:
+            print(f"Failed to explain slow {key[1]} on '{key[2]}': {e}")
+            plan = {"error": str(e), "captured_at": datetime.datetime.now()}
+        finally:
+            with _QUERY_STATS_LOCK:
+                if key in _QUERY_STATS:
+                    _QUERY_STATS[key].update(plan=plan, explain_pending=False)
+            _EXPLAIN_QUEUE.task_done()
+
+def _submit_explain(key: tuple, command: dict) -> None:
+    """
+    Queue the explain of a slow command, so it never runs on the thread of the page.
+    """
+    global _EXPLAIN_WORKER
+    with _EXPLAIN_LOCK:
+        if _EXPLAIN_WORKER is None or not _EXPLAIN_WORKER.is_alive():
+            _EXPLAIN_WORKER = threading.Thread(target=_run_explains, name="mongo-explain", daemon=True)
+            _EXPLAIN_WORKER.start()
+    try:
+        _EXPLAIN_QUEUE.put_nowait((key, command))
+    except queue.Full:
+        with _QUERY_STATS_LOCK:
+            if key in _QUERY_STATS:
+                _QUERY_STATS[key]["explain_pending"] = False
+
+def get_slow_queries(limit: int = 50, order_by: str = "total_ms") -> list:
+    """
+    Get the query shapes with the highest cost.
+
+    Args:
+        limit: The maximum number of shapes
+        order_by: "total_ms", "max_ms", "count" or "slow_count"
+
+    Returns:
+        list: The stats of each shape with its average duration and captured plan, most expensive first
+    """
+    with _QUERY_STATS_LOCK:
+        shapes = [dict(stats) for stats in _QUERY_STATS.values()]
+    for stats in shapes:
+        stats["avg_ms"] = stats["total_ms"] / stats["count"] if stats["count"] else 0.0
+    return sorted(shapes, key=lambda stats: stats[order_by], reverse=True)[:limit]
+
+def reset_query_log() -> None:
+    """
+    Drop the recorded stats and plans.
+    """
+    with _QUERY_STATS_LOCK:
+        _QUERY_STATS.clear()
+        _CURSORS.clear()
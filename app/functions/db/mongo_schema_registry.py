@@ -0,0 +1,167 @@
+import datetime
+from collections import Counter
+from pymongo.mongo_client import MongoClient
+from functions.db.storage_backend import StorageBackend
+
+# One document per collection of the same database: {_id: collection name, fields: {field: type}, source, _updated_at}.
+# The functions take the MongoDB client, or the StorageBackend when the app runs on the embedded SQLite backend.
+SCHEMA_COLLECTION = "_schemas"
+FIELD_TYPES = ["String", "Integer", "Float", "Boolean", "Date", "Datetime"]
+SCHEMA_SOURCES = ["form", "sample"]
+
+def get_value_field_type(value) -> str | None:
+    """
+    Get the field type of a value read from MongoDB, or None for null and unsupported values.
+    """
+    # bool is a subclass of int, so it is checked first
+    if isinstance(value, bool):
+        return "Boolean"
+    if isinstance(value, int):
+        return "Integer"
+    if isinstance(value, float):
+        return "Float"
+    if isinstance(value, datetime.datetime):
+        return "Date" if value.time() == datetime.time(0) else "Datetime"
+    if isinstance(value, datetime.date):
+        return "Date"
+    if isinstance(value, str):
+        return "String"
+    return None
+
+def _sample_documents(client: MongoClient | StorageBackend, db_name: str, collection_name: str, sample_size: int):
+    if isinstance(client, StorageBackend):
+        # The embedded backend has no $sample, the first documents of the collection are sampled
+        return client.find(db_name, collection_name, limit=sample_size)
+    return client[db_name][collection_name].aggregate([{"$sample": {"size": sample_size}}])
+
+def _find_schema_document(client: MongoClient | StorageBackend, db_name: str, query: dict) -> dict | None:
+    if isinstance(client, StorageBackend):
+        documents = client.find(db_name, SCHEMA_COLLECTION, query, limit=1)
+        return documents[0] if documents else None
+    return client[db_name][SCHEMA_COLLECTION].find_one(query)
+
+def infer_schema(client: MongoClient | StorageBackend, db_name: str, collection_name: str, sample_size: int = 500) -> dict:
+    """
+    Infer the field types of a collection from a random sample of its documents.
+    Each field gets the type most of its sampled values have, and dates mixed with datetimes are typed
+    as Datetime. Numbers are always typed as Float: a sample of whole amounts (common for HKD or JPY)
+    does not mean the field holds integers only, and an Integer type would truncate the fractions.
+
+    Args:
+        client: The MongoDB client or the storage backend
+        db_name: The name of the database
+        collection_name: The name of the collection
+        sample_size: The number of documents to sample with $sample
+
+    Returns:
+        dict: The field types keyed by field name, empty if the collection has no documents
+    """
+    counts = {}
+    for document in _sample_documents(client, db_name, collection_name, sample_size):
+        for field, value in document.items():
+            field_type = get_value_field_type(value)
+            if field != "_id" and field_type:
+                counts.setdefault(field, Counter())[field_type] += 1
+
+    fields = {}
+    for field, type_counts in counts.items():
+        if "Integer" in type_counts:
+            type_counts["Float"] += type_counts.pop("Integer")
+        if "Date" in type_counts and "Datetime" in type_counts:
+            type_counts["Datetime"] += type_counts.pop("Date")
+        fields[field] = type_counts.most_common(1)[0][0]
+    return fields
+
+def _sample_fields(fields: dict) -> dict:
+    # Schemas sampled by earlier versions may type numbers as Integer, which would truncate the fractions
+    return {field: "Float" if field_type == "Integer" else field_type for field, field_type in fields.items()}
+
+def get_schema(client: MongoClient | StorageBackend, db_name: str, collection_name: str, source: str | None = None) -> dict | None:
+    """
+    Get the registered field types of a collection, or None if the collection has no schema
+    (or no schema made from the given source).
+    """
+    query = {"_id": collection_name}
+    if source is not None:
+        query["source"] = source
+    document = _find_schema_document(client, db_name, query)
+    if document is None:
+        return None
+    return _sample_fields(document["fields"]) if document.get("source") == "sample" else document["fields"]
+
+def save_schema(client: MongoClient | StorageBackend, db_name: str, collection_name: str, fields: dict, source: str = "form") -> dict:
+    """
+    Register the field types of a collection, replacing its previous schema.
+
+    Args:
+        client: The MongoDB client or the storage backend
+        db_name: The name of the database
+        collection_name: The name of the collection
+        fields: The field types keyed by field name, each one of FIELD_TYPES
+        source: How the schema was made, "form" or "sample"; a "sample" schema never replaces a "form" one
+
+    Returns:
+        dict: The registered field types, or None if a sampled schema was not saved over a form schema
+    """
+    from pymongo.errors import DuplicateKeyError
+    invalid = {field: field_type for field, field_type in fields.items() if field_type not in FIELD_TYPES}
+    if invalid:
+        raise ValueError(f"Unsupported field types: {invalid}. Use one of {', '.join(FIELD_TYPES)}.")
+    if source not in SCHEMA_SOURCES:
+        raise ValueError(f"Unsupported schema source: {source}. Use one of {', '.join(SCHEMA_SOURCES)}.")
+    if source == "sample":
+        fields = _sample_fields(fields)
+    document = {"fields": fields, "source": source, "_updated_at": datetime.datetime.now()}
+    if isinstance(client, StorageBackend):
+        # The embedded backend has no conditional upsert, so the previous schema is read first
+        previous = _find_schema_document(client, db_name, {"_id": collection_name})
+        if source == "sample" and previous is not None and previous.get("source") == "form":
+            print(f"Schema of '{db_name}.{collection_name}' not sampled: it has a schema from the form.")
+            return None
+        if previous is None:
+            client.insert_one(db_name, SCHEMA_COLLECTION, {"_id": collection_name, **document})
+        else:
+            client.update_many(db_name, SCHEMA_COLLECTION, {collection_name: document})
+    elif source == "form":
+        client[db_name][SCHEMA_COLLECTION].replace_one({"_id": collection_name}, document, upsert=True)
+    else:
+        try:
+            # A form schema saved while the sample was taken is kept: the filter does not match it,
+            # and the upsert then fails on its _id
+            client[db_name][SCHEMA_COLLECTION].replace_one({"_id": collection_name, "source": {"$ne": "form"}}, document, upsert=True)
+        except DuplicateKeyError:
+            print(f"Schema of '{db_name}.{collection_name}' not sampled: it has a schema from the form.")
+            return None
+    print(f"Schema of '{db_name}.{collection_name}' saved from {source} with {len(fields)} field(s).")
+    return fields
+
+def get_or_infer_schema(client: MongoClient | StorageBackend, db_name: str, collection_name: str, sample_size: int = 500) -> dict | None:
+    """
+    Get the registered field types of a collection, or infer them once from a sample and register them
+    for a collection without a schema. The sampled schema is kept until it is refreshed with
+    refresh_schema or replaced from the schema form, so writes do not cause new samples.
+
+    Returns:
+        dict: The field types keyed by field name, or None if the collection has no schema and no documents
+    """
+    fields = get_schema(client, db_name, collection_name)
+    if fields is not None:
+        return fields
+    fields = infer_schema(client, db_name, collection_name, sample_size=sample_size)
+    if not fields:
+        # An empty collection is sampled again on the next read
+        return None
+    return save_schema(client, db_name, collection_name, fields, source="sample") or get_schema(client, db_name, collection_name)
+
+def refresh_schema(client: MongoClient | StorageBackend, db_name: str, collection_name: str, sample_size: int = 500) -> dict | None:
+    """
+    Infer the field types of a collection from a new sample and register them, e.g. after its fields changed.
+    A schema from the form takes precedence and is kept.
+
+    Returns:
+        dict: The registered field types, or None if the collection has no schema and no documents
+    """
+    fields = infer_schema(client, db_name, collection_name, sample_size=sample_size)
+    if not fields:
+        return get_schema(client, db_name, collection_name)
+    return save_schema(client, db_name, collection_name, fields, source="sample") or get_schema(client, db_name, collection_name)
@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+
+# Materialized query results shared by every session of the process: {key: (collection version, result)}.
+# Each write to a collection bumps its version, which turns every cached result of that collection into a miss.
+_RESULT_CACHE = OrderedDict()
+_COLLECTION_VERSIONS = {}
+_CACHE_STATS = {"hits": 0, "misses": 0, "invalidations": 0, "stale_hits": 0}
+_CACHE_LOCK = threading.Lock()
+
+def freeze(value):
+    """
+    Convert queries, projections, sort specifications and update documents to a hashable form.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def _get_max_entries() -> int:
+    from functions.utils import _get_setting
+    return int(_get_setting("app", "query_cache_size", 128))
+
+def make_query_key(db_name: str, collection_name: str, query: dict | None = None, projection: dict | None = None, sort: list | None = None, **extra) -> tuple:
+    """
+    Build the cache key of a read from its database, collection, filter, projection and sort.
+    Any other argument that changes the result (e.g. page size or cursor) is passed as a keyword.
+    """
+    return (db_name, collection_name, freeze(query), freeze(projection), freeze(sort), freeze(extra))
+
+def get_collection_version(db_name: str, collection_name: str) -> int:
+    """
+    Get the current version of a collection, which changes on every write through the app.
+    """
+    with _CACHE_LOCK:
+        return _COLLECTION_VERSIONS.get((db_name, collection_name), 0)
+
+def bump_collection_version(db_name: str, collection_name: str) -> int:
+    """
+    Invalidate the cached results of a collection after a write.
+    """
+    with _CACHE_LOCK:
+        version = _COLLECTION_VERSIONS.get((db_name, collection_name), 0) + 1
+        _COLLECTION_VERSIONS[(db_name, collection_name)] = version
+        _CACHE_STATS["invalidations"] += 1
+    return version
+
+def get_or_compute(key: tuple, compute):
+    """
+    Get a cached result, or compute and cache it on a miss.
+    The cached result is shared, so callers must not modify it in place.
+
+    Args:
+        key: The cache key built with make_query_key
+        compute: Function without arguments that reads the result from the database
+    """
+    db_name, collection_name = key[0], key[1]
+    version = get_collection_version(db_name, collection_name)
+    with _CACHE_LOCK:
+        entry = _RESULT_CACHE.get(key)
+        if entry is not None and entry[0] == version:
+            _CACHE_STATS["hits"] += 1
+            _RESULT_CACHE.move_to_end(key)
+            return entry[1]
+        _CACHE_STATS["misses"] += 1
+
+    result = compute()
+
+    max_entries = _get_max_entries()
+    with _CACHE_LOCK:
+        _RESULT_CACHE[key] = (version, result)
+        _RESULT_CACHE.move_to_end(key)
+        while len(_RESULT_CACHE) > max_entries:
+            _RESULT_CACHE.popitem(last=False)
+    return result
+
+def get_stale_result(key: tuple, default=None):
+    """
+    Get the last cached result of a read even if the collection was written since,
+    for pages that are served while the database is unreachable.
+
+    Args:
+        key: The cache key built with make_query_key
+        default: The value returned when the read was never cached
+    """
+    with _CACHE_LOCK:
+        entry = _RESULT_CACHE.get(key)
+        if entry is None:
+            return default
+        _CACHE_STATS["stale_hits"] += 1
+        return entry[1]
+
+def clear_query_cache() -> None:
+    """
+    Drop every cached result and reset the counters.
+    """
+    with _CACHE_LOCK:
+        _RESULT_CACHE.clear()
+        for name in _CACHE_STATS:
+            _CACHE_STATS[name] = 0
+
+def get_cache_stats() -> dict:
+    """
+    Get the hit/miss counters of the query result cache.
+    """
+    with _CACHE_LOCK:
+        stats = dict(_CACHE_STATS)
+        stats["entries"] = len(_RESULT_CACHE)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
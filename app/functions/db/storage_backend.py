@@ -0,0 +1,469 @@
+import base64
+import datetime
+import json
+import math
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pymongo.mongo_client import MongoClient
+
+# Fields of the transactions kept in their own indexed columns by the SQLite backend, the rest of a document is JSON
+SQLITE_COLUMNS = ("date", "from_curr", "to_curr")
+_SQLITE_BACKENDS = {}
+_SQLITE_BACKENDS_LOCK = threading.Lock()
+
+class StorageBackend(ABC):
+    """
+    The storage operations of the app: catalog listing, CRUD, bulk writes and keyset-paginated reads.
+    Queries, projections and sorts are MongoDB filter documents, of which the SQLite backend supports
+    comparisons, $in/$nin, $exists and $and/$or/$nor.
+    """
+    @abstractmethod
+    def list_databases(self) -> list:
+        """
+        Get the names of the databases.
+        """
+
+    @abstractmethod
+    def list_collections(self, db_name: str) -> list:
+        """
+        Get the names of the collections of a database.
+        """
+
+    @abstractmethod
+    def create_collection(self, db_name: str, collection_name: str) -> None:
+        """
+        Create a collection if it does not exist.
+        """
+
+    @abstractmethod
+    def insert_one(self, db_name: str, collection_name: str, document: dict):
+        """
+        Insert a document and return its _id.
+        """
+
+    @abstractmethod
+    def insert_many(self, db_name: str, collection_name: str, documents: list) -> dict:
+        """
+        Insert documents, continuing past the ones that fail.
+
+        Returns:
+            dict: The number of documents requested ("total") and inserted ("success"), and the failed documents
+                  with their error ("failures"), as returned by execute_batch
+        """
+
+    @abstractmethod
+    def find(self, db_name: str, collection_name: str, query: dict | None = None, projection: dict | None = None, sort: list | None = None, limit: int = 0) -> list:
+        """
+        Get the documents matching a query, optionally sorted by a list of (field, direction) and limited.
+        """
+
+    @abstractmethod
+    def count(self, db_name: str, collection_name: str, query: dict | None = None) -> int:
+        """
+        Get the number of documents matching a query.
+        """
+
+    @abstractmethod
+    def update_many(self, db_name: str, collection_name: str, updates: dict) -> dict:
+        """
+        Set the changed fields of documents.
+
+        Args:
+            updates: A dict mapping document _ids to their changed fields
+
+        Returns:
+            dict: The number of documents requested ("total"), matched ("success") and modified ("modified"),
+                  and the failed documents ("failures")
+        """
+
+    @abstractmethod
+    def delete_many(self, db_name: str, collection_name: str, doc_ids: list) -> int:
+        """
+        Delete documents by _id and return the number deleted.
+        """
+
+    def get_page(self, db_name: str, collection_name: str, page_size: int = 50, after: dict | None = None, sort_field: str = "date", query: dict | None = None, projection: dict | None = None) -> tuple[list, dict | None]:
+        """
+        Get one page of documents sorted by sort_field and _id in descending order, see get_collection_page.
+
+        Returns:
+            tuple: The documents of the page and the cursor for the next page (None if this is the last page)
+        """
+        from functions.db.mongo_collection_management import _get_page_key, _get_seek_query, require_fields
+        filters = [query] if query else []
+        if after is not None:
+            filters.append(_get_seek_query(after, sort_field))
+        page_query = {} if not filters else filters[0] if len(filters) == 1 else {"$and": filters}
+        # Fetch one extra document to know whether there is a next page
+        data = self.find(db_name, collection_name, page_query, require_fields(projection, (sort_field, "_id")), sort=[(sort_field, -1), ("_id", -1)], limit=page_size + 1)
+        if len(data) > page_size:
+            data = data[:page_size]
+            return data, _get_page_key(data[-1], sort_field)
+        return data, None
+
+    def close(self) -> None:
+        """
+        Release the connection of the backend.
+        """
+
+class MongoBackend(StorageBackend):
+    """
+    The storage backend of a MongoDB server, through the shared client.
+    """
+    def __init__(self, client: MongoClient):
+        self.client = client
+
+    def list_databases(self) -> list:
+        from functions.db.mongo_collection_management import get_all_databases
+        return get_all_databases(self.client)
+
+    def list_collections(self, db_name: str) -> list:
+        from functions.db.mongo_collection_management import get_all_collections
+        return get_all_collections(self.client, db_name)
+
+    def create_collection(self, db_name: str, collection_name: str) -> None:
+        from functions.db.mongo_collection_management import create_collection
+        create_collection(self.client, db_name, collection_name)
+
+    def insert_one(self, db_name: str, collection_name: str, document: dict):
+        return self.client[db_name][collection_name].insert_one(document).inserted_id
+
+    def insert_many(self, db_name: str, collection_name: str, documents: list) -> dict:
+        from functions.db.mongo_batch import execute_batch
+        return execute_batch(self.client, db_name, collection_name, "insert", documents)
+
+    def find(self, db_name: str, collection_name: str, query: dict | None = None, projection: dict | None = None, sort: list | None = None, limit: int = 0) -> list:
+        cursor = self.client[db_name][collection_name].find(query or {}, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        return list(cursor.limit(limit))
+
+    def count(self, db_name: str, collection_name: str, query: dict | None = None) -> int:
+        if not query:
+            return self.client[db_name][collection_name].estimated_document_count()
+        return self.client[db_name][collection_name].count_documents(query)
+
+    def update_many(self, db_name: str, collection_name: str, updates: dict) -> dict:
+        from functions.db.mongo_batch import execute_batch
+        return execute_batch(self.client, db_name, collection_name, "update", updates)
+
+    def delete_many(self, db_name: str, collection_name: str, doc_ids: list) -> int:
+        return self.client[db_name][collection_name].delete_many({"_id": {"$in": list(doc_ids)}}).deleted_count
+
+def _encode(value):
+    """
+    Convert a value to JSON, tagging the BSON types that JSON does not have like extended JSON does.
+    """
+    from bson import ObjectId
+    if isinstance(value, dict):
+        return {str(key): _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, datetime.datetime):
+        return {"$date": value.isoformat(timespec="microseconds")}
+    if isinstance(value, datetime.date):
+        return {"$date": datetime.datetime.combine(value, datetime.time()).isoformat(timespec="microseconds")}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, bytes):
+        # e.g. the bcrypt hashes of the users
+        return {"$binary": base64.b64encode(value).decode("ascii")}
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        # numpy scalars
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def _decode_object(value: dict):
+    from bson import ObjectId
+    if len(value) == 1 and "$date" in value:
+        return datetime.datetime.fromisoformat(value["$date"])
+    if len(value) == 1 and "$oid" in value:
+        return ObjectId(value["$oid"])
+    if len(value) == 1 and "$binary" in value:
+        return base64.b64decode(value["$binary"])
+    return value
+
+def _encode_id(doc_id) -> str:
+    # The _id column holds the JSON of the id, so string ids and ObjectIds do not collide
+    return json.dumps(_encode(doc_id), sort_keys=True)
+
+def _column_value(value):
+    """
+    Get the value of an indexed column: dates as ISO strings, which sort like the dates.
+    """
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ", timespec="microseconds")
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time()).isoformat(sep=" ", timespec="microseconds")
+    return _encode(value)
+
+def _apply_projection(document: dict, projection: dict | None) -> dict:
+    if not projection:
+        return document
+    inclusion = any(value for field, value in projection.items() if field != "_id")
+    if inclusion:
+        projected = {field: document[field] for field, value in projection.items() if value and field in document}
+        if projection.get("_id", 1) and "_id" in document:
+            projected["_id"] = document["_id"]
+        return projected
+    return {field: value for field, value in document.items() if projection.get(field, 1)}
+
+class SQLiteBackend(StorageBackend):
+    """
+    An embedded storage backend in a single SQLite file, for running the app without a MongoDB server.
+    Each collection is a table "{db}.{collection}" with the _id, the indexed date and currency columns and the
+    whole document as JSON; other fields are queried with json_extract.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        # Streamlit reruns and the async reads use several threads, the connection is shared behind a lock
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.lock = threading.RLock()
+        self.tables = set()
+
+    @staticmethod
+    def _table_name(db_name: str, collection_name: str) -> str:
+        return f"{db_name}.{collection_name}"
+
+    def _table(self, db_name: str, collection_name: str) -> str:
+        """
+        Get the quoted name of the table of a collection, creating the table and its indexes on first use.
+        """
+        name = self._table_name(db_name, collection_name)
+        quoted = '"' + name.replace('"', '""') + '"'
+        index_prefix = name.replace('"', "")
+        if name not in self.tables:
+            with self.lock:
+                self.connection.execute(f"CREATE TABLE IF NOT EXISTS {quoted} (_id TEXT PRIMARY KEY, date TEXT, from_curr TEXT, to_curr TEXT, doc TEXT NOT NULL)")
+                # The same keys as the date_id and from_curr_to_curr_date indexes of the MongoDB registry
+                self.connection.execute(f'CREATE INDEX IF NOT EXISTS "{index_prefix}_date_id" ON {quoted} (date DESC, _id DESC)')
+                self.connection.execute(f'CREATE INDEX IF NOT EXISTS "{index_prefix}_from_curr_to_curr_date" ON {quoted} (from_curr, to_curr, date DESC)')
+                self.tables.add(name)
+        return quoted
+
+    def _field(self, field: str, value=None) -> tuple[str, list, object]:
+        """
+        Get the SQL expression of a field, the parameters of the expression and the value to compare it with.
+        JSON paths are bound as parameters, so field names (which come from schemas and CSV headers) never
+        become part of the SQL.
+        """
+        if field == "_id":
+            return "_id", [], _encode_id(value) if value is not None else None
+        if field in SQLITE_COLUMNS:
+            return field, [], _column_value(value)
+        path = "$" + "".join('."' + part.replace('"', '\\"') + '"' for part in field.split("."))
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            # Dates are stored as {"$date": iso}, which sort like the dates within the same format
+            return "json_extract(doc, ?)", [f'{path}."$date"'], _encode(value)["$date"]
+        return "json_extract(doc, ?)", [path], _encode(value)
+
+    def _condition(self, field: str, condition) -> tuple[str, list]:
+        operators = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+        if not (isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition)):
+            condition = {"$eq": condition}
+        # The parameters of each clause are listed in the order their placeholders appear in it
+        clauses, params = [], []
+        for operator, value in condition.items():
+            if operator in ("$in", "$nin"):
+                values = list(value)
+                expression, expression_params = self._field(field, next((item for item in values if item is not None), None))[:2]
+                encoded = [self._field(field, item)[2] for item in values if item is not None]
+                clause, clause_params = (f"{expression} IN ({', '.join('?' * len(encoded))})", expression_params + encoded) if encoded else ("0", [])
+                if None in values:
+                    clause, clause_params = f"({clause} OR {expression} IS NULL)", clause_params + expression_params
+                if operator == "$nin":
+                    if None in values:
+                        clause = f"NOT {clause}"
+                    else:
+                        clause, clause_params = f"({expression} IS NULL OR NOT {clause})", expression_params + clause_params
+                clauses.append(clause)
+                params.extend(clause_params)
+            elif operator == "$exists":
+                expression, expression_params, _ = self._field(field)
+                clauses.append(f"{expression} IS {'NOT ' if value else ''}NULL")
+                params.extend(expression_params)
+            elif operator in operators:
+                expression, expression_params, encoded = self._field(field, value)
+                if value is None:
+                    clauses.append(f"{expression} IS {'NOT ' if operator == '$ne' else ''}NULL")
+                    params.extend(expression_params)
+                elif operator == "$ne":
+                    clauses.append(f"({expression} IS NULL OR {expression} != ?)")
+                    params.extend(expression_params + expression_params + [encoded])
+                else:
+                    clauses.append(f"{expression} {operators[operator]} ?")
+                    params.extend(expression_params + [encoded])
+            else:
+                raise ValueError(f"Unsupported query operator for the SQLite backend: {operator}")
+        return " AND ".join(clauses), params
+
+    def _where(self, query: dict | None) -> tuple[str, list]:
+        """
+        Translate a MongoDB filter to a SQL condition and its parameters.
+        """
+        if not query:
+            return "1", []
+        clauses, params = [], []
+        for key, value in query.items():
+            if key in ("$and", "$or", "$nor"):
+                parts = [self._where(part) for part in value]
+                joined = (" AND " if key == "$and" else " OR ").join(f"({clause})" for clause, _ in parts) or "1"
+                clauses.append(f"NOT ({joined})" if key == "$nor" else f"({joined})")
+                for _, part_params in parts:
+                    params.extend(part_params)
+            elif key.startswith("$"):
+                raise ValueError(f"Unsupported query operator for the SQLite backend: {key}")
+            else:
+                clause, clause_params = self._condition(key, value)
+                clauses.append(clause)
+                params.extend(clause_params)
+        return " AND ".join(clauses), params
+
+    def _row(self, document: dict) -> tuple:
+        return (
+            _encode_id(document["_id"]),
+            *(_column_value(document.get(field)) for field in SQLITE_COLUMNS),
+            json.dumps(_encode(document)),
+        )
+
+    def list_databases(self) -> list:
+        with self.lock:
+            tables = [row[0] for row in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%.%'")]
+        return sorted({table.split(".", 1)[0] for table in tables})
+
+    def list_collections(self, db_name: str) -> list:
+        with self.lock:
+            tables = [row[0] for row in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%.%'")]
+        return sorted(table.split(".", 1)[1] for table in tables if table.split(".", 1)[0] == db_name)
+
+    def create_collection(self, db_name: str, collection_name: str) -> None:
+        self._table(db_name, collection_name)
+
+    def insert_one(self, db_name: str, collection_name: str, document: dict):
+        import uuid
+        document.setdefault("_id", str(uuid.uuid4()))
+        table = self._table(db_name, collection_name)
+        with self.lock:
+            self.connection.execute(f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?)", self._row(document))
+        return document["_id"]
+
+    def insert_many(self, db_name: str, collection_name: str, documents: list) -> dict:
+        import uuid
+        from functions.db.mongo_batch import DUPLICATE_KEY_ERROR
+        table = self._table(db_name, collection_name)
+        result = {"operation": "insert", "total": len(documents), "success": 0, "errors": 0, "failures": []}
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                for document in documents:
+                    document.setdefault("_id", str(uuid.uuid4()))
+                    try:
+                        self.connection.execute(f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?)", self._row(document))
+                        result["success"] += 1
+                    except sqlite3.IntegrityError as e:
+                        result["failures"].append({"target": document["_id"], "code": DUPLICATE_KEY_ERROR, "error": str(e)})
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        result["errors"] = len(result["failures"])
+        return result
+
+    def find(self, db_name: str, collection_name: str, query: dict | None = None, projection: dict | None = None, sort: list | None = None, limit: int = 0) -> list:
+        table = self._table(db_name, collection_name)
+        where, params = self._where(query)
+        sql = f"SELECT doc FROM {table} WHERE {where}"
+        if sort:
+            sort = [(sort, 1)] if isinstance(sort, str) else sort
+            orders = []
+            for field, direction in sort:
+                expression, expression_params, _ = self._field(field)
+                orders.append(f"{expression} {'DESC' if direction < 0 else 'ASC'}")
+                params = params + expression_params
+            sql += " ORDER BY " + ", ".join(orders)
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        return [_apply_projection(json.loads(row[0], object_hook=_decode_object), projection) for row in rows]
+
+    def count(self, db_name: str, collection_name: str, query: dict | None = None) -> int:
+        table = self._table(db_name, collection_name)
+        where, params = self._where(query)
+        with self.lock:
+            return self.connection.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+
+    def update_many(self, db_name: str, collection_name: str, updates: dict) -> dict:
+        table = self._table(db_name, collection_name)
+        result = {"operation": "update", "total": len(updates), "success": 0, "modified": 0, "errors": 0, "failures": []}
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                for doc_id, changes in updates.items():
+                    row = self.connection.execute(f"SELECT doc FROM {table} WHERE _id = ?", (_encode_id(doc_id),)).fetchone()
+                    if row is None:
+                        continue
+                    result["success"] += 1
+                    document = json.loads(row[0], object_hook=_decode_object)
+                    updated = {**document, **changes}
+                    if _encode(updated) != _encode(document):
+                        self.connection.execute(f"UPDATE {table} SET _id = ?, date = ?, from_curr = ?, to_curr = ?, doc = ? WHERE _id = ?", (*self._row(updated), _encode_id(doc_id)))
+                        result["modified"] += 1
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return result
+
+    def delete_many(self, db_name: str, collection_name: str, doc_ids: list) -> int:
+        table = self._table(db_name, collection_name)
+        encoded = [_encode_id(doc_id) for doc_id in doc_ids]
+        deleted = 0
+        with self.lock:
+            # SQLite limits the number of parameters of a statement
+            for start in range(0, len(encoded), 500):
+                chunk = encoded[start:start + 500]
+                deleted += self.connection.execute(f"DELETE FROM {table} WHERE _id IN ({', '.join('?' * len(chunk))})", chunk).rowcount
+        return deleted
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+def get_sqlite_backend(path: str | None = None) -> SQLiteBackend:
+    """
+    Get the SQLite backend of a file, opened once per process. The path defaults to storage.sqlite_path.
+    """
+    import os
+    from functions.utils import _get_setting
+    path = path or _get_setting("storage", "sqlite_path", os.path.join("data", "currency_exchange.sqlite3"))
+    with _SQLITE_BACKENDS_LOCK:
+        if path not in _SQLITE_BACKENDS:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            _SQLITE_BACKENDS[path] = SQLiteBackend(path)
+        return _SQLITE_BACKENDS[path]
+
+def get_storage_backend(client: MongoClient | None = None) -> StorageBackend | None:
+    """
+    Get the storage backend chosen with storage.backend: "mongo" (default) for the shared MongoDB client,
+    or "sqlite" for the embedded file at storage.sqlite_path.
+
+    Returns:
+        StorageBackend: The backend, or None if MongoDB is chosen and cannot be reached
+    """
+    from functions.utils import _get_setting
+    backend = _get_setting("storage", "backend", "mongo")
+    if backend == "sqlite":
+        return get_sqlite_backend()
+    if backend != "mongo":
+        raise ValueError(f"Unsupported storage backend: {backend}. Use 'mongo' or 'sqlite'.")
+    if client is None:
+        from functions.db.mongo_connection import get_shared_mongo_client
+        client = get_shared_mongo_client()
+    return MongoBackend(client) if client is not None else None
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import pandas as pd
+
+# Local copies of the delta sync are saved to disk as Parquet, with a JSON sidecar holding the watermarks:
+# {dir}/{hash of the sync key}.parquet and .json. After a restart, the first sync reads
+# the Parquet file memory-mapped and only fetches the changes since the watermark, instead of the whole collection.
+SNAPSHOT_FORMAT = 3
+
+def _get_snapshot_dir() -> str:
+    from functions.utils import _get_data_dir
+    return _get_data_dir("sync")
+
+def _get_snapshot_paths(key: tuple, snapshot_dir: str | None = None) -> tuple[str, str]:
+    name = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+    snapshot_dir = snapshot_dir or _get_snapshot_dir()
+    return os.path.join(snapshot_dir, f"{name}.parquet"), os.path.join(snapshot_dir, f"{name}.json")
+
+def _get_id_type(ids: pd.Series) -> str | None:
+    """
+    Get the type of the _ids of a copy: "ObjectId", "str" or "int", or None if they are mixed.
+    Parquet stores ObjectIds as strings, so the type is kept to restore them.
+    """
+    from bson import ObjectId
+    for id_type, types in (("ObjectId", ObjectId), ("str", str), ("int", int)):
+        if all(isinstance(doc_id, types) for doc_id in ids):
+            return id_type
+    return None
+
+def save_sync_snapshot(key: tuple, data: pd.DataFrame, watermark, tombstone_watermark, tombstones_read_at=None, snapshot_dir: str | None = None) -> bool:
+    """
+    Save the local copy of a synced collection and its watermarks, replacing the previous snapshot atomically.
+
+    Args:
+        key: The key of the sync state: (db, collection, query, projection)
+        data: The synced documents
+        watermark: The latest _updated_at of the documents
+        tombstone_watermark: The latest _deleted_at of the applied tombstones
+        tombstones_read_at: When the tombstones were last read, to know whether some may have expired since
+        snapshot_dir: The directory of the snapshots, defaults to the sync directory of app.data_dir
+
+    Returns:
+        bool: True if the snapshot was saved, False if the documents cannot be stored as Parquet
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from bson import json_util
+    from functions.db.mongo_export import documents_to_table
+    id_type = _get_id_type(data["_id"]) if not data.empty else "str"
+    if id_type is None:
+        print(f"Sync snapshot of '{key[0]}.{key[1]}' skipped: the _ids have mixed types.")
+        return False
+    try:
+        # Missing fields are NaN in the DataFrame and left out of the documents, so each column keeps a single type
+        records = [
+            {field: value for field, value in row.items() if not (pd.api.types.is_scalar(value) and pd.isna(value))}
+            for row in data.to_dict(orient="records")
+        ]
+        table = documents_to_table(records)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        print(f"Sync snapshot of '{key[0]}.{key[1]}' skipped: {e}")
+        return False
+    data_path, state_path = _get_snapshot_paths(key, snapshot_dir)
+    pq.write_table(table, f"{data_path}.tmp")
+    sidecar = {
+        "format": SNAPSHOT_FORMAT, "key": repr(key), "database": key[0], "collection": key[1], "id_type": id_type, "rows": len(data),
+        "watermark": watermark, "tombstone_watermark": tombstone_watermark, "tombstones_read_at": tombstones_read_at,
+    }
+    with open(f"{state_path}.tmp", "w", encoding="utf-8") as file:
+        file.write(json_util.dumps(sidecar))
+    # The data is replaced before its sidecar: a crash in between leaves newer data with older watermarks,
+    # which the next sync catches up on, and never older data with newer watermarks
+    os.replace(f"{data_path}.tmp", data_path)
+    os.replace(f"{state_path}.tmp", state_path)
+    return True
+
+def load_sync_snapshot(key: tuple, snapshot_dir: str | None = None) -> dict | None:
+    """
+    Load the saved local copy of a synced collection, memory-mapping the Parquet file.
+
+    Returns:
+        dict: The documents ("data") and the watermarks, in the fields of the sync state,
+              or None if there is no usable snapshot
+    """
+    import pyarrow.parquet as pq
+    from bson import ObjectId, json_util
+    from bson.json_util import JSONOptions
+    data_path, state_path = _get_snapshot_paths(key, snapshot_dir)
+    if not (os.path.exists(data_path) and os.path.exists(state_path)):
+        return None
+    try:
+        with open(state_path, "r", encoding="utf-8") as file:
+            # The watermarks are compared with the naive datetimes returned by the driver
+            sidecar = json_util.loads(file.read(), json_options=JSONOptions(tz_aware=False))
+        if sidecar.get("format") != SNAPSHOT_FORMAT or sidecar.get("key") != repr(key):
+            return None
+        data = pq.read_table(data_path, memory_map=True).to_pandas()
+    except Exception as e:
+        print(f"Failed to load the sync snapshot of '{key[0]}.{key[1]}', reloading it in full: {e}")
+        return None
+    if sidecar["id_type"] == "ObjectId" and not data.empty:
+        data["_id"] = [ObjectId(doc_id) for doc_id in data["_id"]]
+    return {
+        "data": data,
+        "watermark": sidecar["watermark"],
+        "tombstone_watermark": sidecar["tombstone_watermark"],
+        "tombstones_read_at": sidecar["tombstones_read_at"],
+    }
+
+def delete_sync_snapshot(key: tuple, snapshot_dir: str | None = None) -> None:
+    """
+    Delete the saved copy of one sync state.
+    """
+    for path in _get_snapshot_paths(key, snapshot_dir):
+        if os.path.exists(path):
+            os.remove(path)
+
+def delete_sync_snapshots(db_name: str, collection_name: str, snapshot_dir: str | None = None) -> None:
+    """
+    Delete the saved copies of a collection, so the next sync after a restart reloads it in full.
+    """
+    snapshot_dir = snapshot_dir or _get_snapshot_dir()
+    for file_name in os.listdir(snapshot_dir):
+        if not file_name.endswith(".json"):
+            continue
+        state_path = os.path.join(snapshot_dir, file_name)
+        try:
+            with open(state_path, "r", encoding="utf-8") as file:
+                sidecar = json.load(file)
+        except (OSError, ValueError):
+            continue
+        if (sidecar.get("database"), sidecar.get("collection")) == (db_name, collection_name):
+            for path in (state_path, state_path[:-len(".json")] + ".parquet"):
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,205 @@
+import atexit
+import datetime
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pymongo.mongo_client import MongoClient
+
+# Inserts submitted in write-behind mode wait in a bounded in-process queue, and a single background
+# worker coalesces them into batches. The status of each job is kept for the status view.
+_QUEUE = None
+_WORKER = None
+_WORKER_LOCK = threading.Lock()
+_JOBS = OrderedDict()
+_JOBS_LOCK = threading.Lock()
+_MAX_FINISHED_JOBS = 500
+
+def _get_write_behind_settings() -> dict:
+    from functions.utils import _get_setting
+    return {
+        "queue_size": int(_get_setting("app", "write_behind_queue_size", 1000)),
+        "batch_size": int(_get_setting("app", "write_behind_batch_size", 500)),
+        "linger": float(_get_setting("app", "write_behind_linger", 0.05)),
+        "flush_timeout": float(_get_setting("app", "write_behind_flush_timeout", 30)),
+    }
+
+def _get_queue() -> queue.Queue:
+    """
+    Get the job queue, starting the worker thread on first use.
+    """
+    global _QUEUE, _WORKER
+    with _WORKER_LOCK:
+        if _WORKER is None or not _WORKER.is_alive():
+            settings = _get_write_behind_settings()
+            if _QUEUE is None:
+                _QUEUE = queue.Queue(maxsize=settings["queue_size"])
+                # Queued documents are written before the process exits
+                atexit.register(flush_write_behind)
+            _WORKER = threading.Thread(target=_run_worker, args=(settings["batch_size"], settings["linger"]), name="mongo-write-behind", daemon=True)
+            _WORKER.start()
+    return _QUEUE
+
+def _update_job(job_id: str, **changes) -> None:
+    with _JOBS_LOCK:
+        if job_id in _JOBS:
+            _JOBS[job_id].update(changes)
+
+def _trim_jobs() -> None:
+    with _JOBS_LOCK:
+        finished = [job_id for job_id, job in _JOBS.items() if job["status"] not in ("pending", "writing")]
+        for job_id in finished[:max(len(finished) - _MAX_FINISHED_JOBS, 0)]:
+            del _JOBS[job_id]
+
+def submit_inserts(client: MongoClient, db_name: str, collection_name: str, documents: list, actor: str | None = None) -> str | None:
+    """
+    Queue documents to be inserted by the background worker and return immediately.
+
+    Args:
+        client: The MongoDB client
+        db_name: The name of the database
+        collection_name: The name of the collection
+        documents: The documents to insert
+        actor: The username recorded in the audit log for the inserts
+
+    Returns:
+        str: The id of the job, or None if the queue is full and the caller has to write synchronously
+    """
+    job_id = uuid.uuid4().hex[:12]
+    documents = [dict(document) for document in documents]
+    for document in documents:
+        # Failed documents are matched to their job by _id
+        document.setdefault("_id", str(uuid.uuid4()))
+    with _JOBS_LOCK:
+        _JOBS[job_id] = {
+            "id": job_id, "database": db_name, "collection": collection_name, "submitted_at": datetime.datetime.now(),
+            "committed_at": None, "status": "pending", "total": len(documents), "committed": 0, "failed": 0, "failures": [],
+        }
+    try:
+        _get_queue().put_nowait({"id": job_id, "client": client, "database": db_name, "collection": collection_name, "documents": documents, "actor": actor})
+    except queue.Full:
+        with _JOBS_LOCK:
+            del _JOBS[job_id]
+        print(f"Write-behind queue is full, {len(documents)} document(s) for '{db_name}.{collection_name}' are not queued.")
+        return None
+    return job_id
+
+def _take_batch(job_queue: queue.Queue, batch_size: int, linger: float) -> list:
+    """
+    Wait for a job, then keep taking jobs until the batch is full or no job arrives within the linger time.
+    """
+    jobs = [job_queue.get()]
+    size = len(jobs[0]["documents"])
+    deadline = time.monotonic() + linger
+    while size < batch_size:
+        try:
+            job = job_queue.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            break
+        jobs.append(job)
+        size += len(job["documents"])
+    return jobs
+
+def _commit_jobs(jobs: list) -> None:
+    """
+    Insert the documents of the jobs of one collection with a single batch and record the outcome of each job.
+    """
+    from functions.db.mongo_audit import audit_writes
+    from functions.db.mongo_batch import execute_batch
+    from functions.db.mongo_query_log import query_action
+    from functions.db.query_cache import bump_collection_version
+    client, db_name, collection_name = jobs[0]["client"], jobs[0]["database"], jobs[0]["collection"]
+    owners = {}
+    documents = []
+    # Incremental loaders pick up inserts by their _updated_at watermark, so it is the time of the write
+    committed_at = datetime.datetime.now()
+    for job in jobs:
+        _update_job(job["id"], status="writing")
+        for document in job["documents"]:
+            document["_updated_at"] = committed_at
+            owners.setdefault(document["_id"], []).append(job["id"])
+            documents.append(document)
+
+    failures = {job["id"]: [] for job in jobs}
+    try:
+        with query_action("Write-behind"):
+            result = execute_batch(client, db_name, collection_name, "insert", documents)
+        for failure in result["failures"]:
+            # Jobs of one batch can repeat an _id, the first insert of it succeeds and the later ones fail
+            job_ids = owners.get(failure["target"])
+            failures.setdefault(job_ids.pop() if job_ids else None, []).append(failure)
+    except Exception as e:
+        print(f"Write-behind batch for '{db_name}.{collection_name}' failed: {e}")
+        for job in jobs:
+            failures[job["id"]] = [{"target": document["_id"], "code": None, "error": str(e)} for document in job["documents"]]
+    finally:
+        bump_collection_version(db_name, collection_name)
+
+    for job in jobs:
+        job_failures = failures.get(job["id"], [])
+        failed_ids = {failure["target"] for failure in job_failures}
+        audit_writes(client, db_name, collection_name, "insert", [document for document in job["documents"] if document["_id"] not in failed_ids], actor=job.get("actor"))
+        total = len(job["documents"])
+        status = "committed" if not job_failures else "failed" if len(job_failures) >= total else "partial"
+        _update_job(job["id"], status=status, committed=total - len(job_failures), failed=len(job_failures), failures=job_failures, committed_at=datetime.datetime.now())
+
+def _run_worker(batch_size: int, linger: float) -> None:
+    job_queue = _QUEUE
+    while True:
+        jobs = _take_batch(job_queue, batch_size, linger)
+        try:
+            targets = OrderedDict()
+            for job in jobs:
+                targets.setdefault((id(job["client"]), job["database"], job["collection"]), []).append(job)
+            for target_jobs in targets.values():
+                _commit_jobs(target_jobs)
+        except Exception as e:
+            print(f"Write-behind worker error: {e}")
+        finally:
+            for _ in jobs:
+                job_queue.task_done()
+            _trim_jobs()
+
+def flush_write_behind(timeout: float | None = None) -> bool:
+    """
+    Wait until every queued document has been written.
+
+    Args:
+        timeout: The maximum time to wait in seconds, defaults to app.write_behind_flush_timeout
+
+    Returns:
+        bool: True if the queue was drained, False if the timeout expired first
+    """
+    if _QUEUE is None:
+        return True
+    timeout = _get_write_behind_settings()["flush_timeout"] if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    while _QUEUE.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            print(f"Write-behind flush timed out with {_QUEUE.unfinished_tasks} job(s) not written.")
+            return False
+        time.sleep(0.05)
+    return True
+
+def get_job_status(job_id: str) -> dict | None:
+    """
+    Get the status of a write-behind job: pending, writing, committed, partial or failed.
+    """
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+        return dict(job) if job else None
+
+def get_write_behind_status() -> dict:
+    """
+    Get the number of pending, committed and failed documents and the recent jobs, newest first.
+    """
+    with _JOBS_LOCK:
+        jobs = [dict(job) for job in reversed(_JOBS.values())]
+    return {
+        "queued_jobs": _QUEUE.qsize() if _QUEUE is not None else 0,
+        "pending": sum(job["total"] for job in jobs if job["status"] in ("pending", "writing")),
+        "committed": sum(job["committed"] for job in jobs),
+        "failed": sum(job["failed"] for job in jobs),
+        "jobs": jobs,
+    }
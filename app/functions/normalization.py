@@ -0,0 +1,385 @@
+import re
+import uuid
+from typing import Literal
+import numpy as np
+import pandas as pd
+
+# Date formats parsed column-wise. Strings in any other format go through the per-value conversion.
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y/%m/%d",
+]
+CURRENCY_FIELDS = ["from_curr", "to_curr"]
+# The username of the user a transaction belongs to, stamped by the insert paths
+OWNER_FIELD = "_owner"
+# Hash of the identifying fields of a transaction, unique per owner (see the owner_fingerprint_unique index)
+FINGERPRINT_FIELD = "_fingerprint"
+# The fields that identify a transaction, hashed into its fingerprint
+FINGERPRINT_FIELDS = ("date", "from_curr", "to_curr", "from_amt", "to_amt")
+
+# Numbers that pd.to_datetime never reads as a date. Numbers that may look like a year (e.g. "2024", "2024.5"),
+# yymmdd or yyyymmdd integers and numbers with leading zeros are left to the per-value conversion,
+# so the results stay identical.
+_SAFE_NUMBER = re.compile(r"^-?(?:(?:0|[1-9]\d{0,2}|[1-9]\d{4}|[1-9]\d{6}|[1-9]\d{8,13})(?:\.\d{1,15})?|[1-9](?:\d{5}|\d{7})\.\d{1,15})$")
+
+_MISSING = object()
+
+def _handle_hidden_fields(operation_type: Literal["insert", "update", "delete"], data):
+    """
+    Handle hidden fields in the form based on the operation type.
+    
+    Args:
+        operation_type: The type of operation to perform ("insert", "update", or "delete")
+        data: The data associated with the operation
+    """
+    import uuid
+    if operation_type == "insert":
+        data["_id"] = str(uuid.uuid4())
+        data["_created_at"] = pd.Timestamp.now()
+        data["_updated_at"] = pd.Timestamp.now()
+    elif operation_type == "update":
+        data["_updated_at"] = pd.Timestamp.now()
+    elif operation_type == "delete":
+        pass
+    else:
+        print(f"Unsupported operation type: {operation_type}")
+        return data
+    
+    return data
+
+def _convert_string_value(value: str):
+    """
+    Convert a string from a form to a datetime, an integer or a float if it looks like one.
+    
+    Args:
+        value: The string to convert
+        
+    Returns:
+        The converted value, or the string unchanged if no conversion applies
+    """
+    # Date or datetime conversion
+    try:
+        # Try to convert to datetime
+        return pd.to_datetime(value)
+    except ValueError:
+        pass  # Keep as string if conversion fails
+    
+    # Integer or float conversion
+    stripped = value.strip()
+    
+    # Check for integer
+    if stripped.lstrip('-').isdigit():
+        return int(stripped)
+        
+    # Check for float
+    try:
+        float_value = float(stripped)
+        if float_value.is_integer():
+            return int(float_value)
+        return float_value
+    except ValueError:
+        return value
+
+def _convert_value(value):
+    """
+    Convert a value whose field type is unknown, guessing the type of strings from their contents.
+    """
+    if isinstance(value, str):
+        return _convert_string_value(value)
+    elif isinstance(value, bool):
+        return bool(value)
+    elif isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+def _convert_schema_value(value, field_type: str):
+    """
+    Convert a value to the field type registered in the schema.
+    Values that cannot be converted are converted as if the field type was unknown.
+    
+    Args:
+        value: The value to convert
+        field_type: One of the field types of the schema registry
+        
+    Returns:
+        The converted value
+    """
+    import datetime
+    try:
+        if field_type == "String":
+            return value if isinstance(value, str) else str(value)
+        if field_type == "Integer":
+            number = float(value.strip()) if isinstance(value, str) else float(value)
+            if not number.is_integer():
+                raise ValueError(f"{value} is not an integer")
+            return int(number)
+        if field_type == "Float":
+            return float(value.strip()) if isinstance(value, str) else float(value)
+        if field_type == "Boolean":
+            if isinstance(value, str):
+                text = value.strip().lower()
+                if text not in ("true", "false", "yes", "no", "1", "0"):
+                    raise ValueError(f"{value} is not a boolean")
+                return text in ("true", "yes", "1")
+            return bool(value)
+        if field_type in ("Date", "Datetime"):
+            # Numbers would be read as epoch offsets, so only strings and dates are converted
+            if not isinstance(value, (str, datetime.date)):
+                raise TypeError(f"{value} is not a date")
+            timestamp = pd.to_datetime(value)
+            return timestamp.normalize() if field_type == "Date" else timestamp
+    except (ValueError, TypeError, OverflowError):
+        pass
+    return _convert_value(value)
+
+def _handle_data_types(data, schema: dict | None = None):
+    """
+    Handle data types for the fields in the form.
+    
+    Args:
+        data: The data to be processed
+        schema: The field types of the collection from the schema registry, None to guess every type
+        
+    Returns:
+        dict: The processed data with appropriate types
+    """
+    for key, value in data.items():
+        field_type = schema.get(key) if schema else None
+        if field_type:
+            data[key] = _convert_schema_value(value, field_type)
+        else:
+            data[key] = _convert_value(value)
+    
+    return data
+
+def convert_value_to_capitalized(data):
+    for key, value in data.items():
+        if key in ["from_curr", "to_curr"]:
+            if not pd.isna(value):
+                data[key] = value.upper()
+    return data
+
+def compute_fingerprint(data: dict) -> str | None:
+    """
+    Compute the fingerprint of a transaction: a SHA-256 of its normalized date, currencies and amounts,
+    so the same transaction entered twice gets the same fingerprint.
+    
+    Returns:
+        str: The hex digest, or None if one of the fields is missing or not a date, currency or number
+    """
+    import hashlib
+    try:
+        date = pd.Timestamp(data["date"])
+        if pd.isna(date):
+            return None
+        parts = [
+            date.isoformat(),
+            str(data["from_curr"]).strip().upper(),
+            str(data["to_curr"]).strip().upper(),
+            f"{float(data['from_amt']):.6f}",
+            f"{float(data['to_amt']):.6f}",
+        ]
+    except (KeyError, TypeError, ValueError):
+        return None
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+def stamp_fingerprint(data: dict) -> dict:
+    """
+    Stamp a document with the fingerprint of its transaction, if it has every field of FINGERPRINT_FIELDS.
+    """
+    fingerprint = compute_fingerprint(data)
+    if fingerprint:
+        data[FINGERPRINT_FIELD] = fingerprint
+    return data
+
+def clean_up_data(operation_type: Literal["insert", "update", "delete"], data, hidden_fields: bool = False, cal_rate: bool = False, schema: dict | None = None):
+    """
+    Clean up the data by removing empty fields and converting values to appropriate types.
+    
+    Args:
+        data: The data to be cleaned
+        schema: The field types of the collection from the schema registry, None to guess every type
+    """
+    cleaned_data = {k: v for k, v in data.items() if not (v is None or v == "" or pd.isna(v))}
+    
+    if hidden_fields:
+        cleaned_data = _handle_hidden_fields(operation_type=operation_type, data=cleaned_data)
+    cleaned_data = _handle_data_types(cleaned_data, schema=schema)
+    cleaned_data = convert_value_to_capitalized(cleaned_data)
+
+    if cal_rate:
+        from_amt = cleaned_data.get("from_amt", None)
+        to_amt = cleaned_data.get("to_amt", None)
+        if from_amt and to_amt:
+            if from_amt > to_amt:
+                cleaned_data["_rate"] = from_amt / to_amt
+            else:
+                cleaned_data["_rate"] = to_amt / from_amt
+    if hidden_fields:
+        stamp_fingerprint(cleaned_data)
+    print("Cleaned Data:", cleaned_data)
+    return cleaned_data
+
+def _is_missing(column: pd.Series) -> pd.Series:
+    """
+    Get the cells that the per-dict path drops: None, NaN/NaT and empty strings.
+    """
+    missing = column.isna()
+    if column.dtype == object:
+        missing |= column.map(lambda value: isinstance(value, str) and value == "")
+    return missing
+
+def _convert_strings(values: pd.Series) -> pd.Series:
+    """
+    Convert a Series of strings column-wise: dates with explicit formats, then numbers,
+    then the remaining distinct strings once each through the per-value conversion.
+    """
+    result = pd.Series(_MISSING, index=values.index, dtype=object)
+    remaining = values
+
+    for date_format in DATE_FORMATS:
+        if remaining.empty:
+            break
+        parsed = pd.to_datetime(remaining, format=date_format, errors="coerce")
+        matched = parsed.notna()
+        if matched.any():
+            result[matched[matched].index] = list(parsed[matched])
+            remaining = remaining[~matched]
+
+    if not remaining.empty:
+        is_number = remaining.str.match(_SAFE_NUMBER)
+        numbers = remaining[is_number]
+        if not numbers.empty:
+            is_int = ~numbers.str.contains(".", regex=False)
+            if is_int.any():
+                result[is_int[is_int].index] = numbers[is_int].astype(np.int64).tolist()
+            # float() rounds exactly like the per-value conversion
+            floats = pd.Series([float(value) for value in numbers[~is_int]], index=numbers[~is_int].index, dtype=float)
+            if not floats.empty:
+                integral = floats == np.floor(floats)
+                result[integral[integral].index] = floats[integral].astype(np.int64).tolist()
+                result[integral[~integral].index] = floats[~integral].tolist()
+        remaining = remaining[~is_number]
+
+    if not remaining.empty:
+        # Free-form strings (currency codes, notes, ...) repeat a lot, so each distinct value is converted once
+        converted = {value: _convert_string_value(value) for value in remaining.unique()}
+        result[remaining.index] = [converted[value] for value in remaining]
+    return result
+
+def _convert_typed_values(values: pd.Series, field_type: str) -> list:
+    """
+    Convert values to the field type registered in the schema, converting each distinct value once.
+    """
+    converted = {}
+    result = []
+    for value in values.tolist():
+        # The type is part of the key so that 1, 1.0 and True are converted separately
+        key = (type(value), value)
+        try:
+            if key not in converted:
+                converted[key] = _convert_schema_value(value, field_type)
+            result.append(converted[key])
+        except TypeError:
+            # Unhashable values (lists, dicts) are not memoized
+            result.append(_convert_schema_value(value, field_type))
+    return result
+
+def _convert_column(column: pd.Series, field_type: str | None = None) -> pd.Series:
+    """
+    Convert one column the same way _handle_data_types converts each value.
+    Missing cells are returned as the _MISSING sentinel.
+    """
+    result = pd.Series(_MISSING, index=column.index, dtype=object)
+    present = column[~_is_missing(column)]
+    if present.empty:
+        return result
+
+    if field_type:
+        result[present.index] = _convert_typed_values(present, field_type)
+    elif pd.api.types.is_bool_dtype(present.dtype):
+        result[present.index] = present.tolist()
+    elif pd.api.types.is_numeric_dtype(present.dtype):
+        result[present.index] = present.astype(float).tolist()
+    elif pd.api.types.is_datetime64_any_dtype(present.dtype):
+        result[present.index] = list(present)
+    else:
+        value_types = present.map(type)
+        is_str = value_types.map(lambda value_type: issubclass(value_type, str))
+        is_bool = value_types.map(lambda value_type: issubclass(value_type, (bool, np.bool_)))
+        is_number = value_types.map(lambda value_type: issubclass(value_type, (int, float, np.integer, np.floating))) & ~is_bool
+        if is_str.any():
+            result[is_str[is_str].index] = _convert_strings(present[is_str])
+        if is_number.any():
+            result[is_number[is_number].index] = [float(value) for value in present[is_number]]
+        others = ~(is_str | is_number)
+        if others.any():
+            # Booleans, dates and other values are kept as they are
+            result[others[others].index] = list(present[others])
+    return result
+
+def _calculate_rate(from_amt: pd.Series, to_amt: pd.Series) -> pd.Series:
+    """
+    Calculate _rate as the larger amount divided by the smaller one, where both amounts are set and non-zero.
+    """
+    def _to_numbers(amounts: pd.Series) -> pd.Series:
+        numbers = amounts.map(lambda value: value if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan)
+        return numbers.astype(float)
+
+    from_numbers, to_numbers = _to_numbers(from_amt), _to_numbers(to_amt)
+    valid = from_numbers.notna() & to_numbers.notna() & (from_numbers != 0) & (to_numbers != 0)
+    rate = np.where(from_numbers > to_numbers, from_numbers / to_numbers, to_numbers / from_numbers)
+    result = pd.Series(_MISSING, index=from_amt.index, dtype=object)
+    result[valid[valid].index] = rate[valid.to_numpy()].tolist()
+    return result
+
+def normalize_dataframe(data: pd.DataFrame, operation_type: Literal["insert", "update", "delete"], hidden_fields: bool = False, cal_rate: bool = False, schema: dict | None = None) -> list:
+    """
+    Normalize a whole DataFrame of added or edited rows column by column.
+    Gives the same documents as calling clean_up_data on each row: empty values are dropped,
+    strings are converted to dates and numbers, currencies are upper-cased, hidden fields
+    (including the fingerprint) are stamped and _rate is calculated.
+
+    Args:
+        data: The rows to normalize, one per document
+        operation_type: The type of operation the documents are for ("insert", "update" or "delete")
+        hidden_fields: Whether to stamp the hidden fields (_id, _created_at, _updated_at)
+        cal_rate: Whether to calculate _rate from from_amt and to_amt
+        schema: The field types of the collection from the schema registry, None to guess every type
+
+    Returns:
+        list: The normalized documents, ready for bulk_write
+    """
+    if data.empty:
+        return []
+    data = data.reset_index(drop=True)
+    columns = {col: _convert_column(data[col], field_type=(schema or {}).get(col)) for col in data.columns}
+
+    for field in CURRENCY_FIELDS:
+        if field in columns:
+            columns[field] = columns[field].map(lambda value: value.upper() if isinstance(value, str) else value)
+
+    if hidden_fields:
+        now = pd.Timestamp.now()
+        if operation_type == "insert":
+            columns["_id"] = pd.Series([str(uuid.uuid4()) for _ in range(len(data))], dtype=object)
+            columns["_created_at"] = pd.Series([now] * len(data), dtype=object)
+            columns["_updated_at"] = pd.Series([now] * len(data), dtype=object)
+        elif operation_type == "update":
+            columns["_updated_at"] = pd.Series([now] * len(data), dtype=object)
+
+    if cal_rate and "from_amt" in columns and "to_amt" in columns:
+        columns["_rate"] = _calculate_rate(columns["from_amt"], columns["to_amt"])
+
+    names = list(columns)
+    documents = [
+        {name: value for name, value in zip(names, row) if value is not _MISSING}
+        for row in zip(*(columns[name].tolist() for name in names))
+    ]
+    if hidden_fields:
+        for document in documents:
+            stamp_fingerprint(document)
+    return documents
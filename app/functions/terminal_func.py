@@ -17,7 +17,7 @@ def create_admin_user_helper():
     """
     try:
         # First try absolute imports
-        from app.functions.db.mongo_connection import get_mongo_client
+        from app.functions.db.mongo_connection import get_shared_mongo_client
         from app.functions.db.mongo_collection_management import get_all_databases
         from app.functions.auth_func import create_admin_user
     except ImportError:
@@ -25,11 +25,11 @@ def create_admin_user_helper():
         import sys
         print("Absolute imports failed. Using direct imports...")
         sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from db.mongo_connection import get_mongo_client
+        from db.mongo_connection import get_shared_mongo_client
         from db.mongo_collection_management import get_all_databases
         from auth_func import create_admin_user
 
-    client = get_mongo_client()
+    client = get_shared_mongo_client()
     if client is None:
         print("Failed to connect to MongoDB.")
         return
@@ -62,6 +62,363 @@ def create_admin_user_helper():
     else:
         print("Failed to create admin user.")
 
+def ensure_indexes_helper():
+    """
+    Helper function to create the registered indexes in terminal.
+    """
+    try:
+        # First try absolute imports
+        from app.functions.db.mongo_connection import get_shared_mongo_client
+        from app.functions.db.mongo_collection_management import get_all_databases
+        from app.functions.db.mongo_index_management import ensure_indexes
+        from app.functions.utils import _get_default_collection
+    except ImportError:
+        # If that fails, try relative imports
+        import sys
+        print("Absolute imports failed. Using direct imports...")
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from db.mongo_connection import get_shared_mongo_client
+        from db.mongo_collection_management import get_all_databases
+        from db.mongo_index_management import ensure_indexes
+        from utils import _get_default_collection
+
+    client = get_shared_mongo_client()
+    if client is None:
+        print("Failed to connect to MongoDB.")
+        return
+    all_databases = get_all_databases(client)
+    print("Available databases:")
+    for idx, db in enumerate(all_databases):
+        print(f"{idx + 1}: {db}")
+    db_index = int(input("Select a database by number: ")) - 1
+    if db_index < 0 or db_index >= len(all_databases):
+        print("Invalid selection.")
+        return
+    
+    db_name = all_databases[db_index]
+    print(f"Selected database: {db_name}")
+    default_collection = _get_default_collection(approach='file')
+    collection_name = input(f"Enter transaction collection name [{default_collection}]: ") or default_collection
+    
+    results = ensure_indexes(client=client, db_name=db_name, transaction_collection=collection_name)
+    for result in results:
+        if result["status"] == "ok":
+            print(f"{result['collection']}.{result['index']}: ok")
+        else:
+            print(f"{result['collection']}.{result['index']}: failed ({result['error']})")
+
+def export_collection_helper():
+    """
+    Helper function to export a collection to a CSV, NDJSON or Parquet file in terminal.
+    """
+    try:
+        # First try absolute imports
+        from app.functions.db.mongo_connection import get_shared_mongo_client
+        from app.functions.db.mongo_collection_management import get_all_databases, get_all_collections
+        from app.functions.db.mongo_export import EXPORT_FORMATS, export_collection, parse_export_query, parse_export_projection
+    except ImportError:
+        # If that fails, try relative imports
+        import sys
+        print("Absolute imports failed. Using direct imports...")
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from db.mongo_connection import get_shared_mongo_client
+        from db.mongo_collection_management import get_all_databases, get_all_collections
+        from db.mongo_export import EXPORT_FORMATS, export_collection, parse_export_query, parse_export_projection
+
+    client = get_shared_mongo_client()
+    if client is None:
+        print("Failed to connect to MongoDB.")
+        return
+    all_databases = get_all_databases(client)
+    print("Available databases:")
+    for idx, db in enumerate(all_databases):
+        print(f"{idx + 1}: {db}")
+    db_index = int(input("Select a database by number: ")) - 1
+    if db_index < 0 or db_index >= len(all_databases):
+        print("Invalid selection.")
+        return
+    db_name = all_databases[db_index]
+    
+    all_collections = get_all_collections(client, db_name)
+    print("Available collections:")
+    for idx, collection in enumerate(all_collections):
+        print(f"{idx + 1}: {collection}")
+    collection_index = int(input("Select a collection by number: ")) - 1
+    if collection_index < 0 or collection_index >= len(all_collections):
+        print("Invalid selection.")
+        return
+    collection_name = all_collections[collection_index]
+    
+    file_format = input(f"Format ({', '.join(EXPORT_FORMATS)}) [csv]: ").strip().lower() or "csv"
+    if file_format not in EXPORT_FORMATS:
+        print("Invalid format.")
+        return
+    file_path = input(f"Output file [{collection_name}{EXPORT_FORMATS[file_format]}]: ").strip() or f"{collection_name}{EXPORT_FORMATS[file_format]}"
+    batch_size = int(input("Batch size [1000]: ").strip() or 1000)
+    try:
+        query = parse_export_query(input("Filter as JSON (optional): "))
+        projection = parse_export_projection(input("Fields, comma-separated (optional): "))
+    except Exception as e:
+        print(f"Invalid filter: {e}")
+        return
+    
+    export_collection(
+        client, db_name, collection_name, file_path,
+        file_format=file_format, query=query, projection=projection, batch_size=batch_size,
+        progress_callback=lambda count: print(f"{count} document(s) written...", end="\r"),
+    )
+
+def record_capacity_snapshot_helper():
+    """
+    Helper function to record the size of every database and collection in terminal, e.g. from a daily cron job.
+    """
+    try:
+        # First try absolute imports
+        from app.functions.db.mongo_connection import get_shared_mongo_client
+        from app.functions.db.mongo_capacity import CAPACITY_COLLECTION, record_capacity_snapshot
+        from app.functions.utils import _get_default_db
+    except ImportError:
+        # If that fails, try relative imports
+        import sys
+        print("Absolute imports failed. Using direct imports...")
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from db.mongo_connection import get_shared_mongo_client
+        from db.mongo_capacity import CAPACITY_COLLECTION, record_capacity_snapshot
+        from utils import _get_default_db
+
+    client = get_shared_mongo_client()
+    if client is None:
+        print("Failed to connect to MongoDB.")
+        return
+    metrics_db = _get_default_db(approach='file')
+    rows = record_capacity_snapshot(client, metrics_db)
+    for row in rows:
+        name = row["database"] if row["collection"] is None else f"{row['database']}.{row['collection']}"
+        print(f"{name}: {row['count']} document(s), storage {row['storage_size'] / 2 ** 20:.2f} MiB, indexes {row['index_size'] / 2 ** 20:.2f} MiB")
+    print(f"{len(rows)} row(s) recorded in '{metrics_db}.{CAPACITY_COLLECTION}'.")
+
+def archive_collection_helper():
+    """
+    Helper function to move old transactions to the Parquet archive in terminal.
+    """
+    try:
+        # First try absolute imports
+        from app.functions.db.mongo_connection import get_shared_mongo_client
+        from app.functions.db.mongo_collection_management import get_all_databases, get_all_collections
+        from app.functions.db.mongo_archive import archive_collection
+    except ImportError:
+        # If that fails, try relative imports
+        import sys
+        print("Absolute imports failed. Using direct imports...")
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from db.mongo_connection import get_shared_mongo_client
+        from db.mongo_collection_management import get_all_databases, get_all_collections
+        from db.mongo_archive import archive_collection
+    from datetime import datetime, timedelta
+
+    client = get_shared_mongo_client()
+    if client is None:
+        print("Failed to connect to MongoDB.")
+        return
+    all_databases = get_all_databases(client)
+    print("Available databases:")
+    for idx, db in enumerate(all_databases):
+        print(f"{idx + 1}: {db}")
+    db_index = int(input("Select a database by number: ")) - 1
+    if db_index < 0 or db_index >= len(all_databases):
+        print("Invalid selection.")
+        return
+    db_name = all_databases[db_index]
+    
+    all_collections = get_all_collections(client, db_name)
+    print("Available collections:")
+    for idx, collection in enumerate(all_collections):
+        print(f"{idx + 1}: {collection}")
+    collection_index = int(input("Select a collection by number: ")) - 1
+    if collection_index < 0 or collection_index >= len(all_collections):
+        print("Invalid selection.")
+        return
+    collection_name = all_collections[collection_index]
+    
+    default_cutoff = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
+    try:
+        cutoff = datetime.strptime(input(f"Archive transactions dated before (YYYY-MM-DD) [{default_cutoff}]: ").strip() or default_cutoff, "%Y-%m-%d")
+    except ValueError:
+        print("Invalid date.")
+        return
+    batch_size = int(input("Batch size [5000]: ").strip() or 5000)
+    archive_collection(
+        client, db_name, collection_name, cutoff, batch_size=batch_size,
+        progress_callback=lambda count: print(f"{count} document(s) archived...", end="\r"),
+    )
+
+def take_audit_snapshot_helper():
+    """
+    Helper function to take a snapshot of a collection for the point-in-time views in terminal,
+    e.g. from a daily cron job.
+    """
+    try:
+        # First try absolute imports
+        from app.functions.db.mongo_connection import get_shared_mongo_client
+        from app.functions.db.mongo_audit import take_audit_snapshot
+        from app.functions.utils import _get_default_db, _get_default_collection
+    except ImportError:
+        # If that fails, try relative imports
+        import sys
+        print("Absolute imports failed. Using direct imports...")
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from db.mongo_connection import get_shared_mongo_client
+        from db.mongo_audit import take_audit_snapshot
+        from utils import _get_default_db, _get_default_collection
+
+    client = get_shared_mongo_client()
+    if client is None:
+        print("Failed to connect to MongoDB.")
+        return
+    default_db = _get_default_db(approach='file')
+    default_collection = _get_default_collection(approach='file')
+    db_name = input(f"Enter database name [{default_db}]: ") or default_db
+    collection_name = input(f"Enter collection name [{default_collection}]: ") or default_collection
+    take_audit_snapshot(client, db_name, collection_name)
+
+def copy_to_sqlite_helper():
+    """
+    Helper function to copy a MongoDB collection into the embedded SQLite storage backend in terminal,
+    e.g. to run a branch office or a benchmark offline.
+    """
+    try:
+        # First try absolute imports
+        from app.functions.db.mongo_connection import get_shared_mongo_client
+        from app.functions.db.storage_backend import MongoBackend, SQLiteBackend
+        from app.functions.utils import _get_default_db, _get_default_collection, _get_setting
+    except ImportError:
+        # If that fails, try relative imports
+        import sys
+        print("Absolute imports failed. Using direct imports...")
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from db.mongo_connection import get_shared_mongo_client
+        from db.storage_backend import MongoBackend, SQLiteBackend
+        from utils import _get_default_db, _get_default_collection, _get_setting
+
+    client = get_shared_mongo_client()
+    if client is None:
+        print("Failed to connect to MongoDB.")
+        return
+    default_db = _get_default_db(approach='file')
+    default_collection = _get_default_collection(approach='file')
+    default_path = _get_setting("storage", "sqlite_path", os.path.join("data", "currency_exchange.sqlite3"), approach='file')
+    db_name = input(f"Enter database name [{default_db}]: ") or default_db
+    collection_name = input(f"Enter collection name [{default_collection}]: ") or default_collection
+    path = input(f"Enter SQLite file [{default_path}]: ") or default_path
+    
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    source, target = MongoBackend(client), SQLiteBackend(path)
+    copied, failed, after = 0, 0, None
+    while True:
+        documents, after = source.get_page(db_name, collection_name, page_size=5000, after=after)
+        result = target.insert_many(db_name, collection_name, documents)
+        copied += result["success"]
+        failed += result["errors"]
+        print(f"{copied} document(s) copied...", end="\r")
+        if after is None:
+            break
+    target.close()
+    print(f"{copied} document(s) of '{db_name}.{collection_name}' copied to '{path}', {failed} already present.")
+
+def assign_owner_helper():
+    """
+    Helper function to give the transactions without an owner to a user in terminal,
+    e.g. the transactions inserted before the owner was stamped.
+    """
+    try:
+        # First try absolute imports
+        from app.functions.db.mongo_connection import get_shared_mongo_client
+        from app.functions.db.mongo_collection_management import get_all_databases
+        from app.functions.utils import _get_default_collection
+    except ImportError:
+        # If that fails, try relative imports
+        import sys
+        print("Absolute imports failed. Using direct imports...")
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from db.mongo_connection import get_shared_mongo_client
+        from db.mongo_collection_management import get_all_databases
+        from utils import _get_default_collection
+    from datetime import datetime
+
+    client = get_shared_mongo_client()
+    if client is None:
+        print("Failed to connect to MongoDB.")
+        return
+    all_databases = get_all_databases(client)
+    print("Available databases:")
+    for idx, db in enumerate(all_databases):
+        print(f"{idx + 1}: {db}")
+    db_index = int(input("Select a database by number: ")) - 1
+    if db_index < 0 or db_index >= len(all_databases):
+        print("Invalid selection.")
+        return
+    db_name = all_databases[db_index]
+    default_collection = _get_default_collection(approach='file')
+    collection_name = input(f"Enter transaction collection name [{default_collection}]: ") or default_collection
+    username = input("Enter the username of the owner: ").strip()
+    if not client[db_name]["users"].find_one({"username": username}, {"_id": 1}):
+        print(f"User '{username}' does not exist.")
+        return
+    
+    # _updated_at is stamped so the local copies kept by the delta sync pick up the owner
+    result = client[db_name][collection_name].update_many(
+        {"_owner": {"$exists": False}},
+        {"$set": {"_owner": username, "_updated_at": datetime.now()}},
+    )
+    print(f"{result.modified_count} transaction(s) of '{db_name}.{collection_name}' assigned to '{username}'.")
+
+def backfill_fingerprints_helper():
+    """
+    Helper function to stamp the fingerprint on the transactions written before fingerprints existed in terminal,
+    report the transactions entered more than once, and then build the registered indexes.
+    """
+    try:
+        # First try absolute imports
+        from app.functions.db.mongo_connection import get_shared_mongo_client
+        from app.functions.db.mongo_collection_management import get_all_databases
+        from app.functions.db.mongo_index_management import backfill_fingerprints, ensure_indexes
+        from app.functions.utils import _get_default_collection
+    except ImportError:
+        # If that fails, try relative imports
+        import sys
+        print("Absolute imports failed. Using direct imports...")
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from db.mongo_connection import get_shared_mongo_client
+        from db.mongo_collection_management import get_all_databases
+        from db.mongo_index_management import backfill_fingerprints, ensure_indexes
+        from utils import _get_default_collection
+
+    client = get_shared_mongo_client()
+    if client is None:
+        print("Failed to connect to MongoDB.")
+        return
+    all_databases = get_all_databases(client)
+    print("Available databases:")
+    for idx, db in enumerate(all_databases):
+        print(f"{idx + 1}: {db}")
+    db_index = int(input("Select a database by number: ")) - 1
+    if db_index < 0 or db_index >= len(all_databases):
+        print("Invalid selection.")
+        return
+    db_name = all_databases[db_index]
+    default_collection = _get_default_collection(approach='file')
+    collection_name = input(f"Enter transaction collection name [{default_collection}]: ") or default_collection
+
+    result = backfill_fingerprints(client=client, db_name=db_name, collection_name=collection_name)
+    if result["duplicates"]:
+        print(f"{len(result['duplicates'])} transaction(s) were entered more than once. The repeats have no fingerprint; review and delete them:")
+        for group in result["duplicates"]:
+            print(f"  owner {group['owner']}: kept {group['kept']}, repeated by {', '.join(str(doc_id) for doc_id in group['duplicate_ids'])}")
+    for index_result in ensure_indexes(client=client, db_name=db_name, transaction_collection=collection_name):
+        if index_result["status"] != "ok":
+            print(f"{index_result['collection']}.{index_result['index']}: failed ({index_result['error']})")
+
 # Main code block
 if __name__ == "__main__":
     functions = [name for name, obj in locals().items() 
@@ -79,10 +436,7 @@ if __name__ == "__main__":
 
     if command in functions:
         func = locals()[command]
-        if func == create_admin_user_helper:
-            func()
-        else:
-            print(f"Function {command} does not require any arguments.")
+        func()
     else:
         print(f"Unknown command: {command}")
         print("Available commands:")
@@ -0,0 +1,80 @@
+import pandas as pd
+import streamlit as st
+from functions.ui.db_func_ui import get_cached_read, get_owner_query, show_mongo_only_notice
+
+def get_pair_summary_wrapper(db_name, collection_name, query: dict | None = None):
+    """
+    Get the totals and rate statistics per currency pair as a DataFrame, cached until the collection is written.
+    """
+    from functions.db.mongo_analytics import get_pair_summary
+    from functions.db.query_cache import make_query_key
+    def _read_summary(client):
+        data = get_pair_summary(client=client, db_name=db_name, collection_name=collection_name, query=query)
+        return pd.DataFrame(data) if data else None
+    return get_cached_read(make_query_key(db_name, collection_name, query, pipeline="pair_summary"), _read_summary)
+
+def get_monthly_weighted_rate_wrapper(db_name, collection_name, query: dict | None = None):
+    """
+    Get the volume-weighted average rate per currency pair and month as a DataFrame, cached until the collection is written.
+    """
+    from functions.db.mongo_analytics import get_monthly_weighted_rate
+    from functions.db.query_cache import make_query_key
+    def _read_monthly_rate(client):
+        data = get_monthly_weighted_rate(client=client, db_name=db_name, collection_name=collection_name, query=query)
+        if not data:
+            return None
+        df = pd.DataFrame(data)
+        df["month"] = pd.to_datetime(dict(year=df["year"], month=df["month"], day=1))
+        return df.drop(columns=["year"])
+    return get_cached_read(make_query_key(db_name, collection_name, query, pipeline="monthly_weighted_rate"), _read_monthly_rate)
+
+def analytics_page():
+    from functions.utils import _get_default_db, _get_default_collection
+    # The statistics are aggregation pipelines
+    if show_mongo_only_notice("Analytics"):
+        return
+    default_db = _get_default_db()
+    default_collection = _get_default_collection()
+    owner_query = get_owner_query(key="analytics")
+    
+    pair_summary = get_pair_summary_wrapper(db_name=default_db, collection_name=default_collection, query=owner_query)
+    if pair_summary is None or pair_summary.empty:
+        st.warning(body="沒有交易紀錄", icon="⚠️")
+        return
+    
+    st.subheader("貨幣對統計")
+    st.dataframe(
+        data=pair_summary.rename(columns={
+            "from_curr": "From Curr",
+            "to_curr": "To Curr",
+            "total_from_amt": "Total From Amt",
+            "total_to_amt": "Total To Amt",
+            "count": "Count",
+            "min_rate": "Min Rate",
+            "max_rate": "Max Rate",
+            "avg_rate": "Avg Rate",
+        }),
+        column_order=["From Curr", "To Curr", "Count", "Total From Amt", "Total To Amt", "Min Rate", "Max Rate", "Avg Rate"],
+        use_container_width=True,
+        hide_index=True,
+    )
+    
+    st.subheader("每月加權平均匯率")
+    # Rates and volumes of different pairs are in different currencies, so one pair is shown at a time
+    pairs = [f"{row.from_curr} → {row.to_curr}" for row in pair_summary.itertuples()]
+    selected_pair = st.selectbox("Currency pair", pairs, key="analytics_pair")
+    row = pair_summary.iloc[pairs.index(selected_pair)]
+    query = {**(owner_query or {}), "from_curr": row["from_curr"], "to_curr": row["to_curr"]}
+    
+    monthly_rate = get_monthly_weighted_rate_wrapper(db_name=default_db, collection_name=default_collection, query=query)
+    if monthly_rate is None or monthly_rate.empty:
+        st.info("No dated transactions with a rate for this selection.")
+        return
+    
+    rate_col, volume_col = st.columns(2)
+    with rate_col:
+        st.caption("Volume-weighted average rate")
+        st.line_chart(data=monthly_rate, x="month", y="weighted_rate")
+    with volume_col:
+        st.caption("Monthly volume (From Amt)")
+        st.bar_chart(data=monthly_rate, x="month", y="volume")
@@ -1,6 +1,7 @@
 import pandas as pd
 import streamlit as st
-from functions.ui.db_func_ui import create_db_and_collection_input, prepare_data_for_existing_form, execute_db_operation, get_form_from_data, get_collection_data_wrapper, execute_batch_operations, clean_up_data
+from functions.ui.db_func_ui import create_db_and_collection_input, prepare_data_for_existing_form, execute_db_operation, get_form_from_data, get_collection_page_wrapper, get_paginated_collection_data, execute_batch_operations
+from functions.normalization import clean_up_data, normalize_dataframe
 
 def _tidy_up_collection_data(collection_data: 'pd.DataFrame', hide_id: bool=True, show_hidden=True) -> pd.DataFrame:
     display_cols = [col for col in collection_data.columns.tolist() if not col.startswith("_")]
@@ -15,13 +16,11 @@ def _tidy_up_collection_data(collection_data: 'pd.DataFrame', hide_id: bool=True
     print("Final column order:", final_column_order)
     rename_final_column_order = [col.replace("_", " ").strip().title() for col in final_column_order]
     print("Renamed final column order:", rename_final_column_order)
-    collection_data = collection_data.sort_values(by="date", ascending=False).reset_index(drop=True) if "date" in collection_data.columns else collection_data
     collection_data = collection_data.rename(columns={col: rename_col for col, rename_col in zip(final_column_order, rename_final_column_order)})
     return collection_data[rename_final_column_order]
 
 def get_create_table_page():
-    from functions.db.mongo_collection_management import create_collection
-    from functions.ui.db_func_ui import get_cached_mongo_client
+    from functions.db.storage_backend import get_storage_backend
     
     db_name = st.text_input(label="", placeholder="Name of database", label_visibility="collapsed", value=None)
     collection_name = st.text_input(label="", placeholder="Name of collection", label_visibility="collapsed", value=None)
@@ -29,11 +28,11 @@ def get_create_table_page():
         st.button("Create Collection", disabled=True)
         st.stop()
     if st.button("Create Collection"):
-        client = get_cached_mongo_client()
-        if client:
+        backend = get_storage_backend()
+        if backend:
             if db_name and collection_name:
                 try:
-                    create_collection(client, db_name, collection_name)
+                    backend.create_collection(db_name, collection_name)
                     st.success(f"Collection '{collection_name}' created in database '{db_name}'.")
                 except Exception as e:
                     st.error(f"Error creating collection: {e}")
@@ -43,7 +42,7 @@ def get_create_table_page():
             st.error("Failed to connect to MongoDB.")
             
 def get_insert_data_page():
-    from functions.ui.db_func_ui import get_schema_form, get_blank_form, prepare_data_for_blank_form
+    from functions.ui.db_func_ui import get_schema_form, get_blank_form, prepare_data_for_blank_form, get_collection_schema, save_collection_schema, get_schema_from_form, get_column_config, get_owner_input
     db_name, collection_name = create_db_and_collection_input()
     st.divider()
     
@@ -54,7 +53,18 @@ def get_insert_data_page():
         get_blank_form(disabled=True)
         st.stop()
     
-    collection_data = get_collection_data_wrapper(db_name, collection_name)
+    from functions.utils import _get_setting
+    st.toggle(
+        "Write-behind mode",
+        value=bool(_get_setting("app", "write_behind", False)),
+        key="write_behind",
+        help="Queue inserts and write them in the background, so the page does not wait for the database",
+    )
+    get_owner_input("insert")
+    
+    from functions.ui.db_func_ui import get_display_projection
+    # A single document is enough to know the fields of the collection
+    collection_data, _ = get_collection_page_wrapper(db_name, collection_name, page_size=1, projection=get_display_projection(db_name, collection_name))
     # Check if the collection exists
     if collection_data is None:
         batch_mode = st.toggle("Use batch update mode", value=True, help="Update all documents in a single database operation")
@@ -62,21 +72,9 @@ def get_insert_data_page():
             get_schema_form(disabled=False)
             st.divider()
 
-            field_names = [st.session_state[key] for key in st.session_state if key.startswith("field_name_")]
-            field_types = [st.session_state[key] for key in st.session_state if key.startswith("field_type_")]
-            display_field_names = [field_name for field_name in sorted(field_names) if not field_name.startswith("_") and not pd.isna(field_name) and field_name != ""] if field_names else []
-            column_config = {}
-            for field_name, field_type in zip(field_names, field_types):
-                if field_type == "String":
-                    column_config[field_name] = st.column_config.TextColumn(label=field_name)
-                elif field_type == "Number":
-                    column_config[field_name] = st.column_config.NumberColumn(label=field_name)
-                elif field_type == "Boolean":
-                    column_config[field_name] = st.column_config.CheckboxColumn(label=field_name)
-                elif field_type == "Date":
-                    column_config[field_name] = st.column_config.DateColumn(label=field_name)
-                else:
-                    column_config[field_name] = st.column_config.Column(label=field_name)
+            form_schema = get_schema_from_form()
+            display_field_names = [field_name for field_name in sorted(form_schema) if not field_name.startswith("_")]
+            column_config = get_column_config(form_schema)
             
             if display_field_names:
                 st.data_editor(
@@ -93,36 +91,32 @@ def get_insert_data_page():
                 if "insert_data_editor" in st.session_state and "added_rows" in st.session_state.insert_data_editor:
                     added_rows = st.session_state.insert_data_editor["added_rows"]
                     if added_rows:
-                        for added_row in added_rows:
-                            new_doc = {}
-                            for col, new_value in added_row.items():
-                                if not pd.isna(new_value):
-                                    new_doc[col] = new_value
-                            
-                            if new_doc:
-                                new_doc = clean_up_data(operation_type="insert", data=new_doc, hidden_fields=True, cal_rate=True)
-                                documents_to_insert.append(new_doc)
+                        # Rows without any value are skipped
+                        added_data = pd.DataFrame(added_rows).dropna(how="all")
+                        documents_to_insert = normalize_dataframe(added_data, operation_type="insert", hidden_fields=True, cal_rate=True, schema=form_schema)
                                 
                         if st.button("Insert Data", disabled=not documents_to_insert):
                             if db_name and collection_name:
                                 result = execute_batch_operations(operation_type="insert", operations_data=documents_to_insert)
-                                if result["success"] > 0:
-                                    st.success(f"Successfully inserted {result['success']} document(s) in batch mode.")
+                                if result["success"] > 0 or result["queued"] > 0:
+                                    # The fields of the schema form become the schema of the new collection
+                                    save_collection_schema(db_name, collection_name, form_schema)
                                     st.session_state.insert_data_editor["added_rows"] = {}
-                                if result["errors"] > 0:
-                                    st.error(f"Failed to insert {result['errors']} document(s).")
                             else:
                                 st.warning("Please enter both database and collection names.")
         else:
             get_blank_form(disabled=False)
+            form_schema = get_schema_from_form()
             data = prepare_data_for_blank_form()
-            data = clean_up_data(operation_type="insert", data=data, hidden_fields=True, cal_rate=True)
+            data = clean_up_data(operation_type="insert", data=data, hidden_fields=True, cal_rate=True, schema=form_schema)
             if st.button("Insert Data", disabled=not data):
                 if db_name and collection_name:
-                    execute_db_operation("insert", data=data)
+                    if execute_db_operation("insert", data=data):
+                        save_collection_schema(db_name, collection_name, form_schema)
                 else:
                     st.warning("Please enter both database and collection names.")
     else:
+        schema = get_collection_schema(db_name, collection_name)
         batch_mode = st.toggle("Use batch update mode", value=True, help="Update all documents in a single database operation")
         if batch_mode: 
             display_cols = [col for col in collection_data.columns.tolist() if not col.startswith("_")]
@@ -131,6 +125,7 @@ def get_insert_data_page():
                 use_container_width=True,
                 hide_index=True,
                 column_order=display_cols,
+                column_config=get_column_config({col: field_type for col, field_type in (schema or {}).items() if col in display_cols}),
                 key="insert_data_editor",
                 num_rows="dynamic",
             )
@@ -139,30 +134,21 @@ def get_insert_data_page():
             if "insert_data_editor" in st.session_state and "added_rows" in st.session_state.insert_data_editor:
                 added_rows = st.session_state.insert_data_editor["added_rows"]
                 if added_rows:
-                    for added_row in added_rows:
-                        new_doc = {}
-                        for col, new_value in added_row.items():
-                            if not pd.isna(new_value):
-                                new_doc[col] = new_value
-                        
-                        if new_doc:
-                            new_doc = clean_up_data(operation_type="insert", data=new_doc, hidden_fields=True, cal_rate=True)
-                            documents_to_insert.append(new_doc)
+                    # Rows without any value are skipped
+                    added_data = pd.DataFrame(added_rows).dropna(how="all")
+                    documents_to_insert = normalize_dataframe(added_data, operation_type="insert", hidden_fields=True, cal_rate=True, schema=schema)
                     
                     if st.button("Insert Data", disabled=not documents_to_insert):
                         if db_name and collection_name:
                             result = execute_batch_operations(operation_type="insert", operations_data=documents_to_insert)
-                            if result["success"] > 0:
-                                st.success(f"Successfully inserted {result['success']} document(s) in batch mode.")
+                            if result["success"] > 0 or result["queued"] > 0:
                                 st.session_state.insert_data_editor["added_rows"] = {}
-                            if result["errors"] > 0:
-                                st.error(f"Failed to insert {result['errors']} document(s).")
                         else:
                             st.warning("Please enter both database and collection names.")
         else:
-            get_form_from_data(data=collection_data)
+            get_form_from_data(data=collection_data, schema=schema)
             data = prepare_data_for_existing_form()
-            data = clean_up_data(operation_type="insert", data=data, hidden_fields=True, cal_rate=True)
+            data = clean_up_data(operation_type="insert", data=data, hidden_fields=True, cal_rate=True, schema=schema)
             if st.button(label="Insert Data", disabled=not data):
                 if db_name and collection_name:
                     execute_db_operation("insert", data=data)
@@ -170,14 +156,18 @@ def get_insert_data_page():
                     st.warning("Please enter both database and collection names.")
     
 def get_fetch_data_page():
-    from functions.ui.db_func_ui import get_collection_data_wrapper
     db_name, collection_name = create_db_and_collection_input()
     st.divider()
     
     if db_name is None and collection_name is None:
         st.stop()
     
-    collection_data = get_collection_data_wrapper(db_name, collection_name)
+    from functions.ui.db_func_ui import refresh_collection_schema
+    if st.button("Refresh Schema", help="Infer the field types from a new sample of the documents, unless they were set in the schema form"):
+        if refresh_collection_schema(db_name, collection_name) is not None:
+            st.success(f"Schema of '{collection_name}' refreshed.")
+    
+    collection_data = get_paginated_collection_data(db_name, collection_name, key="fetch", arrow_backed=True)
     if collection_data is not None:
         collection_data = _tidy_up_collection_data(collection_data=collection_data, hide_id=True)
         st.dataframe(data=collection_data, hide_index=True, use_container_width=True)
@@ -194,12 +184,15 @@ def get_update_data_page():
     if db_name is None and collection_name is None:
         st.stop()
         
-    collection_data = get_collection_data_wrapper(db_name, collection_name)
+    from functions.ui.db_func_ui import get_display_projection
+    # The visible fields and _id, which identifies the edited documents
+    collection_data = get_paginated_collection_data(db_name, collection_name, key="update", reset_keys=("update_data_editor", "update_data_frame"), projection=get_display_projection(db_name, collection_name))
     if collection_data is None:
         st.warning("No data found in the specified collection.")
         st.stop()
     else:
-        collection_data = collection_data.sort_values(by="date", ascending=False).reset_index(drop=True) if "date" in collection_data.columns else collection_data
+        from functions.ui.db_func_ui import get_collection_schema
+        schema = get_collection_schema(db_name, collection_name)
         display_cols = [col for col in collection_data.columns.tolist() if not col.startswith("_")]
         batch_mode = st.toggle("Use batch update mode", value=False, help="Update all documents in a single database operation")
         
@@ -217,26 +210,22 @@ def get_update_data_page():
             if "update_data_editor" in st.session_state and "edited_rows" in st.session_state.update_data_editor:
                 edited_rows = st.session_state.update_data_editor["edited_rows"]
                 if edited_rows: # {row_index: {col_name: new_value}}
+                    edited_data = {}
                     for row, values in edited_rows.items():
                         _id = collection_data.iloc[row]["_id"]
-                        updated_data[_id] = {}
-                        for col, new_value in values.items():
-                            updated_data[_id][col] = new_value
+                        edited_data[_id] = dict(values)
                         # if only either from_amt or to_amt is updated, then copy the other one, for updating the _rate
-                        if "from_amt" in updated_data[_id] and "to_amt" not in updated_data[_id]:
-                            updated_data[_id]["to_amt"] = collection_data.iloc[row]["to_amt"]
-                        elif "to_amt" in updated_data[_id] and "from_amt" not in updated_data[_id]:
-                            updated_data[_id]["from_amt"] = collection_data.iloc[row]["from_amt"]
-                        updated_data[_id] = clean_up_data(operation_type="update", data=updated_data[_id], hidden_fields=True, cal_rate=True)
+                        if "from_amt" in edited_data[_id] and "to_amt" not in edited_data[_id]:
+                            edited_data[_id]["to_amt"] = collection_data.iloc[row]["to_amt"]
+                        elif "to_amt" in edited_data[_id] and "from_amt" not in edited_data[_id]:
+                            edited_data[_id]["from_amt"] = collection_data.iloc[row]["from_amt"]
+                    # Normalize all edited rows at once; columns a row did not edit are NaN and dropped from its update
+                    edited_frame = pd.DataFrame(list(edited_data.values()))
+                    updated_data = dict(zip(edited_data.keys(), normalize_dataframe(edited_frame, operation_type="update", hidden_fields=True, cal_rate=True, schema=schema)))
                     if st.button("Update Data", disabled=not updated_data):
                         if db_name and collection_name:
                             # Use batch update for efficiency
-                            result = execute_batch_operations("update", updated_data)
-                            if result["success"] > 0:
-                                st.success(f"Successfully updated {result['success']} document(s) in batch mode.")
-                            if result["errors"] > 0:
-                                st.error(f"Failed to update {result['errors']} document(s).")
-                                
+                            execute_batch_operations("update", updated_data)
                             st.session_state.update_data_editor["edited_rows"] = {}
         else:
             st.write("Select a row to update:")
@@ -255,7 +244,7 @@ def get_update_data_page():
                 if selected_row:
                     selected_row_index = selected_row[0]
                     selected_row_data = collection_data.iloc[[selected_row_index]]
-                    get_form_from_data(data=selected_row_data, pre_filled=True)
+                    get_form_from_data(data=selected_row_data, pre_filled=True, schema=schema)
                     
                     updated_data = {}
                     for col in selected_row_data.columns:
@@ -266,7 +255,7 @@ def get_update_data_page():
                         updated_data["to_amt"] = selected_row_data["to_amt"].values[0]
                     elif "to_amt" in updated_data and "from_amt" not in updated_data:
                         updated_data["from_amt"] = selected_row_data["from_amt"].values[0]
-                    updated_data = clean_up_data(operation_type="update", data=updated_data, hidden_fields=False, cal_rate=True)
+                    updated_data = clean_up_data(operation_type="update", data=updated_data, hidden_fields=False, cal_rate=True, schema=schema)
                     if st.button("Update Data", disabled=not updated_data):
                         if db_name and collection_name:
                             execute_db_operation("update", data=updated_data, query={"_id": selected_row_data["_id"].values[0]})
@@ -274,7 +263,7 @@ def get_update_data_page():
                             st.warning("Please enter both database and collection names.")
                     
 def get_delete_data_page():
-    from functions.ui.db_func_ui import confirmation_dialog
+    from functions.ui.db_func_ui import confirmation_dialog, get_display_projection
     db_name, collection_name = create_db_and_collection_input()
     st.divider()
     
@@ -284,12 +273,11 @@ def get_delete_data_page():
     if db_name is None and collection_name is None:
         st.stop()
         
-    collection_data = get_collection_data_wrapper(db_name, collection_name)
+    collection_data = get_paginated_collection_data(db_name, collection_name, key="delete", reset_keys=("delete_data_frame",), projection=get_display_projection(db_name, collection_name))
     if collection_data is None:
         st.warning("No data found in the specified collection.")
         st.stop()
     else:
-        collection_data = collection_data.sort_values(by="date", ascending=False).reset_index(drop=True) if "date" in collection_data.columns else collection_data
         display_cols = [col for col in collection_data.columns.tolist() if not col.startswith("_")]
         st.dataframe(
             data=collection_data,
@@ -317,3 +305,452 @@ def get_delete_data_page():
                         )
                     else:
                         st.warning("Please enter both database and collection names.")
+
+def get_write_queue_page():
+    from functions.db.write_behind import get_write_behind_status, flush_write_behind
+    
+    refresh_col, flush_col = st.columns([1, 1])
+    refresh_col.button("Refresh", key="write_queue_refresh", use_container_width=True)
+    if flush_col.button("Flush", key="write_queue_flush", help="Wait until every queued document is written", use_container_width=True):
+        if flush_write_behind():
+            st.success("Every queued document is written.")
+        else:
+            st.warning("Some documents are still queued.")
+    
+    status = get_write_behind_status()
+    pending_col, committed_col, failed_col = st.columns(3)
+    pending_col.metric("Pending", status["pending"])
+    committed_col.metric("Committed", status["committed"])
+    failed_col.metric("Failed", status["failed"])
+    
+    if not status["jobs"]:
+        st.info("No documents have been queued in this process.")
+        st.stop()
+    
+    st.dataframe(
+        data=pd.DataFrame([
+            {
+                "Job": job["id"],
+                "Collection": f"{job['database']}.{job['collection']}",
+                "Status": job["status"],
+                "Documents": job["total"],
+                "Committed": job["committed"],
+                "Failed": job["failed"],
+                "Submitted At": job["submitted_at"],
+                "Committed At": job["committed_at"],
+            }
+            for job in status["jobs"]
+        ]),
+        hide_index=True,
+        use_container_width=True,
+    )
+    
+    failures = [{"Job": job["id"], "Document": str(failure["target"]), "Code": failure["code"], "Error": failure["error"]} for job in status["jobs"] for failure in job["failures"]]
+    if failures:
+        st.error(f"{len(failures)} document(s) failed.")
+        st.dataframe(data=pd.DataFrame(failures), hide_index=True, use_container_width=True)
+
+def get_slow_queries_page():
+    import json
+    from functions.db.mongo_query_log import get_slow_queries, reset_query_log, _get_slow_query_ms
+    from functions.db.mongo_health import get_health_status
+    
+    health = get_health_status()
+    if health and health["avg_latency_ms"] is not None:
+        st.caption(f"Round-trip latency: {health['latency_ms']:.1f} ms (average {health['avg_latency_ms']:.1f} ms)")
+    
+    order_col, refresh_col, reset_col = st.columns([4, 1, 1], vertical_alignment="bottom")
+    order_labels = {"Total time": "total_ms", "Slowest run": "max_ms", "Slow runs": "slow_count", "Runs": "count"}
+    order_by = order_col.selectbox("Order by", list(order_labels), key="slow_queries_order")
+    refresh_col.button("Refresh", key="slow_queries_refresh", use_container_width=True)
+    if reset_col.button("Reset", key="slow_queries_reset", help="Drop the recorded queries and plans", use_container_width=True):
+        reset_query_log()
+    
+    queries = get_slow_queries(order_by=order_labels[order_by])
+    if not queries:
+        st.info("No queries have been recorded in this process.")
+        st.stop()
+    
+    st.dataframe(
+        data=pd.DataFrame([
+            {
+                "Action": query["action"],
+                "Command": query["command"],
+                "Namespace": query["namespace"],
+                "Runs": query["count"],
+                "Total (ms)": round(query["total_ms"], 1),
+                "Average (ms)": round(query["avg_ms"], 1),
+                "Slowest (ms)": round(query["max_ms"], 1),
+                "Slow Runs": query["slow_count"],
+                "Documents": query["documents"],
+                "Plan": (query["plan"] or {}).get("scan") or ("Error" if (query["plan"] or {}).get("error") else ""),
+                "Shape": query["shape"],
+            }
+            for query in queries
+        ]),
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.caption(f"Queries slower than {_get_slow_query_ms():.0f} ms get their executionStats plan captured.")
+    
+    explained = [query for query in queries if query["plan"]]
+    if not explained:
+        return
+    labels = [f"{query['action']} · {query['command']} {query['namespace']} · {query['shape'][:80]}" for query in explained]
+    selected = st.selectbox("Plan of a slow query", range(len(explained)), format_func=lambda index: labels[index], key="slow_queries_plan")
+    plan = explained[selected]["plan"]
+    if plan.get("error"):
+        st.error(f"The plan could not be captured: {plan['error']}")
+        return
+    if plan["scan"] == "COLLSCAN":
+        st.warning("The query scans the whole collection, an index on its filter and sort fields would avoid it.")
+    stage_col, keys_col, docs_col, returned_col = st.columns(4)
+    stage_col.metric("Plan", plan["scan"] or "-")
+    keys_col.metric("Keys Examined", plan["keys_examined"])
+    docs_col.metric("Documents Examined", plan["docs_examined"])
+    returned_col.metric("Returned", plan["returned"])
+    st.write(f"Stages: {' → '.join(reversed(plan['stages']))}" + (f" · Indexes: {', '.join(plan['indexes'])}" if plan["indexes"] else ""))
+    with st.expander("Explain output"):
+        st.code(json.dumps(plan["explain"], indent=2, default=str), language="json")
+
+def get_capacity_page():
+    from datetime import datetime, timedelta
+    from functions.db.mongo_capacity import record_capacity_snapshot, get_latest_snapshot, get_capacity_history, get_capacity_growth
+    from functions.ui.db_func_ui import get_cached_mongo_client, show_mongo_only_notice
+    from functions.utils import _get_default_db, _get_setting
+    
+    if show_mongo_only_notice("Capacity"):
+        return
+    client = get_cached_mongo_client()
+    if not client:
+        st.error("Failed to connect to MongoDB.")
+        st.stop()
+    
+    metrics_db = _get_default_db()
+    growth_days = int(_get_setting("app", "capacity_growth_days", 30))
+    record_col, caption_col = st.columns([1, 4], vertical_alignment="center")
+    record_now = record_col.button("Record Snapshot", help="Measure every database and collection now", use_container_width=True)
+    try:
+        # A snapshot is recorded when the page is opened and the latest one is older than the interval
+        record_capacity_snapshot(client, metrics_db, min_interval=0 if record_now else float(_get_setting("app", "capacity_snapshot_interval", 86400)))
+        snapshot = get_latest_snapshot(client, metrics_db)
+        growth = get_capacity_growth(client, metrics_db, since=datetime.now() - timedelta(days=growth_days))
+    except Exception as e:
+        st.error(f"Error reading storage statistics: {e}")
+        st.stop()
+    
+    if not snapshot:
+        st.info("No storage statistics have been recorded.")
+        st.stop()
+    caption_col.caption(f"Snapshot of {snapshot[0]['_captured_at']:%Y-%m-%d %H:%M}, growth over the last {growth_days} days")
+    
+    def _to_table(rows: list, name_field: str) -> pd.DataFrame:
+        mib = 2 ** 20
+        return pd.DataFrame([
+            {
+                name_field.title(): row[name_field],
+                "Documents": row["count"],
+                "Avg Size (B)": round(row["avg_obj_size"]),
+                "Data (MiB)": round(row["data_size"] / mib, 2),
+                "Storage (MiB)": round(row["storage_size"] / mib, 2),
+                "Indexes (MiB)": round(row["index_size"] / mib, 2),
+                "Document Growth": (growth.get((row["database"], row["collection"]), {}).get("count") or {}).get("change"),
+                "Storage Growth (MiB)": round(((growth.get((row["database"], row["collection"]), {}).get("storage_size") or {}).get("change") or 0) / mib, 2),
+            }
+            for row in rows
+        ])
+    
+    st.dataframe(data=_to_table([row for row in snapshot if row["collection"] is None], "database"), hide_index=True, use_container_width=True)
+    
+    db_names = sorted({row["database"] for row in snapshot})
+    db_name = st.selectbox("Select a database", db_names, key="capacity_db")
+    collection_rows = sorted([row for row in snapshot if row["database"] == db_name and row["collection"] is not None], key=lambda row: row["storage_size"] + row["index_size"], reverse=True)
+    if collection_rows:
+        st.dataframe(data=_to_table(collection_rows, "collection"), hide_index=True, use_container_width=True)
+    
+    trend_target = st.selectbox("Trend of", ["Database total"] + [row["collection"] for row in collection_rows], key="capacity_trend")
+    history = get_capacity_history(client, metrics_db, db_name, None if trend_target == "Database total" else trend_target)
+    if len(history) < 2:
+        st.info("The trend is shown once two snapshots are recorded.")
+        return
+    trend = pd.DataFrame(history).set_index("_captured_at")
+    size_col, count_col = st.columns(2)
+    size_col.line_chart(trend[["data_size", "storage_size", "index_size"]] / 2 ** 20, y_label="MiB")
+    count_col.line_chart(trend[["count"]], y_label="Documents")
+
+def get_audit_log_page():
+    from datetime import datetime, date, time
+    from functions.db.mongo_audit import get_audit_records, take_snapshot_if_due, get_collection_at
+    from functions.ui.db_func_ui import get_cached_mongo_client, _to_dataframe, get_collection_schema, show_mongo_only_notice
+    from functions.utils import _get_setting
+    
+    if show_mongo_only_notice("The audit log"):
+        return
+    db_name, collection_name = create_db_and_collection_input(key="audit_input")
+    st.divider()
+    
+    if db_name is None and collection_name is None:
+        st.stop()
+    
+    client = get_cached_mongo_client()
+    if not client:
+        st.error("Failed to connect to MongoDB.")
+        st.stop()
+    
+    snapshot_col, caption_col = st.columns([1, 4], vertical_alignment="center")
+    snapshot_now = snapshot_col.button("Take Snapshot", help="Copy the collection now, so point-in-time views after now replay fewer changes", use_container_width=True)
+    try:
+        # A snapshot is taken when the page is opened and the latest one is older than the interval
+        snapshot = take_snapshot_if_due(client, db_name, collection_name, min_interval=0 if snapshot_now else float(_get_setting("app", "audit_snapshot_interval", 86400)))
+        records = get_audit_records(client, db_name, collection_name, limit=int(_get_setting("app", "audit_page_size", 100)))
+    except Exception as e:
+        st.error(f"Error reading the audit log: {e}")
+        st.stop()
+    if snapshot:
+        caption_col.caption(f"Snapshot of {snapshot['documents']} document(s) taken at {snapshot['taken_at']:%Y-%m-%d %H:%M:%S}")
+    
+    st.subheader("Recent Changes")
+    if records:
+        st.dataframe(
+            data=pd.DataFrame([
+                {
+                    "Time": record["_at"],
+                    "Operation": record["operation"],
+                    "Document": str(record["doc_id"]),
+                    "Changed Fields": ", ".join(sorted(record["changes"])) if record["changes"] else "",
+                    "Actor": record["actor"],
+                }
+                for record in records
+            ]),
+            hide_index=True,
+            use_container_width=True,
+        )
+    else:
+        st.info("No changes have been recorded for this collection.")
+    
+    st.subheader("Point-in-time View")
+    date_col, time_col = st.columns(2)
+    at_date = date_col.date_input("Date", value=date.today(), max_value=date.today(), key="audit_at_date")
+    at_time = time_col.time_input("Time", value=time(23, 59), step=60, key="audit_at_time")
+    if st.button("Show Collection"):
+        at = datetime.combine(at_date, at_time)
+        try:
+            state = get_collection_at(client, db_name, collection_name, at)
+        except Exception as e:
+            st.error(f"Error rebuilding the collection: {e}")
+            st.stop()
+        source = f"the snapshot of {state['snapshot_at']:%Y-%m-%d %H:%M:%S}" if state["snapshot_at"] else "an empty collection (no snapshot before this time)"
+        st.caption(f"{len(state['documents'])} document(s) at {at:%Y-%m-%d %H:%M}, rebuilt from {source} and {state['replayed']} change(s)")
+        if state["documents"]:
+            data = _to_dataframe(state["documents"], schema=get_collection_schema(db_name, collection_name))
+            st.dataframe(data=_tidy_up_collection_data(data, hide_id=False), hide_index=True, use_container_width=True)
+
+def get_archive_data_page():
+    from datetime import datetime, date, time, timedelta
+    from functions.db.mongo_archive import DATE_FIELD, archive_collection, get_archive_manifest
+    from functions.ui.db_func_ui import get_cached_mongo_client, show_mongo_only_notice
+    from functions.utils import _get_setting
+    
+    if show_mongo_only_notice("Archiving"):
+        return
+    db_name, collection_name = create_db_and_collection_input(key="archive_input")
+    st.divider()
+    
+    if db_name is None and collection_name is None:
+        st.stop()
+    
+    client = get_cached_mongo_client()
+    if not client:
+        st.error("Failed to connect to MongoDB.")
+        st.stop()
+    
+    manifest = get_archive_manifest(db_name, collection_name)
+    if manifest:
+        st.caption(f"{manifest['archived']} document(s) archived before {manifest['cutoff']:%Y-%m-%d}, last run {manifest['last_run'][:16].replace('T', ' ')}")
+    
+    default_cutoff = date.today() - timedelta(days=int(_get_setting("app", "archive_after_days", 365)))
+    cutoff_date = st.date_input("Archive transactions dated before", value=default_cutoff, max_value=date.today(), key="archive_cutoff")
+    cutoff = datetime.combine(cutoff_date, time())
+    try:
+        to_archive = client[db_name][collection_name].count_documents({DATE_FIELD: {"$lt": cutoff}})
+    except Exception as e:
+        st.error(f"Error counting the documents to archive: {e}")
+        st.stop()
+    st.write(f"{to_archive} document(s) will be moved to the archive.")
+    
+    if st.button("Archive Data", disabled=to_archive == 0):
+        progress = st.progress(0.0)
+        try:
+            result = archive_collection(
+                client, db_name, collection_name, cutoff,
+                batch_size=int(_get_setting("app", "archive_batch_size", 5000)),
+                progress_callback=lambda archived: progress.progress(min(archived / to_archive, 1.0)),
+            )
+            st.success(f"{result['archived']} document(s) archived in {len(result['files'])} file(s).")
+        except Exception as e:
+            # Documents are only deleted after their file is written, so a failed run can be repeated
+            st.error(f"Error archiving data: {e}")
+
+def get_index_usage_page():
+    from functions.db.mongo_index_management import get_index_stats, get_registered_collections, get_registered_index_names
+    from functions.ui.db_func_ui import get_cached_mongo_client, ensure_app_indexes, show_mongo_only_notice
+    from functions.utils import _get_default_collection
+    
+    if show_mongo_only_notice("Index usage"):
+        return
+    if st.button("Ensure Indexes", help="Create the registered indexes on the default database if they are missing"):
+        results = ensure_app_indexes(force=True)
+        if results is None:
+            st.error("Failed to ensure indexes.")
+        else:
+            failed = [result for result in results if result["status"] != "ok"]
+            if failed:
+                for result in failed:
+                    st.error(f"Index '{result['index']}' on '{result['collection']}' failed: {result['error']}")
+            else:
+                st.success(f"{len(results)} registered index(es) are in place.")
+    
+    db_name, collection_name = create_db_and_collection_input()
+    st.divider()
+    
+    if db_name is None and collection_name is None:
+        st.stop()
+    
+    client = get_cached_mongo_client()
+    if not client:
+        st.error("Failed to connect to MongoDB.")
+        st.stop()
+    
+    try:
+        index_stats = get_index_stats(client, db_name, collection_name)
+    except Exception as e:
+        st.error(f"Error reading index statistics: {e}")
+        st.stop()
+    
+    registered_names = []
+    for role, registered_collection in get_registered_collections(_get_default_collection()).items():
+        if registered_collection == collection_name:
+            registered_names += get_registered_index_names(role)
+    
+    index_data = pd.DataFrame([
+        {
+            "Name": stat["name"],
+            "Key": stat["key"],
+            "Unique": stat["unique"],
+            "Registered": stat["name"] in registered_names,
+            "Accesses": stat["accesses"],
+            "Since": stat["since"],
+        }
+        for stat in index_stats
+    ])
+    st.dataframe(data=index_data, hide_index=True, use_container_width=True)
+    
+    missing = [name for name in registered_names if name not in index_data["Name"].tolist()]
+    if missing:
+        st.warning(f"Registered index(es) missing on this collection: {', '.join(missing)}")
+
+def get_export_data_page():
+    import os
+    from datetime import datetime
+    from functions.db.mongo_export import EXPORT_FORMATS, export_collection, parse_export_query, parse_export_projection
+    from functions.ui.db_func_ui import get_cached_mongo_client, show_mongo_only_notice
+    from functions.utils import _get_data_dir
+    
+    if show_mongo_only_notice("Export"):
+        return
+    db_name, collection_name = create_db_and_collection_input()
+    st.divider()
+    
+    if db_name is None and collection_name is None:
+        st.stop()
+    
+    format_col, batch_col = st.columns([1, 1])
+    file_format = format_col.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+    batch_size = batch_col.number_input("Batch size", min_value=100, max_value=100000, value=1000, step=100, key="export_batch_size")
+    query_text = st.text_area("Filter (JSON, optional)", placeholder='{"from_curr": "HKD"}', key="export_query")
+    fields_text = st.text_input("Fields (comma-separated, optional)", placeholder="date, from_curr, to_curr, from_amt, to_amt", key="export_fields")
+    
+    if st.button("Export Data"):
+        try:
+            query = parse_export_query(query_text)
+            projection = parse_export_projection(fields_text)
+        except Exception as e:
+            st.error(f"Invalid filter: {e}")
+            st.stop()
+        
+        client = get_cached_mongo_client()
+        if not client:
+            st.error("Failed to connect to MongoDB.")
+            st.stop()
+        
+        file_name = f"{db_name}_{collection_name}_{datetime.now():%Y%m%d_%H%M%S}{EXPORT_FORMATS[file_format]}"
+        file_path = os.path.join(_get_data_dir("exports"), file_name)
+        progress = st.empty()
+        try:
+            written = export_collection(
+                client, db_name, collection_name, file_path,
+                file_format=file_format, query=query, projection=projection, batch_size=int(batch_size),
+                progress_callback=lambda count: progress.write(f"{count} document(s) written..."),
+            )
+            st.session_state["export_file_path"] = file_path
+            progress.success(f"Exported {written} document(s) to '{file_path}'.")
+        except Exception as e:
+            progress.error(f"Error exporting data: {e}")
+    
+    file_path = st.session_state.get("export_file_path")
+    if file_path and os.path.exists(file_path):
+        with open(file_path, "rb") as file:
+            st.download_button("Download Export", data=file, file_name=os.path.basename(file_path))
+
+def get_import_data_page():
+    from functions.bulk_import import IMPORT_FORMATS, read_import_chunks, import_documents
+    from functions.ui.db_func_ui import get_cached_mongo_client, get_collection_schema, get_owner_input, get_target_owner, show_mongo_only_notice
+    
+    if show_mongo_only_notice("Import"):
+        return
+    db_name, collection_name = create_db_and_collection_input()
+    st.divider()
+    
+    if db_name is None and collection_name is None:
+        st.stop()
+    
+    uploaded_file = st.file_uploader("Upload a CSV or Parquet file", type=IMPORT_FORMATS, key="import_file")
+    chunk_col, batch_col = st.columns([1, 1])
+    chunk_size = chunk_col.number_input("Rows read per chunk", min_value=100, max_value=100000, value=5000, step=100, key="import_chunk_size")
+    batch_size = batch_col.number_input("Documents per write batch", min_value=10, max_value=10000, value=500, step=10, key="import_batch_size")
+    get_owner_input("import")
+    
+    if st.button("Import Data", disabled=uploaded_file is None):
+        client = get_cached_mongo_client()
+        if not client:
+            st.error("Failed to connect to MongoDB.")
+            st.stop()
+        
+        file_format = "parquet" if uploaded_file.name.lower().endswith(".parquet") else "csv"
+        progress = st.empty()
+        try:
+            result = import_documents(
+                client, db_name, collection_name,
+                read_import_chunks(uploaded_file, file_format, chunk_size=int(chunk_size)),
+                batch_size=int(batch_size),
+                progress_callback=lambda partial: progress.write(f"{partial['total']} row(s) read, {partial['inserted']} inserted, {len(partial['rejected'])} rejected..."),
+                schema=get_collection_schema(db_name, collection_name),
+                owner=get_target_owner("import"),
+                actor=st.session_state.get("logged_in_user"),
+            )
+        except Exception as e:
+            progress.error(f"Error importing data: {e}")
+            st.stop()
+        
+        progress.empty()
+        if result["inserted"] > 0:
+            st.success(f"Imported {result['inserted']} of {result['total']} row(s) into '{collection_name}'.")
+        if result["duplicates"]:
+            st.warning(f"{result['duplicates']} row(s) repeat a transaction that is already recorded and were skipped.")
+        if result["rejected"]:
+            st.error(f"{len(result['rejected'])} row(s) were rejected.")
+            st.dataframe(
+                data=pd.DataFrame(result["rejected"]).rename(columns={"row": "Row", "reason": "Reason"}),
+                hide_index=True,
+                use_container_width=True,
+            )
@@ -1,58 +1,470 @@
 import pandas as pd
 import streamlit as st
-from functions.db.mongo_connection import get_mongo_client
-from functions.db.mongo_collection_management import get_all_databases, get_all_collections
+from functions.db.mongo_connection import get_shared_mongo_client
+from functions.db.mongo_collection_management import get_cached_databases, get_cached_collections, invalidate_catalog
+from functions.normalization import FINGERPRINT_FIELD, FINGERPRINT_FIELDS, OWNER_FIELD, compute_fingerprint
 from typing import Literal
 
-@st.cache_resource
+# Server-side sort of the paginated reads, see get_collection_page
+PAGE_SORT = [("date", -1), ("_id", -1)]
+# Fields stamped by the write paths, only shown by pages that display the hidden fields
+HIDDEN_FIELDS = ("_created_at", "_updated_at", "_rate", OWNER_FIELD, FINGERPRINT_FIELD)
+
 def get_cached_mongo_client():
     """
-    Cache the MongoDB client connection using Streamlit's cache_resource decorator.
-    This ensures the connection persists across Streamlit reruns.
+    Get the shared MongoDB client from the process-wide client registry.
+    The connection persists across Streamlit reruns and is shared with the auth functions.
     """
-    return get_mongo_client()
+    return get_shared_mongo_client()
 
-def create_db_and_collection_input():
-    all_database, all_collections = [], []
+def get_local_backend():
+    """
+    Get the embedded SQLite backend when storage.backend is "sqlite", or None when the app runs on MongoDB.
+    With the embedded backend, the catalog, CRUD, paginated reads, schema registry and user logins go through its
+    StorageBackend interface; the pages that need MongoDB show show_mongo_only_notice instead.
+    """
+    from functions.db.storage_backend import SQLiteBackend, get_storage_backend
+    from functions.utils import _get_setting
+    if _get_setting("storage", "backend", "mongo") != "sqlite":
+        return None
+    backend = get_storage_backend()
+    return backend if isinstance(backend, SQLiteBackend) else None
+
+def show_mongo_only_notice(page_name: str) -> bool:
+    """
+    Show that a page needs MongoDB when the app runs on the embedded SQLite backend.
+    
+    Args:
+        page_name: The name of the page shown in the notice
+        
+    Returns:
+        bool: True if the notice was shown and the page should not be rendered
+    """
+    if get_local_backend() is None:
+        return False
+    st.info(f"{page_name} is only available on MongoDB. Set storage.backend to \"mongo\" in the settings to use it.", icon="ℹ️")
+    return True
+
+def get_cached_read(key: tuple, read, default=None, local_read=None):
+    """
+    Serve a read from the query cache. While the database is unreachable, the last cached result is served
+    instead, even if the collection was written since, and a read that fails with a connection error counts
+    towards the circuit breaker of the health monitor.
+    
+    Args:
+        key: The cache key built with make_query_key
+        read: Function taking the MongoDB client that reads the result from the database
+        default: The value returned when the database is unreachable and the read was never cached
+        local_read: Function taking the embedded backend that reads the result when storage.backend is "sqlite",
+                    reads without one go to MongoDB
+    """
+    from pymongo.errors import ConnectionFailure
+    from functions.db.mongo_health import report_connection_failure
+    from functions.db.query_cache import get_or_compute, get_stale_result
+    if local_read is not None:
+        backend = get_local_backend()
+        if backend is not None:
+            return get_or_compute(key, lambda: local_read(backend))
     client = get_cached_mongo_client()
+    if client is None:
+        return get_stale_result(key, default)
+    try:
+        return get_or_compute(key, lambda: read(client))
+    except ConnectionFailure as e:
+        print(f"Read failed, serving the cached result: {e}")
+        report_connection_failure(client, e)
+        return get_stale_result(key, default)
+
+def show_health_banner():
+    """
+    Show a degraded-mode banner while the database is unreachable, from the state of the health monitor.
+    """
+    from functions.db.mongo_health import get_health_status
+    health = get_health_status()
+    if health is None or health["available"]:
+        return
+    since = f" since {health['down_since']:%H:%M:%S}" if health["down_since"] else ""
+    st.warning(
+        f"The database is unreachable{since}. Pages show the last loaded data and changes cannot be saved until it is back.",
+        icon="⚠️",
+    )
+
+@st.cache_resource
+def _ensure_app_indexes_once(db_name: str, collection_name: str):
+    """
+    Apply the index registry once per process. Failures are raised so they are not cached.
+    """
+    from functions.db.mongo_index_management import ensure_indexes
+    client = get_cached_mongo_client()
+    if not client:
+        raise ConnectionError("Failed to connect to MongoDB.")
+    return ensure_indexes(client=client, db_name=db_name, transaction_collection=collection_name)
+
+def ensure_app_indexes(force: bool = False):
+    """
+    Make sure the registered indexes exist on the default database at startup.
     
-    if client:
-        all_database = get_all_databases(client)
-        db_name = st.selectbox("Select a database", all_database)
+    Args:
+        force: Apply the registry again even if it was already applied in this process
+    """
+    from functions.utils import _get_default_db, _get_default_collection
+    if get_local_backend() is not None:
+        # The tables of the embedded backend are created with their indexes
+        return None
+    if force:
+        _ensure_app_indexes_once.clear()
+    try:
+        return _ensure_app_indexes_once(_get_default_db(), _get_default_collection())
+    except Exception as e:
+        print(f"Failed to ensure indexes: {e}")
+        return None
+
+def create_db_and_collection_input(key: str = "db_input"):
+    """
+    Render the choice of a database and a collection of the storage backend.
+    
+    Args:
+        key: The prefix of the session state keys of the inputs
+    """
+    from functions.db.mongo_async import run_concurrently, get_cached_databases_async, get_cached_collections_async
+    all_database, all_collections = [], []
+    backend = get_local_backend()
+    client = get_cached_mongo_client() if backend is None else None
+    
+    if backend or client:
+        # The database selected on the previous rerun is usually still selected,
+        # so its collections are listed together with the databases
+        previous_db_name = st.session_state.get(f"{key}_db")
+        previous_collections = None
+        if backend:
+            # The embedded catalog is a query on the local file, it is not cached
+            all_database = backend.list_databases()
+            previous_collections = backend.list_collections(previous_db_name) if previous_db_name else None
+        elif previous_db_name:
+            all_database, previous_collections = run_concurrently(
+                get_cached_databases_async(client),
+                get_cached_collections_async(client, previous_db_name),
+            )
+        else:
+            all_database = get_cached_databases(client)
+        select_col, refresh_col = st.columns([9, 1], vertical_alignment="bottom")
+        db_name = select_col.selectbox("Select a database", all_database, key=f"{key}_db")
+        refresh_col.button("Refresh", key=f"{key}_refresh", help="Refresh the list of databases and collections", on_click=invalidate_catalog, use_container_width=True)
         
         if db_name:
-            all_collections = get_all_collections(client, db_name)
-        collection_name = st.selectbox("Select a collection", all_collections)
+            if db_name == previous_db_name:
+                all_collections = previous_collections
+            else:
+                all_collections = backend.list_collections(db_name) if backend else get_cached_collections(client, db_name)
+        collection_name = st.selectbox("Select a collection", all_collections, key=f"{key}_collection")
         
         if db_name and collection_name:
             return db_name, collection_name
     return None, None
 
-def get_collection_data_wrapper(db_name, collection_name):
+def get_usernames() -> list:
+    """
+    Get the usernames of every user, for choosing the owner of inserted documents.
+    """
+    from functions.db.mongo_index_management import USERS_COLLECTION
+    from functions.utils import _get_default_db
+    backend = get_local_backend()
+    client = get_cached_mongo_client() if backend is None else None
+    if not backend and not client:
+        return []
+    try:
+        if backend:
+            return sorted({user["username"] for user in backend.find(_get_default_db(), USERS_COLLECTION, projection={"username": 1}) if user.get("username")})
+        return sorted(client[_get_default_db()][USERS_COLLECTION].distinct("username"))
+    except Exception as e:
+        print(f"Failed to list the users: {e}")
+        return []
+
+def get_owner_input(db_action: Literal["insert", "import"]):
+    """
+    Render the choice of the user that inserted documents belong to, defaulting to the logged-in user.
+    The choice is kept in the session state under f"{db_action}_owner", see get_target_owner.
+    """
+    logged_in_user = st.session_state.get("logged_in_user")
+    usernames = get_usernames()
+    if logged_in_user and logged_in_user not in usernames:
+        usernames.insert(0, logged_in_user)
+    if not usernames:
+        return None
+    index = usernames.index(logged_in_user) if logged_in_user in usernames else 0
+    return st.selectbox("Owner", usernames, index=index, key=f"{db_action}_owner", help="The user the inserted transactions belong to")
+
+def get_target_owner(db_action: Literal["insert", "import"]) -> str | None:
+    """
+    Get the owner chosen for the specified action, or the logged-in user if none was chosen.
+    """
+    return st.session_state.get(f"{db_action}_owner") or st.session_state.get("logged_in_user")
+
+def get_owner_query(key: str) -> dict | None:
+    """
+    Get the query that scopes a page to the transactions of the logged-in user.
+    Admins get a toggle to see the transactions of every user instead.
+    
+    Args:
+        key: The prefix of the session state key of the toggle
+        
+    Returns:
+        dict: The owner query, or None for every user
+    """
+    if st.session_state.get("is_admin", False):
+        if st.toggle("所有用戶", value=True, key=f"{key}_all_users", help="Show the transactions of every user"):
+            return None
+    return {OWNER_FIELD: st.session_state.get("logged_in_user")}
+
+def get_display_projection(db_name, collection_name) -> dict:
+    """
+    Get the projection of a page that only displays the visible fields. _id is kept, since it is the
+    keyset cursor of the pagination and the target of edits and deletes.
+    Hidden fields are excluded rather than the visible fields included, so fields missing from the schema are still fetched.
+    """
+    schema = get_collection_schema(db_name, collection_name) or {}
+    hidden_fields = set(HIDDEN_FIELDS) | {field for field in schema if field.startswith("_") and field != "_id"}
+    return {field: 0 for field in sorted(hidden_fields)}
+
+def get_collection_data_wrapper(db_name, collection_name, projection: dict | None = None):
     """
     Get data from the specified collection in the selected database.
     
     Args:
         db_name: The name of the database
         collection_name: The name of the collection
+        projection: The fields to fetch, None for whole documents
         
     Returns:
         DataFrame: A pandas DataFrame containing the data from the collection
     """
-    from functions.db.mongo_collection_management import get_collection_data
+    from functions.db.mongo_arrow import get_collection_frame
+    from functions.db.query_cache import make_query_key
+    def _read_collection(client):
+        # Decoded from the cursor column by column, without a list of documents in between
+        return get_collection_frame(client=client, db_name=db_name, collection_name=collection_name, schema=get_collection_schema(db_name, collection_name), projection=projection)
+    def _read_local(backend):
+        return _to_dataframe(backend.find(db_name, collection_name, projection=projection), schema=get_collection_schema(db_name, collection_name))
+    return get_cached_read(make_query_key(db_name, collection_name, projection=projection), _read_collection, local_read=_read_local)
+
+def _to_dataframe(data: list, schema: dict | None = None, arrow_backed: bool = False) -> 'pd.DataFrame':
+    """
+    Convert a list of MongoDB documents to a DataFrame column by column, casting date-only timestamp columns to dates.
+    """
+    from functions.db.mongo_arrow import documents_to_dataframe
+    return documents_to_dataframe(data, schema=schema, arrow_backed=arrow_backed)
+
+def _cast_date_columns(df: 'pd.DataFrame', schema: dict | None = None) -> 'pd.DataFrame':
+    """
+    Cast the columns to the field types of the schema registry: Date columns to dates,
+    Datetime columns to datetimes and Float columns to floats. Timestamp columns that are not
+    in the schema are cast to datetimes, and to dates when every value is at midnight.
+    """
+    df = df.copy()
+    for col in df.columns:
+        field_type = schema.get(col) if schema else None
+        try:
+            if field_type == "Date":
+                df[col] = pd.to_datetime(df[col]).dt.date
+                continue
+            elif field_type == "Datetime":
+                df[col] = pd.to_datetime(df[col])
+                continue
+            elif field_type == "Float" and pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = df[col].astype(float)
+                continue
+        except (ValueError, TypeError):
+            pass  # Values that do not match the schema are cast as if the column had no type
+        if isinstance(df[col].iloc[0], pd.Timestamp):
+            df[col] = pd.to_datetime(df[col])
+            if not df[col].empty and df[col].eq(df[col].dt.normalize()).all():
+                df[col] = df[col].dt.date
+    return df
+
+def get_collection_page_wrapper(db_name, collection_name, page_size: int = 50, after: dict | None = None, projection: dict | None = None):
+    """
+    Get one page of data from the specified collection in the selected database, newest first.
+    
+    Args:
+        db_name: The name of the database
+        collection_name: The name of the collection
+        page_size: The number of documents per page
+        after: The keyset cursor returned with the previous page, None for the first page
+        projection: The fields to fetch, None for whole documents
+        
+    Returns:
+        tuple: A pandas DataFrame with the page (None if empty) and the cursor for the next page
+    """
+    from functions.db.mongo_collection_management import get_collection_page
+    from functions.db.query_cache import make_query_key
+    def _to_page(data, next_cursor):
+        return (_to_dataframe(data, schema=get_collection_schema(db_name, collection_name)), next_cursor) if data else (None, None)
+    def _read_page(client):
+        return _to_page(*get_collection_page(client=client, db_name=db_name, collection_name=collection_name, page_size=page_size, after=after, projection=projection))
+    def _read_local(backend):
+        return _to_page(*backend.get_page(db_name, collection_name, page_size=page_size, after=after, projection=projection))
+    key = make_query_key(db_name, collection_name, projection=projection, sort=PAGE_SORT, page_size=page_size, after=after)
+    return get_cached_read(key, _read_page, default=(None, None), local_read=_read_local)
+
+def get_synced_collection_data(db_name, collection_name, projection: dict | None = None, query: dict | None = None):
+    """
+    Get all data from the specified collection from a local copy that is kept up to date incrementally.
+    Only documents changed since the last sync are fetched, deletes are applied from the tombstones.
+    
+    Args:
+        db_name: The name of the database
+        collection_name: The name of the collection
+        projection: The fields to sync, None for whole documents
+        query: An optional query restricting the synced documents, e.g. to the owner
+        
+    Returns:
+        DataFrame: A pandas DataFrame containing the data from the collection, or None if it is empty
+    """
+    from functions.db.delta_sync import sync_collection, get_last_sync_result
+    from functions.db.query_cache import get_collection_version
+    from functions.utils import _get_setting
+    from pymongo.errors import ConnectionFailure
+    from functions.db.mongo_health import report_connection_failure
+    from functions.db.query_cache import get_or_compute, make_query_key
+    backend = get_local_backend()
+    if backend is not None:
+        # The embedded backend is already local, its reads are only cached until the collection is written
+        return get_or_compute(
+            make_query_key(db_name, collection_name, query, projection=projection),
+            lambda: _to_dataframe(backend.find(db_name, collection_name, query, projection), schema=get_collection_schema(db_name, collection_name)),
+        )
     client = get_cached_mongo_client()
-    if client:
-        data = get_collection_data(client=client, db_name=db_name, collection_name=collection_name)
-        if data:
-            df = pd.DataFrame(data)
-            for col in df.columns:
-                if isinstance(df[col].iloc[0], pd.Timestamp):
-                    df[col] = pd.to_datetime(df[col])
-                    if not df[col].empty and df[col].dt.strftime('%H:%M:%S').eq('00:00:00').all():
-                        df[col] = df[col].dt.date
-            
-            return df
-    return None
+    if client is None:
+        # The local copy of the last sync is served while the database is unreachable
+        return get_last_sync_result(db_name, collection_name, query=query, projection=projection)
+    schema = get_collection_schema(db_name, collection_name)
+    try:
+        return sync_collection(
+            client, db_name, collection_name,
+            query=query,
+            projection=projection,
+            materialize=lambda df: _cast_date_columns(df, schema=schema),
+            version=get_collection_version(db_name, collection_name),
+            min_interval=float(_get_setting("app", "sync_interval", 5)),
+        )
+    except ConnectionFailure as e:
+        print(f"Sync failed, serving the last synced data: {e}")
+        report_connection_failure(client, e)
+        return get_last_sync_result(db_name, collection_name, query=query, projection=projection)
+
+def get_archived_data(db_name, collection_name, start=None, end=None, projection: dict | None = None, query: dict | None = None):
+    """
+    Get the archived documents of the specified collection dated in [start, end) from the Parquet archive.
+    Cached until the collection is written, which includes archive runs. The query only supports equality
+    on fields, e.g. the owner.
+    
+    Returns:
+        DataFrame: A pandas DataFrame with the archived documents, or None if none are in the range
+    """
+    from functions.db.mongo_archive import read_archive
+    from functions.db.query_cache import get_or_compute, make_query_key
+    schema = get_collection_schema(db_name, collection_name)
+    def _read_archive():
+        data = read_archive(db_name, collection_name, start=start, end=end, projection=projection, match=query)
+        return _cast_date_columns(data, schema=schema) if data is not None else None
+    return get_or_compute(make_query_key(db_name, collection_name, query, projection=projection, archive=True, start=start, end=end), _read_archive)
+
+def get_date_range_data(db_name, collection_name, start, end, projection: dict | None = None, query: dict | None = None):
+    """
+    Get the documents of the specified collection dated in [start, end), newest first.
+    The archive is only read when the range starts before its cutoff. The query only supports equality
+    on fields, since it also filters the archive.
+    
+    Returns:
+        DataFrame: A pandas DataFrame with the documents of the hot collection and the archive, or None if there are none
+    """
+    from functions.db.mongo_archive import DATE_FIELD, reaches_archive
+    from functions.db.mongo_arrow import get_collection_frame
+    from functions.db.query_cache import make_query_key
+    range_query = {**(query or {}), DATE_FIELD: {"$gte": start, "$lt": end}}
+    def _read_range(client):
+        return get_collection_frame(client=client, db_name=db_name, collection_name=collection_name, query=range_query, schema=get_collection_schema(db_name, collection_name), projection=projection)
+    def _read_local_range(backend):
+        return _to_dataframe(backend.find(db_name, collection_name, range_query, projection), schema=get_collection_schema(db_name, collection_name))
+    frames = [get_cached_read(make_query_key(db_name, collection_name, query=range_query, projection=projection), _read_range, local_read=_read_local_range)]
+    if reaches_archive(db_name, collection_name, start):
+        frames.append(get_archived_data(db_name, collection_name, start=start, end=end, projection=projection, query=query))
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return None
+    data = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return data.sort_values(by=[DATE_FIELD, "_id"], ascending=False).reset_index(drop=True)
+
+def _get_default_page_size() -> int:
+    from functions.utils import _get_setting
+    return int(_get_setting("app", "page_size", 50))
+
+def get_paginated_collection_data(db_name, collection_name, key: str, reset_keys: tuple = (), arrow_backed: bool = False, projection: dict | None = None, query: dict | None = None):
+    """
+    Get the current page of the specified collection and render the pagination controls.
+    The keyset cursors of the visited pages are kept in the session state so that
+    each rerun only fetches a single page.
+    
+    Args:
+        db_name: The name of the database
+        collection_name: The name of the collection
+        key: The prefix of the session state keys used by the pagination
+        reset_keys: Session state keys to clear when the page changes (e.g. data editor states)
+        arrow_backed: Return an Arrow-backed DataFrame, for pages that only display the data
+        projection: The fields the page needs, None for whole documents
+        query: An optional query restricting the paginated documents, e.g. to the owner
+        
+    Returns:
+        DataFrame: A pandas DataFrame containing the current page, or None if there is no data
+    """
+    from functions.db.mongo_async import run_concurrently, get_collection_page_async, get_document_count_async
+    from functions.db.query_cache import make_query_key
+    cursors_key, source_key, size_key = f"{key}_cursors", f"{key}_source", f"{key}_page_size"
+    page_size_options = sorted({25, 50, 100, 200, _get_default_page_size()})
+    
+    def _clear_page_state():
+        for reset_key in reset_keys:
+            if reset_key in st.session_state:
+                del st.session_state[reset_key]
+    
+    def _reset_pages():
+        st.session_state[cursors_key] = [None]
+        _clear_page_state()
+    
+    if st.session_state.get(source_key) != (db_name, collection_name, str(query)) or cursors_key not in st.session_state:
+        st.session_state[source_key] = (db_name, collection_name, str(query))
+        _reset_pages()
+    
+    page_size = st.session_state.get(size_key, _get_default_page_size())
+    cursors = st.session_state[cursors_key]
+    def _read_page_and_count(client):
+        # The page and the document count are independent reads, so they are issued together
+        (documents, page_next_cursor), page_total = run_concurrently(
+            get_collection_page_async(client, db_name, collection_name, page_size=page_size, after=cursors[-1], query=query, projection=projection),
+            get_document_count_async(client, db_name, collection_name, query=query),
+        )
+        return (_to_dataframe(documents, schema=get_collection_schema(db_name, collection_name), arrow_backed=arrow_backed) if documents else None), page_next_cursor, page_total
+    def _read_local_page_and_count(backend):
+        documents, page_next_cursor = backend.get_page(db_name, collection_name, page_size=page_size, after=cursors[-1], query=query, projection=projection)
+        page_total = backend.count(db_name, collection_name, query=query)
+        return (_to_dataframe(documents, schema=get_collection_schema(db_name, collection_name), arrow_backed=arrow_backed) if documents else None), page_next_cursor, page_total
+    query_key = make_query_key(db_name, collection_name, query, projection=projection, sort=PAGE_SORT, page_size=page_size, after=cursors[-1], with_count=True, arrow_backed=arrow_backed)
+    data, next_cursor, total = get_cached_read(query_key, _read_page_and_count, default=(None, None, 0), local_read=_read_local_page_and_count)
+    
+    def _next_page():
+        st.session_state[cursors_key].append(next_cursor)
+        _clear_page_state()
+    
+    def _previous_page():
+        st.session_state[cursors_key].pop()
+        _clear_page_state()
+    
+    size_col, prev_col, page_col, next_col = st.columns([2, 1, 1, 1], vertical_alignment="bottom")
+    size_col.selectbox("Rows per page", page_size_options, index=page_size_options.index(page_size), key=size_key, on_change=_reset_pages)
+    prev_col.button("Previous", key=f"{key}_previous", disabled=len(cursors) <= 1, on_click=_previous_page, use_container_width=True)
+    page_col.write(f"Page {len(cursors)} of {max(1, -(-total // page_size))}")
+    next_col.button("Next", key=f"{key}_next", disabled=next_cursor is None, on_click=_next_page, use_container_width=True)
+    return data
 
 def get_target_db_and_collection(db_action: Literal["insert", "update", "delete"]):
     """
@@ -80,28 +492,51 @@ def execute_db_operation(operation: Literal["insert", "update", "delete"], data=
     Returns:
         bool: True if the operation was successful, False otherwise
     """
-    client = get_cached_mongo_client()
-    if not client:
+    backend = get_local_backend()
+    client = get_cached_mongo_client() if backend is None else None
+    if not backend and not client:
         st.error("Failed to connect to MongoDB.")
         return False
         
     db_name, collection_name = get_target_db_and_collection(operation)
     if not db_name or not collection_name:
         return False
+    if backend is not None:
+        if operation == "insert" and data:
+            stamp_owner([data], get_target_owner(operation))
+        return _execute_local_operation(backend, operation, db_name, collection_name, data=data, query=query)
     
+    from pymongo.errors import DuplicateKeyError
+    from functions.db.mongo_batch import is_duplicate_transaction
+    from functions.db.query_cache import bump_collection_version
+    from functions.db.delta_sync import record_tombstones
+    from functions.db.mongo_audit import audit_writes
+    actor = st.session_state.get("logged_in_user")
+    if operation == "insert" and data:
+        stamp_owner([data], get_target_owner(operation))
+    if operation == "insert" and data and use_write_behind():
+        if _submit_write_behind(client, db_name, collection_name, [data]):
+            return True
     try:
         if operation == "insert":
             if not data:
                 st.warning("No data provided for insertion.")
                 return False
             client[db_name][collection_name].insert_one(data)
+            audit_writes(client, db_name, collection_name, "insert", [data], actor=actor)
             st.success(f"Data inserted into '{collection_name}' in database '{db_name}'.")
         
         elif operation == "update":
             if not data or not query:
                 st.warning("Both query and update data are required for update operations.")
                 return False
+            # Incremental loaders pick up updates by their _updated_at watermark
+            data.setdefault("_updated_at", pd.Timestamp.now())
+            if "_id" in query:
+                data = _refresh_fingerprints(client, db_name, collection_name, {query["_id"]: data})[query["_id"]]
             result = client[db_name][collection_name].update_one(query, {"$set": data})
+            if result.matched_count > 0 and "_id" in query:
+                audit_writes(client, db_name, collection_name, "update", {query["_id"]: data}, actor=actor)
             if result.modified_count > 0:
                 st.success(f"Data updated in '{collection_name}' in database '{db_name}'.")
             else:
@@ -111,16 +546,27 @@ def execute_db_operation(operation: Literal["insert", "update", "delete"], data=
             if not query:
                 st.warning("Query is required for delete operations.")
                 return False
-            result = client[db_name][collection_name].delete_one(query)
-            if result.deleted_count > 0:
+            deleted = client[db_name][collection_name].find_one_and_delete(query, projection={"_id": 1})
+            if deleted is not None:
+                record_tombstones(client, db_name, collection_name, [deleted["_id"]])
+                audit_writes(client, db_name, collection_name, "delete", [deleted["_id"]], actor=actor)
                 st.success(f"Data deleted from '{collection_name}' in database '{db_name}'.")
             else:
                 st.warning("No documents matched the query criteria. No deletions were made.")
                 
         return True
+    except DuplicateKeyError as e:
+        if is_duplicate_transaction(e.details or {}):
+            st.warning("The same transaction is already recorded for this owner, so it was not saved.")
+        else:
+            st.error(f"Error performing {operation} operation: {e}")
+        return False
     except Exception as e:
         st.error(f"Error performing {operation} operation: {e}")
         return False
+    finally:
+        # Cached reads of the collection are stale once a write has been attempted
+        bump_collection_version(db_name, collection_name)
 
 def execute_batch_operations(operation_type: Literal["insert", "update", "delete"], operations_data):
     """
@@ -135,61 +581,183 @@ def execute_batch_operations(operation_type: Literal["insert", "update", "delete
                          - For delete: List of document _ids to delete
         
     Returns:
-        dict: Statistics about the operation (success count, error count)
+        dict: The result of the batch from execute_batch, with the success, error and not found counts and the failed documents.
+              Inserts queued in write-behind mode have no result yet, only the number of queued documents and the job id.
     """
-    from pymongo.operations import InsertOne, UpdateOne, DeleteOne
+    from functions.db.mongo_batch import execute_batch
+    empty_result = {"operation": operation_type, "total": 0, "success": 0, "modified": 0, "errors": 0, "not_found": 0, "duplicates": 0, "failures": [], "deleted_ids": [], "chunks": 0, "retries": 0, "queued": 0, "job_id": None}
     
-    client = get_cached_mongo_client()
-    if not client:
+    backend = get_local_backend()
+    client = get_cached_mongo_client() if backend is None else None
+    if not backend and not client:
         st.error("Failed to connect to MongoDB.")
-        return {"success": 0, "errors": 0}
+        return empty_result
         
     db_name, collection_name = get_target_db_and_collection(operation_type)
     if not db_name or not collection_name:
-        return {"success": 0, "errors": 0}
+        return empty_result
     
-    collection = client[db_name][collection_name]
-    success_count = 0
-    error_count = 0
+    if operation_type == "insert" and operations_data:
+        stamp_owner(operations_data, get_target_owner(operation_type))
+    if backend is not None:
+        return _execute_local_batch(backend, operation_type, db_name, collection_name, operations_data, empty_result)
+    if operation_type == "insert" and operations_data and use_write_behind():
+        job_id = _submit_write_behind(client, db_name, collection_name, operations_data)
+        if job_id:
+            return {**empty_result, "total": len(operations_data), "queued": len(operations_data), "job_id": job_id}
     
+    from functions.db.query_cache import bump_collection_version
+    from functions.db.delta_sync import record_tombstones, reset_sync_state
+    from functions.db.mongo_audit import audit_writes
     try:
-        # Create a list of bulk operation objects
-        bulk_operations = []
-        
-        # Add operations based on operation type
+        if operation_type == "update":
+            operations_data = _refresh_fingerprints(client, db_name, collection_name, operations_data)
+        result = {**empty_result, **execute_batch(client, db_name, collection_name, operation_type, operations_data)}
+        failed_ids = {failure["target"] for failure in result["failures"]}
+        actor = st.session_state.get("logged_in_user")
         if operation_type == "insert":
-            # For insert, operations_data should be a list of documents to insert
-            for document in operations_data:
-                bulk_operations.append(InsertOne(document))
-                
+            audit_writes(client, db_name, collection_name, "insert", [document for document in operations_data if document.get("_id") not in failed_ids], actor=actor)
         elif operation_type == "update":
-            # For update, operations_data should be a dict mapping _ids to changes
-            for doc_id, changes in operations_data.items():
-                bulk_operations.append(UpdateOne({"_id": doc_id}, {"$set": changes}))
-                
+            audit_writes(client, db_name, collection_name, "update", {doc_id: changes for doc_id, changes in operations_data.items() if doc_id not in failed_ids}, actor=actor)
         elif operation_type == "delete":
-            # For delete, operations_data should be a list of _ids to delete
-            for doc_id in operations_data:
-                bulk_operations.append(DeleteOne({"_id": doc_id}))
+            audit_writes(client, db_name, collection_name, "delete", result["deleted_ids"], actor=actor)
+        if operation_type == "delete":
+            if result["deleted_ids"]:
+                record_tombstones(client, db_name, collection_name, result["deleted_ids"])
+            if result["errors"]:
+                # Some documents of a failed chunk may already be deleted without tombstones, so local copies are reloaded
+                reset_sync_state(db_name, collection_name)
+        show_batch_result(result)
+        return result
+    except Exception as e:
+        st.error(f"Error performing batch {operation_type} operation: {e}")
+        if operation_type == "delete":
+            reset_sync_state(db_name, collection_name)
+        return {**empty_result, "total": len(operations_data), "errors": len(operations_data)}
+    finally:
+        # Cached reads of the collection are stale once a write has been attempted
+        bump_collection_version(db_name, collection_name)
+
+def _execute_local_operation(backend, operation: Literal["insert", "update", "delete"], db_name, collection_name, data=None, query=None) -> bool:
+    """
+    Execute an operation of execute_db_operation on the embedded backend, which updates and deletes by the _id of the query.
+    The audit trail, the tombstones and the write-behind queue are MongoDB collections, so they are not written.
+    """
+    from functions.db.query_cache import bump_collection_version
+    try:
+        if operation == "insert":
+            if not data:
+                st.warning("No data provided for insertion.")
+                return False
+            backend.insert_one(db_name, collection_name, data)
+            st.success(f"Data inserted into '{collection_name}' in database '{db_name}'.")
         
-        # Execute the bulk operation if there are operations to perform
-        if bulk_operations:
-            result = collection.bulk_write(bulk_operations)
-            if operation_type == "insert":
-                success_count = result.inserted_count
-            elif operation_type == "update":
-                success_count = result.modified_count
-            elif operation_type == "delete":
-                success_count = result.deleted_count
-            
-            st.success(f"Batch {operation_type} completed: {success_count} documents processed successfully")
-            
-        return {"success": success_count, "errors": error_count}
+        elif operation == "update":
+            if not data or not query or "_id" not in query:
+                st.warning("The _id of the document and the update data are required for update operations.")
+                return False
+            data.setdefault("_updated_at", pd.Timestamp.now())
+            data = _refresh_fingerprints(backend, db_name, collection_name, {query["_id"]: data})[query["_id"]]
+            result = backend.update_many(db_name, collection_name, {query["_id"]: data})
+            if result["modified"] > 0:
+                st.success(f"Data updated in '{collection_name}' in database '{db_name}'.")
+            else:
+                st.warning("No documents matched the query criteria. No updates were made.")
+        
+        elif operation == "delete":
+            if not query or "_id" not in query:
+                st.warning("The _id of the document is required for delete operations.")
+                return False
+            if backend.delete_many(db_name, collection_name, [query["_id"]]):
+                st.success(f"Data deleted from '{collection_name}' in database '{db_name}'.")
+            else:
+                st.warning("No documents matched the query criteria. No deletions were made.")
+        
+        return True
+    except Exception as e:
+        st.error(f"Error performing {operation} operation: {e}")
+        return False
+    finally:
+        bump_collection_version(db_name, collection_name)
+
+def _execute_local_batch(backend, operation_type: Literal["insert", "update", "delete"], db_name, collection_name, operations_data, empty_result: dict) -> dict:
+    """
+    Execute a batch of execute_batch_operations on the embedded backend, returning the same result fields.
+    """
+    from functions.db.query_cache import bump_collection_version
+    try:
+        if operation_type == "insert":
+            result = backend.insert_many(db_name, collection_name, operations_data)
+        elif operation_type == "update":
+            operations_data = _refresh_fingerprints(backend, db_name, collection_name, operations_data)
+            result = backend.update_many(db_name, collection_name, operations_data)
+            result["not_found"] = result["total"] - result["success"]
+        else:
+            doc_ids = list(operations_data)
+            # The ids that exist are looked up first, so the result has the deleted ids like execute_batch
+            deleted_ids = [document["_id"] for document in backend.find(db_name, collection_name, {"_id": {"$in": doc_ids}}, {"_id": 1})]
+            deleted = backend.delete_many(db_name, collection_name, deleted_ids)
+            result = {"operation": "delete", "total": len(doc_ids), "success": deleted, "not_found": len(doc_ids) - deleted, "deleted_ids": deleted_ids}
+        result = {**empty_result, **result}
+        show_batch_result(result)
+        return result
     except Exception as e:
         st.error(f"Error performing batch {operation_type} operation: {e}")
-        # For inserts and deletes, operations_data is a list, for updates it's a dict
-        total = len(operations_data)
-        return {"success": success_count, "errors": total - success_count}
+        return {**empty_result, "total": len(operations_data), "errors": len(operations_data)}
+    finally:
+        bump_collection_version(db_name, collection_name)
+
+def stamp_owner(documents: list, owner: str | None) -> list:
+    """
+    Stamp the documents to insert with the username of their owner.
+    """
+    if owner:
+        for document in documents:
+            document[OWNER_FIELD] = owner
+    return documents
+
+def use_write_behind() -> bool:
+    """
+    Check whether inserts are queued and written in the background, as chosen with the write-behind toggle.
+    """
+    from functions.utils import _get_setting
+    return bool(st.session_state.get("write_behind", _get_setting("app", "write_behind", False)))
+
+def _submit_write_behind(client, db_name, collection_name, documents: list) -> str | None:
+    """
+    Queue inserts for the background writer. Returns None when the queue is full, so the caller writes synchronously.
+    """
+    from functions.db.write_behind import submit_inserts
+    job_id = submit_inserts(client, db_name, collection_name, documents, actor=st.session_state.get("logged_in_user"))
+    if job_id:
+        st.info(f"{len(documents)} document(s) queued for '{collection_name}' as job {job_id}. See Write Queue for their status.")
+    else:
+        st.warning("The write queue is full, the documents are written directly.")
+    return job_id
+
+def show_batch_result(result: dict):
+    """
+    Show the outcome of a batch operation: the counts, the retries and a table of the failed documents.
+    """
+    operation_type = result["operation"]
+    if result["success"]:
+        message = f"Batch {operation_type} completed: {result['success']} of {result['total']} document(s) processed successfully"
+        if operation_type == "update":
+            message += f", {result['modified']} modified"
+        st.success(message + ".")
+    if result["not_found"]:
+        st.warning(f"{result['not_found']} document(s) were not found.")
+    if result["retries"]:
+        st.info(f"{result['retries']} transient error(s) were retried.")
+    if result["duplicates"]:
+        st.warning(f"{result['duplicates']} document(s) repeat a transaction that is already recorded and were not saved.")
+    if result["failures"]:
+        st.error(f"{result['errors']} document(s) failed.")
+        st.dataframe(
+            data=pd.DataFrame(result["failures"]).rename(columns={"target": "Document", "code": "Code", "error": "Error"}).astype({"Document": str}),
+            hide_index=True,
+            use_container_width=True,
+        )
 
 def determine_field_type(value):
     import datetime
@@ -207,7 +775,106 @@ def determine_field_type(value):
     else:
         return "Unknown"
 
+def get_collection_schema(db_name, collection_name):
+    """
+    Get the field types of a collection from the schema registry.
+    A collection without a schema has its field types inferred once from a sample of its documents and registered,
+    see refresh_collection_schema to sample it again.
+    
+    Args:
+        db_name: The name of the database
+        collection_name: The name of the collection
+        
+    Returns:
+        dict: The field types keyed by field name, or None if the collection has no schema and no documents
+    """
+    from functions.db.mongo_schema_registry import get_or_infer_schema
+    from functions.db.query_cache import make_query_key
+    from functions.utils import _get_setting
+    # Internal collections (_schemas, _tombstones, ...) are not registered
+    if not db_name or not collection_name or collection_name.startswith("_"):
+        return None
+    sample_size = int(_get_setting("app", "schema_sample_size", 500))
+    # Cached with the collection version, so a collection without documents is checked again after a write
+    return get_cached_read(
+        make_query_key(db_name, collection_name, schema=True),
+        lambda client: get_or_infer_schema(client, db_name, collection_name, sample_size=sample_size),
+        local_read=lambda backend: get_or_infer_schema(backend, db_name, collection_name, sample_size=sample_size),
+    )
+
+def refresh_collection_schema(db_name, collection_name):
+    """
+    Infer the field types of a collection from a new sample and register them, unless it has a schema from the form.
+    """
+    from functions.db.mongo_schema_registry import refresh_schema
+    from functions.db.query_cache import bump_collection_version
+    from functions.utils import _get_setting
+    client = get_local_backend() or get_cached_mongo_client()
+    if not client:
+        st.error("Failed to connect to MongoDB.")
+        return None
+    try:
+        return refresh_schema(client, db_name, collection_name, sample_size=int(_get_setting("app", "schema_sample_size", 500)))
+    except Exception as e:
+        st.error(f"Failed to refresh the schema of '{collection_name}': {e}")
+        return None
+    finally:
+        # Cached results were cast with the previous schema
+        bump_collection_version(db_name, collection_name)
+
+def save_collection_schema(db_name, collection_name, fields: dict):
+    """
+    Register the field types of a collection, e.g. from the schema form.
+    """
+    from functions.db.mongo_schema_registry import save_schema
+    from functions.db.query_cache import bump_collection_version
+    client = get_local_backend() or get_cached_mongo_client()
+    if client and fields:
+        try:
+            save_schema(client, db_name, collection_name, fields, source="form")
+        except Exception as e:
+            st.error(f"Failed to save the schema of '{collection_name}': {e}")
+        finally:
+            # Cached results were cast with the previous schema
+            bump_collection_version(db_name, collection_name)
+
+def get_schema_from_form() -> dict:
+    """
+    Get the field types entered in the schema form or the blank form, keyed by field name.
+    """
+    schema = {}
+    for key in list(st.session_state.keys()):
+        if key.startswith("field_name_"):
+            field_name = st.session_state[key]
+            field_type = st.session_state.get(key.replace("field_name_", "field_type_", 1))
+            if field_name and not pd.isna(field_name) and field_type:
+                schema[field_name] = field_type
+    return schema
+
+def get_column_config(schema: dict | None) -> dict:
+    """
+    Get the data editor column configuration of the fields of a schema.
+    """
+    column_config = {}
+    for field_name, field_type in (schema or {}).items():
+        if field_type == "String":
+            column_config[field_name] = st.column_config.TextColumn(label=field_name)
+        elif field_type == "Integer":
+            column_config[field_name] = st.column_config.NumberColumn(label=field_name, step=1)
+        elif field_type == "Float":
+            column_config[field_name] = st.column_config.NumberColumn(label=field_name)
+        elif field_type == "Boolean":
+            column_config[field_name] = st.column_config.CheckboxColumn(label=field_name)
+        elif field_type == "Date":
+            column_config[field_name] = st.column_config.DateColumn(label=field_name)
+        elif field_type == "Datetime":
+            column_config[field_name] = st.column_config.DatetimeColumn(label=field_name)
+        else:
+            column_config[field_name] = st.column_config.Column(label=field_name)
+    return column_config
+
 def get_schema_form(disabled: bool = False):
+    from functions.db.mongo_schema_registry import FIELD_TYPES
     num_fields = st.number_input("Number of fields:", min_value=1, max_value=10, value=1, disabled=disabled)
     name_col, type_col = st.columns([1, 1])
     name_col.write("Field Name")
@@ -216,9 +883,10 @@ def get_schema_form(disabled: bool = False):
         with name_col:
             st.text_input("", placeholder=f"Field Name {i+1}", key=f"field_name_{i}", disabled=disabled)
         with type_col:
-            st.selectbox("", ["String", "Integer", "Float", "Boolean", "Date"], key=f"field_type_{i}", disabled=disabled)
+            st.selectbox("", FIELD_TYPES, key=f"field_type_{i}", disabled=disabled)
 
 def get_blank_form(disabled: bool = False):
+    from functions.db.mongo_schema_registry import FIELD_TYPES
     num_fields = st.number_input("Number of fields:", min_value=1, max_value=10, value=1, disabled=disabled)
     
     name_col, type_col, value_col = st.columns([1, 1, 3])
@@ -229,28 +897,32 @@ def get_blank_form(disabled: bool = False):
         with name_col:
             st.text_input("", placeholder=f"Field Name {i+1}", key=f"field_name_{i}", disabled=disabled)
         with type_col:
-            st.selectbox("", ["String", "Integer", "Float", "Boolean", "Date"], key=f"field_type_{i}", disabled=disabled)
+            st.selectbox("", FIELD_TYPES, key=f"field_type_{i}", disabled=disabled)
         with value_col:
             st.text_input("", placeholder=f"Field Value {i+1}", key=f"field_value_{i}", disabled=disabled)
 
-def get_form_from_data(data: 'pd.DataFrame', pre_filled: bool = False):
+def get_form_from_data(data: 'pd.DataFrame', pre_filled: bool = False, schema: dict | None = None):
     for col in data.columns:
         if col.startswith("_"):
             continue
         
         field_name = col
-        field_type = determine_field_type(data[col].iloc[0])
+        # The registered type is used when the collection has a schema, otherwise it is guessed from the first value
+        field_type = (schema or {}).get(col) or determine_field_type(data[col].iloc[0])
+        value = data[col].iloc[0] if pre_filled and not pd.isna(data[col].iloc[0]) else None
         
         if field_type == "String":
             st.text_input(label=field_name.replace('_', ' ').title(), value=None if not pre_filled else data[col].iloc[0], key=f"field_value_{field_name}")
         elif field_type == "Integer":
-            st.number_input(label=field_name.replace('_', ' ').title(), value=None if not pre_filled else data[col].iloc[0], step=1, key=f"field_value_{field_name}")
+            st.number_input(label=field_name.replace('_', ' ').title(), value=None if value is None else int(value), step=1, key=f"field_value_{field_name}")
         elif field_type == "Float":
-            st.number_input(label=field_name.replace('_', ' ').title(), value=None if not pre_filled else data[col].iloc[0], key=f"field_value_{field_name}")
+            st.number_input(label=field_name.replace('_', ' ').title(), value=None if value is None else float(value), key=f"field_value_{field_name}")
         elif field_type == "Boolean":
             st.radio(label=field_name.replace('_', ' ').title(), options=[True, False], index=0 if not pre_filled else int(data[col].iloc[0]), key=f"field_value_{field_name}", horizontal=True)
         elif field_type == "Date":
             st.date_input(label=field_name.replace('_', ' ').title(), value=None if not pre_filled else data[col].iloc[0], key=f"field_value_{field_name}")
+        elif field_type == "Datetime":
+            st.text_input(label=field_name.replace('_', ' ').title(), value=None if value is None else str(value), key=f"field_value_{field_name}")
 
 def prepare_data_for_blank_form():
     data = {}
@@ -275,7 +947,7 @@ def prepare_data_for_blank_form():
                 data[field_name] = float(field_value)
             elif field_type == "Boolean":
                 data[field_name] = bool(field_value)
-            elif field_type == "Date":
+            elif field_type in ("Date", "Datetime"):
                 data[field_name] = pd.to_datetime(field_value)
             else:
                 st.warning(f"Unsupported field type: {field_type}")
@@ -311,15 +983,16 @@ def prepare_data_for_existing_form():
     return data
 
 def get_data_ui():
-    client = get_cached_mongo_client()
-    if client:
+    backend = get_local_backend()
+    client = get_cached_mongo_client() if backend is None else None
+    if backend or client:
         all_databases, all_collections = [], []
         
-        all_databases = get_all_databases(client)
+        all_databases = backend.list_databases() if backend else get_cached_databases(client)
         db_name = st.selectbox("Select a database", all_databases)
         
         if db_name:
-            all_collections = get_all_collections(client, db_name)
+            all_collections = backend.list_collections(db_name) if backend else get_cached_collections(client, db_name)
         collection_name = st.selectbox("Select a collection", all_collections)
         
         if collection_name:
@@ -327,105 +1000,30 @@ def get_data_ui():
             return data
     return None
 
-def _handle_hidden_fields(operation_type: Literal["insert", "update", "delete"], data):
-    """
-    Handle hidden fields in the form based on the operation type.
-    
-    Args:
-        operation_type: The type of operation to perform ("insert", "update", or "delete")
-        data: The data associated with the operation
-    """
-    import uuid
-    if operation_type == "insert":
-        data["_id"] = str(uuid.uuid4())
-        data["_created_at"] = pd.Timestamp.now()
-        data["_updated_at"] = pd.Timestamp.now()
-    elif operation_type == "update":
-        data["_updated_at"] = pd.Timestamp.now()
-    elif operation_type == "delete":
-        pass
-    else:
-        st.warning("Unsupported operation type.")
-        return data
-    
-    return data
-
-def _handle_data_types(data):
-    """
-    Handle data types for the fields in the form.
-    
-    Args:
-        data: The data to be processed
-        
-    Returns:
-        dict: The processed data with appropriate types
-    """
-    for key, value in data.items():
-        if isinstance(value, str):
-            # Date or datetime conversion
-            try:
-                # Try to convert to datetime
-                data[key] = pd.to_datetime(value)
-                continue  # Skip further processing if this succeeds
-            except ValueError:
-                pass  # Keep as string if conversion fails
-            
-            # Integer or float conversion
-            value = value.strip() 
-            
-            # Check for integer
-            if value.lstrip('-').isdigit():
-                data[key] = int(value)
-                continue
-                
-            # Check for float
-            try:
-                float_value = float(value)
-                if float_value.is_integer():
-                    data[key] = int(float_value)
-                else:
-                    data[key] = float_value
-            except ValueError:
-                pass
-                
-        elif isinstance(value, bool):
-            data[key] = bool(value)
-        elif isinstance(value, (int, float)):
-            data[key] = float(value)
-    
-    return data
-
-def convert_value_to_capitalized(data):
-    for key, value in data.items():
-        if key in ["from_curr", "to_curr"]:
-            if not pd.isna(value):
-                data[key] = value.upper()
-    return data
-
-def clean_up_data(operation_type: Literal["insert", "update", "delete"], data, hidden_fields: bool = False, cal_rate: bool = False):
+def _refresh_fingerprints(source, db_name, collection_name, updates: dict) -> dict:
     """
-    Clean up the data by removing empty fields and converting values to appropriate types.
+    Recompute the fingerprint of the updated documents whose date, currencies or amounts change.
+    Updates only carry the changed fields, so the other fields are read with one query by _id.
     
     Args:
-        data: The data to be cleaned
+        source: The MongoDB client, or the embedded backend when storage.backend is "sqlite"
+        updates: A dict mapping document _ids to their changed fields, updated in place
     """
-    cleaned_data = {k: v for k, v in data.items() if not (v is None or v == "" or pd.isna(v))}
-    
-    if hidden_fields:
-        cleaned_data = _handle_hidden_fields(operation_type=operation_type, data=cleaned_data)
-    cleaned_data = _handle_data_types(cleaned_data)
-    cleaned_data = convert_value_to_capitalized(cleaned_data)
-
-    if cal_rate:
-        from_amt = cleaned_data.get("from_amt", None)
-        to_amt = cleaned_data.get("to_amt", None)
-        if from_amt and to_amt:
-            if from_amt > to_amt:
-                cleaned_data["_rate"] = from_amt / to_amt
-            else:
-                cleaned_data["_rate"] = to_amt / from_amt
-    print("Cleaned Data:", cleaned_data)
-    return cleaned_data
+    from functions.db.storage_backend import StorageBackend
+    doc_ids = [doc_id for doc_id, changes in updates.items() if any(field in changes for field in FINGERPRINT_FIELDS)]
+    if not doc_ids:
+        return updates
+    query, projection = {"_id": {"$in": doc_ids}}, {field: 1 for field in FINGERPRINT_FIELDS}
+    if isinstance(source, StorageBackend):
+        documents = source.find(db_name, collection_name, query, projection)
+    else:
+        documents = source[db_name][collection_name].find(query, projection)
+    current = {document["_id"]: document for document in documents}
+    for doc_id in doc_ids:
+        fingerprint = compute_fingerprint({**current.get(doc_id, {}), **updates[doc_id]})
+        if fingerprint:
+            updates[doc_id][FINGERPRINT_FIELD] = fingerprint
+    return updates
 
 @st.dialog("Confirmation Dialog")
 def confirmation_dialog(message: str, on_confirm: 'Callable', on_cancel: 'Callable', args=None, kwargs=None):
@@ -56,6 +56,31 @@ def _get_default_collection_st():
     collection_name = st.secrets["mongo"]["collection_name"]
     return collection_name
 
+def _get_setting(section: str, key: str, default=None, approach: Literal['file', 'st']='st'):
+    """
+    Get an optional setting from the secrets, falling back to the default when it is not set.
+    """
+    if approach == 'file':
+        config = _read_toml(".streamlit/secrets.toml")
+        return config.get(section, {}).get(key, default)
+    elif approach == 'st':
+        import streamlit as st
+        try:
+            return st.secrets.get(section, {}).get(key, default)
+        except Exception:
+            return default
+    else:
+        raise ValueError("Invalid approach. Use 'file' or 'st'.")
+
+def _get_data_dir(subdir: str = "", approach: Literal['file', 'st']='st') -> str:
+    """
+    Get a directory under the local data directory (app.data_dir), creating it if needed.
+    """
+    import os
+    data_dir = os.path.join(_get_setting("app", "data_dir", "data", approach), subdir)
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
 def _load_css(file_path: Optional[str] = None) -> None:
     """
     Load CSS styles from a file.
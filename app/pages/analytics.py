@@ -0,0 +1,32 @@
+import streamlit as st
+from components.navigation import nav_bar
+from functions.ui.auth_page import init_auth_state, login_page, auth_header
+from functions.ui.db_func_ui import ensure_app_indexes
+from functions.ui.analytics_ui import analytics_page
+from functions.db.mongo_query_log import query_action
+
+def main():
+    init_auth_state()
+    ensure_app_indexes()
+    nav_bar()
+    header_placeholder = st.empty()
+    content_placeholder = st.empty()
+    if not st.session_state.is_logged_in:
+        with content_placeholder:
+            login_page()
+    else:
+        content_placeholder.empty()
+        with header_placeholder:
+            auth_header(page_title="交易分析")
+        with content_placeholder.container():
+            with query_action("Analytics"):
+                analytics_page()
+    
+if __name__ == "__main__":
+    st.set_page_config(
+        page_title="交易分析",
+        page_icon="📊",
+        layout="wide",
+        initial_sidebar_state="collapsed",
+    )
+    main()
@@ -1,7 +1,10 @@
 import streamlit as st
 from components.navigation import nav_bar
-from functions.ui.crud_ui import get_create_table_page, get_insert_data_page, get_fetch_data_page, get_update_data_page, get_delete_data_page
+from functions.ui.crud_ui import get_create_table_page, get_insert_data_page, get_fetch_data_page, get_update_data_page, get_delete_data_page, get_index_usage_page, get_export_data_page, get_import_data_page, get_write_queue_page, get_slow_queries_page, get_capacity_page, get_archive_data_page, get_audit_log_page
 from functions.ui.auth_page import init_auth_state, login_page, auth_header
+from functions.ui.db_func_ui import ensure_app_indexes
+from functions.db.query_cache import get_cache_stats
+from functions.db.mongo_query_log import query_action
 
 def db_actions():
     left_col, right_col = st.columns([2, 8])
@@ -9,11 +12,14 @@ def db_actions():
     with left_col:  
         st.selectbox(
             label="Select an action", 
-            options=["Create Table on Database", "Insert Data", "Fetch Data", "Update Data", "Delete Data"], 
+            options=["Create Table on Database", "Insert Data", "Fetch Data", "Update Data", "Delete Data", "Import Data", "Export Data", "Archive Data", "Audit Log", "Index Usage", "Write Queue", "Slow Queries", "Capacity"], 
             index=default_action_index,
             key="db_action"
         )
-    with right_col:
+        stats = get_cache_stats()
+        st.caption(f"Query cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), {stats['entries']} cached results")
+    # The commands of each action are recorded under its name in the slow query log
+    with right_col, query_action(st.session_state.db_action):
         if st.session_state.db_action == "Create Table on Database":
             get_create_table_page()
         elif st.session_state.db_action == "Insert Data":
@@ -24,11 +30,28 @@ def db_actions():
             get_update_data_page()
         elif st.session_state.db_action == "Delete Data":
             get_delete_data_page()
+        elif st.session_state.db_action == "Import Data":
+            get_import_data_page()
+        elif st.session_state.db_action == "Export Data":
+            get_export_data_page()
+        elif st.session_state.db_action == "Archive Data":
+            get_archive_data_page()
+        elif st.session_state.db_action == "Audit Log":
+            get_audit_log_page()
+        elif st.session_state.db_action == "Index Usage":
+            get_index_usage_page()
+        elif st.session_state.db_action == "Write Queue":
+            get_write_queue_page()
+        elif st.session_state.db_action == "Slow Queries":
+            get_slow_queries_page()
+        elif st.session_state.db_action == "Capacity":
+            get_capacity_page()
         else:
             st.warning("Please select an action from the dropdown.")
 
 def main():
     init_auth_state()
+    ensure_app_indexes()
     nav_bar()
     header_placeholder = st.empty()
     content_placeholder = st.empty()
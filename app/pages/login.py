@@ -1,9 +1,11 @@
 import streamlit as st
 from components.navigation import nav_bar
 from functions.ui.auth_page import login_page, init_auth_state
+from functions.ui.db_func_ui import ensure_app_indexes
 
 def main():   
     init_auth_state()
+    ensure_app_indexes()
     nav_bar()
 
     if not st.session_state.is_logged_in:
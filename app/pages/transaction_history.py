@@ -3,12 +3,35 @@ from components.navigation import nav_bar
 from functions.utils import _get_default_db, _get_default_collection
 from functions.ui.auth_page import init_auth_state, login_page, auth_header
 from functions.ui.crud_ui import _tidy_up_collection_data
+from functions.ui.db_func_ui import ensure_app_indexes
+from functions.db.mongo_query_log import query_action
 
 def transaction_history_page():
-    from functions.ui.db_func_ui import get_collection_data_wrapper
+    import datetime
+    import pandas as pd
+    from functions.ui.db_func_ui import get_paginated_collection_data, get_synced_collection_data, get_display_projection, get_date_range_data, get_archived_data, get_owner_query
+    from functions.db.mongo_archive import reaches_archive
     default_db = _get_default_db()
     default_collection = _get_default_collection()
-    data = get_collection_data_wrapper(db_name=default_db, collection_name=default_collection)
+    # Only the visible fields are shown, so the hidden fields are not fetched
+    projection = get_display_projection(default_db, default_collection)
+    # Users only see their own transactions, served by the owner_date_id index
+    owner_query = get_owner_query(key="history")
+    date_range = st.date_input("日期範圍", value=(), key="history_range", help="Transactions older than the archive cutoff are read from the archive")
+    if len(date_range) == 2:
+        start = datetime.datetime.combine(date_range[0], datetime.time())
+        end = datetime.datetime.combine(date_range[1], datetime.time()) + datetime.timedelta(days=1)
+        data = get_date_range_data(db_name=default_db, collection_name=default_collection, start=start, end=end, projection=projection, query=owner_query)
+    elif st.toggle("顯示全部紀錄", value=False, key="history_show_all", help="Load every transaction, only changes since the last visit are downloaded"):
+        data = get_synced_collection_data(db_name=default_db, collection_name=default_collection, projection=projection, query=owner_query)
+        if reaches_archive(default_db, default_collection, None):
+            archived = get_archived_data(db_name=default_db, collection_name=default_collection, projection=projection, query=owner_query)
+            if archived is not None:
+                data = pd.concat([data, archived], ignore_index=True) if data is not None else archived
+        if data is not None:
+            data = data.sort_values(by="date", ascending=False).reset_index(drop=True) if "date" in data.columns else data
+    else:
+        data = get_paginated_collection_data(db_name=default_db, collection_name=default_collection, key="history", arrow_backed=True, projection=projection, query=owner_query)
     if data is not None and not data.empty:
         data = _tidy_up_collection_data(data, hide_id=True, show_hidden=False)
         st.dataframe(
@@ -21,6 +44,7 @@ def transaction_history_page():
 
 def main():
     init_auth_state()
+    ensure_app_indexes()
     nav_bar()
     header_placeholder = st.empty()
     content_placeholder = st.empty()
@@ -31,8 +55,9 @@ def main():
         content_placeholder.empty()
         with header_placeholder:
             auth_header(page_title="交易紀錄")
-        with content_placeholder:
-            transaction_history_page()
+        with content_placeholder.container():
+            with query_action("Transaction History"):
+                transaction_history_page()
     
 if __name__ == "__main__":
     st.set_page_config(
@@ -4,7 +4,10 @@ import streamlit as st
 from components.navigation import nav_bar
 from functions.auth_func import hash_password
 from functions.ui.auth_ui import get_user_collection_ui
+from functions.db.mongo_async import run_concurrently, run_in_thread
 from functions.ui.auth_page import init_auth_state, login_page, auth_header
+from functions.ui.db_func_ui import ensure_app_indexes, show_mongo_only_notice
+from functions.db.mongo_query_log import query_action
 
 def init_user_management_state():
     """Initialize user management specific state variables"""
@@ -63,12 +66,22 @@ def register_user_page():
             else:
                 st.error("Failed to register user.")
 
+# The password hashes are never sent to the pages, the list only fetches the fields of its table
+USER_PROJECTION = {"password": 0, "secondary_password": 0}
+USER_LIST_PROJECTION = {"_id": 0, "username": 1, "display_name": 1, "email": 1, "role": 1, "active": 1, "created_at": 1}
+
 def list_users_page():
     """List all users"""
     st.subheader("User List")
     
     users_collection = get_user_collection_ui()
-    users = list(users_collection.find({}, {"password": 0}))  # Exclude passwords
+    
+    # The user list and the user selected on the previous rerun are independent reads, so they are issued together
+    previous_user = st.session_state.get("selected_username")
+    users, prefetched_user = run_concurrently(
+        run_in_thread(lambda: list(users_collection.find({}, USER_LIST_PROJECTION))),
+        run_in_thread(users_collection.find_one, {"username": previous_user}, USER_PROJECTION) if previous_user else run_in_thread(lambda: None),
+    )
     
     if not users:
         st.info("No users found.")
@@ -90,10 +103,10 @@ def list_users_page():
     
     # Select user for editing
     usernames = [user["username"] for user in users]
-    selected_user = st.selectbox("Select user to edit or delete:", [""] + usernames)
+    selected_user = st.selectbox("Select user to edit or delete:", [""] + usernames, key="selected_username")
     
     if selected_user:
-        user = users_collection.find_one({"username": selected_user})
+        user = prefetched_user if selected_user == previous_user else users_collection.find_one({"username": selected_user}, USER_PROJECTION)
         if user:
             st.session_state.selected_user = user
             
@@ -241,6 +254,7 @@ def user_actions():
 
 def main():
     init_auth_state()
+    ensure_app_indexes()
     init_user_management_state()
     nav_bar()
     
@@ -255,7 +269,10 @@ def main():
         with header_placeholder:
             auth_header(page_title="User Management")
         with content_placeholder:
-            user_actions()
+            # Users of the embedded backend are created with create_admin_user
+            if not show_mongo_only_notice("User management"):
+                with query_action("User Management"):
+                    user_actions()
 
 if __name__ == "__main__":
     st.set_page_config(
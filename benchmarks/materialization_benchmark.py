@@ -0,0 +1,96 @@
+"""
+Compare building a DataFrame from a list of documents and casting its date columns (the previous
+materialization) with the column-wise Arrow decoder, on time and peak memory.
+
+Usage:
+    python benchmarks/materialization_benchmark.py [rows] [repeats]
+"""
+import datetime
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+import pandas as pd
+import pyarrow as pa
+from bson import ObjectId
+from functions.db.mongo_arrow import documents_to_dataframe
+
+CURRENCIES = ["HKD", "USD", "JPY", "EUR", "GBP", "TWD"]
+
+def make_documents(n_documents: int, seed: int = 42) -> list:
+    """
+    Make documents shaped like the transactions returned by pymongo.
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2020, 1, 1)
+    documents = []
+    for _ in range(n_documents):
+        from_amt = round(rng.uniform(1, 50000), 2)
+        to_amt = round(from_amt * rng.uniform(0.005, 200), 2)
+        created_at = start + datetime.timedelta(seconds=rng.randint(0, 5 * 365 * 86400), milliseconds=rng.randint(0, 999))
+        documents.append({
+            "_id": ObjectId(),
+            "date": datetime.datetime.combine(created_at.date(), datetime.time(0)),
+            "from_curr": rng.choice(CURRENCIES),
+            "to_curr": rng.choice(CURRENCIES),
+            "from_amt": from_amt,
+            "to_amt": to_amt,
+            "_created_at": created_at,
+            "_updated_at": created_at,
+            "_rate": max(from_amt, to_amt) / min(from_amt, to_amt),
+        })
+    return documents
+
+def list_of_dicts(documents: list) -> pd.DataFrame:
+    # The materialization before the Arrow decoder
+    df = pd.DataFrame(list(documents))
+    for col in df.columns:
+        if isinstance(df[col].iloc[0], pd.Timestamp):
+            df[col] = pd.to_datetime(df[col])
+            if not df[col].empty and df[col].dt.strftime('%H:%M:%S').eq('00:00:00').all():
+                df[col] = df[col].dt.date
+    return df
+
+def arrow_numpy(documents: list) -> pd.DataFrame:
+    return documents_to_dataframe(iter(documents))
+
+def arrow_backed(documents: list) -> pd.DataFrame:
+    return documents_to_dataframe(iter(documents), arrow_backed=True)
+
+def measure(func, documents: list, repeats: int) -> tuple[float, float, float]:
+    """
+    Get the best time, the peak Python heap while materializing and the Arrow memory held by the result, in MiB.
+    tracemalloc does not see the Arrow memory pool, so the two are reported separately.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(documents)
+        times.append(time.perf_counter() - start)
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    result = func(documents)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_held = pa.total_allocated_bytes() - arrow_before
+    del result
+    return min(times), peak / 2**20, arrow_held / 2**20
+
+def main(n_documents: int = 100000, repeats: int = 3) -> None:
+    documents = make_documents(n_documents)
+    expected, actual = list_of_dicts(documents), arrow_numpy(documents)
+    assert list(expected.columns) == list(actual.columns), "The two paths give different columns"
+    assert expected["date"].tolist() == actual["date"].tolist(), "The two paths give different dates"
+    assert expected["_created_at"].tolist() == actual["_created_at"].tolist(), "The two paths give different timestamps"
+
+    print(f"documents: {n_documents}, best of {repeats}")
+    for label, func in [("list of dicts + date loop", list_of_dicts), ("Arrow decoder, NumPy frame", arrow_numpy), ("Arrow decoder, Arrow frame", arrow_backed)]:
+        seconds, peak, arrow_held = measure(func, documents, repeats)
+        print(f"{label:<28} {seconds:.3f}s  Python heap peak {peak:,.1f} MiB  Arrow memory held {arrow_held:,.1f} MiB")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,82 @@
+"""
+Compare the per-dict clean_up_data path with the column-wise normalize_dataframe engine.
+
+Usage:
+    python benchmarks/normalization_benchmark.py [rows] [repeats]
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+import pandas as pd
+from functions.normalization import normalize_dataframe
+from functions.ui.db_func_ui import clean_up_data
+
+HIDDEN_FIELDS = ["_id", "_created_at", "_updated_at"]
+CURRENCIES = ["hkd", "usd", "jpy", "eur", "gbp", "twd"]
+
+def _amount(rng: random.Random, low: float, high: float, decimals: int) -> str:
+    # Amounts that pd.to_datetime reads as a date (e.g. "2024" or "241056") become dates in both paths, so they are left out
+    while True:
+        amount = round(rng.uniform(low, high), decimals)
+        text = str(int(amount)) if amount.is_integer() else str(amount)
+        try:
+            pd.to_datetime(text)
+        except ValueError:
+            return text
+
+def make_rows(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Make rows as they come from the batch insert editor or a CSV import: every value is a string.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n_rows):
+        rows.append({
+            "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "from_curr": rng.choice(CURRENCIES),
+            "to_curr": rng.choice(CURRENCIES),
+            "from_amt": _amount(rng, 1, 50000, rng.choice([0, 2])),
+            "to_amt": _amount(rng, 1, 500000, 2),
+            "remark": rng.choice(["", "cash", "card", "online transfer"]),
+        })
+    return pd.DataFrame(rows)
+
+def per_dict(data: pd.DataFrame) -> list:
+    # clean_up_data prints every document, which is not part of the cost being compared
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [clean_up_data(operation_type="insert", data=row, hidden_fields=True, cal_rate=True) for row in data.to_dict(orient="records")]
+
+def column_wise(data: pd.DataFrame) -> list:
+    return normalize_dataframe(data, operation_type="insert", hidden_fields=True, cal_rate=True)
+
+def _without_hidden_fields(documents: list) -> list:
+    return [{key: value for key, value in document.items() if key not in HIDDEN_FIELDS} for document in documents]
+
+def best_time(func, data: pd.DataFrame, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(data)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(n_rows: int = 5000, repeats: int = 3) -> None:
+    data = make_rows(n_rows)
+    expected, actual = per_dict(data), column_wise(data)
+    assert _without_hidden_fields(expected) == _without_hidden_fields(actual), "The two paths give different documents"
+
+    per_dict_time = best_time(per_dict, data, repeats)
+    column_wise_time = best_time(column_wise, data, repeats)
+    print(f"rows: {n_rows}, best of {repeats}")
+    print(f"clean_up_data per dict:  {per_dict_time:.3f}s ({n_rows / per_dict_time:,.0f} rows/s)")
+    print(f"normalize_dataframe:     {column_wise_time:.3f}s ({n_rows / column_wise_time:,.0f} rows/s)")
+    print(f"speed-up:                {per_dict_time / column_wise_time:.1f}x")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
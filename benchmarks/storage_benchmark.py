@@ -0,0 +1,115 @@
+"""
+Measure the operations of the storage backends: bulk insert, first and deep pages, counts, a filtered read,
+a point lookup, a batch update and a batch delete. The SQLite backend runs offline in a temporary file;
+the MongoDB backend is measured too when a connection string is given.
+
+Usage:
+    python benchmarks/storage_benchmark.py [rows] [repeats] [mongodb_uri]
+"""
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from functions.db.storage_backend import MongoBackend, SQLiteBackend
+
+CURRENCIES = ["HKD", "USD", "JPY", "EUR", "GBP", "TWD"]
+DB_NAME = "storage_benchmark"
+COLLECTION_NAME = "transactions"
+
+def make_documents(n_documents: int, seed: int = 42) -> list:
+    """
+    Make documents shaped like the transactions written by the insert forms.
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2020, 1, 1)
+    documents = []
+    for _ in range(n_documents):
+        from_amt = round(rng.uniform(1, 50000), 2)
+        to_amt = round(from_amt * rng.uniform(0.005, 200), 2)
+        created_at = start + datetime.timedelta(seconds=rng.randint(0, 5 * 365 * 86400), milliseconds=rng.randint(0, 999))
+        documents.append({
+            "_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "date": datetime.datetime.combine(created_at.date(), datetime.time(0)),
+            "from_curr": rng.choice(CURRENCIES),
+            "to_curr": rng.choice(CURRENCIES),
+            "from_amt": from_amt,
+            "to_amt": to_amt,
+            "_created_at": created_at,
+            "_updated_at": created_at,
+            "_rate": max(from_amt, to_amt) / min(from_amt, to_amt),
+            "_owner": rng.choice(["alice", "bob", "carol"]),
+        })
+    return documents
+
+def median_ms(func, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+def run(backend, documents: list, repeats: int) -> dict:
+    """
+    Load the documents into an empty collection of the backend and time each operation, in milliseconds.
+    """
+    timings = {}
+    start = time.perf_counter()
+    inserted = backend.insert_many(DB_NAME, COLLECTION_NAME, [dict(document) for document in documents])
+    timings["bulk insert"] = (time.perf_counter() - start) * 1000
+    assert inserted["success"] == len(documents), f"Only {inserted['success']} of {len(documents)} documents were inserted"
+
+    _, cursor = backend.get_page(DB_NAME, COLLECTION_NAME, page_size=50)
+    for _ in range(20):
+        _, next_cursor = backend.get_page(DB_NAME, COLLECTION_NAME, page_size=50, after=cursor)
+        cursor = next_cursor or cursor
+    pair_query = {"from_curr": "HKD", "to_curr": "JPY", "date": {"$gte": datetime.datetime(2023, 1, 1), "$lt": datetime.datetime(2024, 1, 1)}}
+    sample = random.Random(7).sample(documents, min(100, len(documents)))
+
+    timings["first page"] = median_ms(lambda: backend.get_page(DB_NAME, COLLECTION_NAME, page_size=50), repeats)
+    timings["page 21"] = median_ms(lambda: backend.get_page(DB_NAME, COLLECTION_NAME, page_size=50, after=cursor), repeats)
+    timings["count"] = median_ms(lambda: backend.count(DB_NAME, COLLECTION_NAME), repeats)
+    timings["count by owner"] = median_ms(lambda: backend.count(DB_NAME, COLLECTION_NAME, {"_owner": "alice"}), repeats)
+    timings["pair and year"] = median_ms(lambda: backend.find(DB_NAME, COLLECTION_NAME, pair_query, sort=[("date", -1)]), repeats)
+    timings["lookup by _id"] = median_ms(lambda: backend.find(DB_NAME, COLLECTION_NAME, {"_id": sample[0]["_id"]}), repeats)
+    timings["update 100"] = median_ms(lambda: backend.update_many(DB_NAME, COLLECTION_NAME, {document["_id"]: {"remark": "checked", "_updated_at": datetime.datetime.now()} for document in sample}), repeats)
+    start = time.perf_counter()
+    backend.delete_many(DB_NAME, COLLECTION_NAME, [document["_id"] for document in sample])
+    timings["delete 100"] = (time.perf_counter() - start) * 1000
+    return timings
+
+def main(n_documents: int = 100000, repeats: int = 5, mongodb_uri: str | None = None) -> None:
+    documents = make_documents(n_documents)
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        backend = SQLiteBackend(os.path.join(temp_dir, "benchmark.sqlite3"))
+        results["SQLite"] = run(backend, documents, repeats)
+        backend.close()
+    if mongodb_uri:
+        from pymongo import MongoClient
+        client = MongoClient(mongodb_uri)
+        client.drop_database(DB_NAME)
+        collection = client[DB_NAME][COLLECTION_NAME]
+        # The same indexes as the SQLite tables
+        collection.create_index([("date", -1), ("_id", -1)])
+        collection.create_index([("from_curr", 1), ("to_curr", 1), ("date", -1)])
+        try:
+            results["MongoDB"] = run(MongoBackend(client), documents, repeats)
+        finally:
+            client.drop_database(DB_NAME)
+            client.close()
+
+    print(f"documents: {n_documents}, median of {repeats} (bulk insert and delete run once), milliseconds")
+    print(f"{'operation':<16}" + "".join(f"{name:>12}" for name in results))
+    for operation in next(iter(results.values())):
+        print(f"{operation:<16}" + "".join(f"{timings[operation]:>12.2f}" for timings in results.values()))
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]), *sys.argv[3:4])
@@ -0,0 +1,64 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import mongomock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from functions.db import delta_sync
+from functions.db.delta_sync import TOMBSTONE_COLLECTION, record_tombstones, sync_collection
+
+class SyncCollectionTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mongomock.MongoClient()
+        self.collection = self.client["db"]["tx"]
+        self.now = datetime(2024, 6, 1, 12, 0)
+        self.collection.insert_many([{"_id": i, "to_amt": 1.0, "_updated_at": self.now - timedelta(minutes=10 - i)} for i in range(3)])
+        patches = [
+            mock.patch.object(delta_sync, "_get_snapshot_settings", return_value={"enabled": False, "interval": 60.0}),
+            mock.patch.object(delta_sync, "_SYNC_STATES", {}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _sync(self):
+        data = sync_collection(self.client, "db", "tx")
+        return {} if data is None else dict(zip(data["_id"], data["to_amt"]))
+
+    def test_changes_and_tombstones_are_merged(self):
+        self.assertEqual(self._sync(), {0: 1.0, 1: 1.0, 2: 1.0})
+        self.collection.update_one({"_id": 1}, {"$set": {"to_amt": 2.0, "_updated_at": self.now}})
+        self.collection.insert_one({"_id": 3, "to_amt": 3.0, "_updated_at": self.now})
+        self.collection.delete_one({"_id": 0})
+        record_tombstones(self.client, "db", "tx", [0])
+        self.assertEqual(self._sync(), {1: 2.0, 2: 1.0, 3: 3.0})
+
+    def test_change_stamped_behind_the_watermark_within_the_skew_window(self):
+        self._sync()
+        # A writer whose clock runs two minutes behind stamps a change older than the watermark
+        self.collection.update_one({"_id": 0}, {"$set": {"to_amt": 5.0, "_updated_at": self.now - timedelta(minutes=9)}})
+        self.client["db"][TOMBSTONE_COLLECTION].insert_one({"collection": "tx", "doc_id": 2, "_deleted_at": datetime.now() - timedelta(minutes=2)})
+        self.collection.delete_one({"_id": 2})
+        self.assertEqual(self._sync(), {0: 5.0, 1: 1.0})
+
+    def test_unchanged_rows_of_the_window_do_not_rematerialize(self):
+        materialize = mock.Mock(side_effect=lambda data: data)
+        sync_collection(self.client, "db", "tx", materialize=materialize)
+        sync_collection(self.client, "db", "tx", materialize=materialize)
+        self.assertEqual(materialize.call_count, 1)
+
+    def test_copy_older_than_the_tombstone_retention_is_reloaded(self):
+        self._sync()
+        state = next(iter(delta_sync._SYNC_STATES.values()))
+        state["tombstones_read_at"] = datetime.now() - timedelta(days=31)
+        # The tombstone of this delete has expired, only a full reload drops the document
+        self.collection.delete_one({"_id": 1})
+        self.assertEqual(self._sync(), {0: 1.0, 2: 1.0})
+        self.assertGreater(state["tombstones_read_at"], datetime.now() - timedelta(minutes=1))
+
+if __name__ == "__main__":
+    unittest.main()
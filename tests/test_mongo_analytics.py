@@ -0,0 +1,32 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+
+import mongomock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from functions.db.mongo_analytics import get_monthly_weighted_rate
+
+class MonthlyWeightedRateTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mongomock.MongoClient()
+        self.client["db"]["tx"].insert_many([
+            {"from_curr": "HKD", "to_curr": "AUD", "date": datetime(2024, 1, 5), "from_amt": 100.0, "_rate": 0.2},
+            {"from_curr": "HKD", "to_curr": "AUD", "date": datetime(2024, 1, 20), "from_amt": 300.0, "_rate": 0.1},
+            {"from_curr": "USD", "to_curr": "JPY", "date": datetime(2024, 1, 10), "from_amt": 10.0, "_rate": 150.0},
+        ])
+
+    def test_pairs_are_not_averaged_together(self):
+        rows = get_monthly_weighted_rate(self.client, "db", "tx")
+        self.assertEqual([(row["from_curr"], row["to_curr"], row["month"], row["count"]) for row in rows], [("HKD", "AUD", 1, 2), ("USD", "JPY", 1, 1)])
+        self.assertAlmostEqual(rows[0]["weighted_rate"], 0.125)
+        self.assertAlmostEqual(rows[1]["weighted_rate"], 150.0)
+
+    def test_query_selects_one_pair(self):
+        rows = get_monthly_weighted_rate(self.client, "db", "tx", {"from_curr": "USD", "to_curr": "JPY"})
+        self.assertEqual([(row["from_curr"], row["volume"]) for row in rows], [("USD", 10.0)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import datetime
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from functions.db.mongo_arrow import documents_to_dataframe
+
+class DocumentsToDataFrameTest(unittest.TestCase):
+    def test_integer_schema_keeps_fractions(self):
+        documents = [{"from_amt": 100}, {"from_amt": 100.5}]
+        for arrow_backed in (False, True):
+            data = documents_to_dataframe(documents, schema={"from_amt": "Integer"}, arrow_backed=arrow_backed)
+            self.assertEqual(list(data["from_amt"]), [100.0, 100.5])
+
+    def test_integer_schema_types_whole_numbers(self):
+        data = documents_to_dataframe([{"from_amt": 100}, {"from_amt": 200.0}, {"from_amt": None}], schema={"from_amt": "Integer"}, arrow_backed=True)
+        self.assertEqual(str(data["from_amt"].dtype), "int64[pyarrow]")
+        self.assertEqual(data["from_amt"].tolist()[:2], [100, 200])
+
+    def test_float_schema_widens_integers(self):
+        data = documents_to_dataframe([{"to_amt": 1}, {"to_amt": 2}], schema={"to_amt": "Float"})
+        self.assertEqual(data["to_amt"].dtype.kind, "f")
+
+    def test_strings_are_not_parsed(self):
+        data = documents_to_dataframe([{"from_amt": "12"}], schema={"from_amt": "Integer"})
+        self.assertEqual(data["from_amt"].tolist(), ["12"])
+
+    def test_date_schema(self):
+        data = documents_to_dataframe([{"date": datetime.datetime(2024, 1, 2)}], schema={"date": "Date"})
+        self.assertEqual(data["date"].tolist(), [datetime.date(2024, 1, 2)])
+
+if __name__ == "__main__":
+    unittest.main()
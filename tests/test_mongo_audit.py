@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+import mongomock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from functions.db.mongo_audit import AUDIT_COLLECTION, SNAPSHOT_COLLECTION, audit_writes, get_collection_at, take_audit_snapshot
+
+T0 = datetime(2024, 6, 1, 12, 0)
+
+class GetCollectionAtTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mongomock.MongoClient()
+        self.audit_log = self.client["db"][AUDIT_COLLECTION]
+        self.seq = 0
+
+    def _record(self, minutes: int, doc_id, operation: str, changes=None):
+        self.seq += 1
+        self.audit_log.insert_one({"collection": "tx", "doc_id": doc_id, "operation": operation, "changes": changes, "actor": "admin", "_at": T0 + timedelta(minutes=minutes), "seq": self.seq})
+
+    def _snapshot(self, minutes: int, documents: list):
+        taken_at = T0 + timedelta(minutes=minutes)
+        snapshots = self.client["db"][SNAPSHOT_COLLECTION]
+        snapshots.insert_one({"collection": "tx", "taken_at": taken_at, "doc": None})
+        for document in documents:
+            snapshots.insert_one({"collection": "tx", "taken_at": taken_at, "doc": document})
+
+    def _state_at(self, minutes: int) -> dict:
+        state = get_collection_at(self.client, "db", "tx", T0 + timedelta(minutes=minutes))
+        return {document["_id"]: document["to_amt"] for document in state["documents"]}
+
+    def test_replay_without_snapshot(self):
+        self._record(0, "a", "insert", {"to_amt": 1.0})
+        self._record(1, "b", "insert", {"to_amt": 2.0})
+        self._record(2, "a", "update", {"to_amt": 3.0})
+        self._record(3, "b", "delete")
+        self.assertEqual(self._state_at(1), {"a": 1.0, "b": 2.0})
+        self.assertEqual(self._state_at(2), {"a": 3.0, "b": 2.0})
+        self.assertEqual(self._state_at(5), {"a": 3.0})
+        self.assertIsNone(get_collection_at(self.client, "db", "tx", T0)["snapshot_at"])
+
+    def test_replay_from_the_latest_snapshot_before_the_time(self):
+        # Only the records since the snapshot are replayed; "old" was written before auditing started
+        self._record(0, "a", "insert", {"to_amt": 1.0})
+        self._snapshot(5, [{"_id": "a", "to_amt": 1.0}, {"_id": "old", "to_amt": 9.0}])
+        self._record(6, "old", "update", {"to_amt": 8.0})
+        self._record(7, "a", "delete")
+        self._snapshot(10, [{"_id": "old", "to_amt": 8.0}])
+        self._record(11, "c", "insert", {"to_amt": 4.0})
+        state = get_collection_at(self.client, "db", "tx", T0 + timedelta(minutes=6))
+        self.assertEqual((state["snapshot_at"], state["replayed"]), (T0 + timedelta(minutes=5), 1))
+        self.assertEqual(self._state_at(6), {"a": 1.0, "old": 8.0})
+        self.assertEqual(self._state_at(8), {"old": 8.0})
+        self.assertEqual(self._state_at(12), {"old": 8.0, "c": 4.0})
+
+    def test_same_millisecond_records_replay_in_append_order(self):
+        self._record(0, "a", "insert", {"to_amt": 1.0})
+        self._record(0, "a", "update", {"to_amt": 2.0})
+        self._record(0, "a", "update", {"to_amt": 3.0})
+        self.assertEqual(self._state_at(0), {"a": 3.0})
+
+    def test_audited_writes_and_snapshot(self):
+        collection = self.client["db"]["tx"]
+        collection.insert_one({"_id": "a", "to_amt": 1.0})
+        take_audit_snapshot(self.client, "db", "tx")
+        collection.insert_one({"_id": "b", "to_amt": 2.0})
+        audit_writes(self.client, "db", "tx", "insert", [{"_id": "b", "to_amt": 2.0}], actor="admin")
+        audit_writes(self.client, "db", "tx", "update", {"a": {"to_amt": 5.0}}, actor="admin")
+        audit_writes(self.client, "db", "tx", "delete", ["b"], actor="admin")
+        state = get_collection_at(self.client, "db", "tx", datetime.now() + timedelta(seconds=1))
+        self.assertEqual(state["documents"], [{"_id": "a", "to_amt": 5.0}])
+        self.assertEqual(state["replayed"], 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+import mongomock
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from functions.db.mongo_batch import DUPLICATE_KEY_ERROR, DUPLICATE_TRANSACTION_MESSAGE, execute_batch
+
+def _fingerprint_error(index: int) -> dict:
+    return {"index": index, "code": DUPLICATE_KEY_ERROR, "keyPattern": {"_owner": 1, "_fingerprint": 1}, "errmsg": "E11000 duplicate key"}
+
+class ExecuteBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mongomock.MongoClient()
+        self.collection = self.client["db"]["tx"]
+        self.collection.insert_many([{"_id": i, "to_amt": 1.0} for i in range(4)])
+
+    def _execute(self, operation_type, operations_data, **kwargs):
+        return execute_batch(self.client, "db", "tx", operation_type, operations_data, chunk_size=kwargs.pop("chunk_size", 1000), max_retries=2, backoff=0, **kwargs)
+
+    def test_delete_reports_only_existing_ids(self):
+        result = self._execute("delete", [0, 1, 10, 11], chunk_size=2)
+        self.assertEqual(result["deleted_ids"], [0, 1])
+        self.assertEqual((result["success"], result["not_found"], result["errors"]), (2, 2, 0))
+        self.assertEqual(self.collection.count_documents({}), 2)
+
+    def test_grouped_updates_count_every_document(self):
+        result = self._execute("update", {0: {"to_amt": 2.0}, 1: {"to_amt": 2.0}, 2: {"to_amt": 3.0}, 10: {"to_amt": 2.0}})
+        self.assertEqual((result["success"], result["modified"], result["not_found"]), (3, 3, 1))
+        self.assertEqual(sorted(document["_id"] for document in self.collection.find({"to_amt": 2.0})), [0, 1])
+
+    def test_insert_partial_duplicates(self):
+        details = {"nInserted": 1, "writeErrors": [_fingerprint_error(1), {"index": 2, "code": 121, "errmsg": "Document failed validation"}]}
+        with mock.patch.object(mongomock.Collection, "bulk_write", side_effect=BulkWriteError(details)):
+            result = self._execute("insert", [{"_id": "a"}, {"_id": "b"}, {"_id": "c"}])
+        self.assertEqual((result["success"], result["errors"], result["duplicates"]), (1, 2, 1))
+        self.assertEqual([(failure["target"], failure["error"]) for failure in result["failures"]], [("b", DUPLICATE_TRANSACTION_MESSAGE), ("c", "Document failed validation")])
+
+    def test_grouped_update_duplicate_fails_the_whole_group(self):
+        details = {"nMatched": 1, "nModified": 1, "writeErrors": [_fingerprint_error(0)]}
+        with mock.patch.object(mongomock.Collection, "bulk_write", side_effect=BulkWriteError(details)):
+            result = self._execute("update", {0: {"to_amt": 2.0}, 1: {"to_amt": 2.0}, 2: {"to_amt": 3.0}})
+        self.assertEqual((result["success"], result["duplicates"], result["errors"], result["not_found"]), (1, 2, 2, 0))
+        self.assertEqual([failure["target"] for failure in result["failures"]], [0, 1])
+
+    def test_retried_insert_counts_own_duplicate_ids_as_inserted(self):
+        # The first attempt is applied but its acknowledgement is lost, the retry then hits the _ids it wrote
+        retry_details = {"nInserted": 0, "writeErrors": [{"index": 0, "code": DUPLICATE_KEY_ERROR, "keyPattern": {"_id": 1}, "errmsg": "E11000 duplicate key"}, _fingerprint_error(1)]}
+        with mock.patch.object(mongomock.Collection, "bulk_write", side_effect=[AutoReconnect("connection reset"), BulkWriteError(retry_details)]):
+            result = self._execute("insert", [{"_id": "a"}, {"_id": "b"}])
+        self.assertEqual((result["success"], result["retries"], result["duplicates"], result["errors"]), (1, 1, 1, 1))
+
+    def test_transient_errors_exhausting_retries_fail_the_chunk(self):
+        with mock.patch.object(mongomock.Collection, "bulk_write", side_effect=AutoReconnect("connection reset")):
+            result = self._execute("insert", [{"_id": "a"}, {"_id": "b"}])
+        self.assertEqual((result["success"], result["errors"], result["retries"]), (0, 2, 2))
+
+if __name__ == "__main__":
+    unittest.main()
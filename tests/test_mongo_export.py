@@ -0,0 +1,38 @@
+import csv
+import os
+import sys
+import tempfile
+import unittest
+
+import mongomock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from functions.db.mongo_export import export_collection
+
+class ExportCollectionTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mongomock.MongoClient()
+        # Older documents without the owner, followed by documents stamped with it
+        self.client["db"]["tx"].insert_many(
+            [{"_id": i, "from_amt": 100.0 + i} for i in range(2)] + [{"_id": i, "from_amt": 100.0 + i, "_owner": "admin"} for i in range(2, 4)]
+        )
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "tx.csv")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_csv_header_has_fields_first_seen_in_later_chunks(self):
+        self.assertEqual(export_collection(self.client, "db", "tx", self.file_path, "csv", batch_size=2), 4)
+        with open(self.file_path, newline="", encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual([row["_owner"] for row in rows], ["", "", "admin", "admin"])
+
+    def test_csv_header_leaves_out_excluded_fields(self):
+        export_collection(self.client, "db", "tx", self.file_path, "csv", projection={"_owner": 0}, batch_size=2)
+        with open(self.file_path, newline="", encoding="utf-8") as file:
+            self.assertEqual(next(csv.reader(file)), ["_id", "from_amt"])
+
+if __name__ == "__main__":
+    unittest.main()
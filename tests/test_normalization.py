@@ -0,0 +1,88 @@
+import contextlib
+import datetime
+import io
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from functions.normalization import FINGERPRINT_FIELD, clean_up_data, compute_fingerprint, normalize_dataframe
+
+# Stamped with a new uuid or the current time on each call
+_STAMPED_FIELDS = ("_id", "_created_at", "_updated_at")
+
+def _without_stamps(document: dict) -> dict:
+    return {field: value for field, value in document.items() if field not in _STAMPED_FIELDS}
+
+class NormalizeDataFrameTest(unittest.TestCase):
+    def assert_same_as_per_row(self, data: pd.DataFrame, operation_type: str, schema: dict | None = None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = [
+                clean_up_data(operation_type=operation_type, data=row, hidden_fields=True, cal_rate=True, schema=schema)
+                for row in data.to_dict(orient="records")
+            ]
+        documents = normalize_dataframe(data, operation_type=operation_type, hidden_fields=True, cal_rate=True, schema=schema)
+        self.assertEqual([_without_stamps(document) for document in documents], [_without_stamps(document) for document in expected])
+        for document, expected_document in zip(documents, expected):
+            self.assertEqual(set(document), set(expected_document))
+            for field, value in _without_stamps(document).items():
+                self.assertIs(type(value), type(expected_document[field]), field)
+
+    def test_strings_from_the_data_editor(self):
+        data = pd.DataFrame({
+            "date": ["2024-01-05", "05/02/2024", "", None],
+            "from_curr": ["hkd", "usd", "jpy", "aud"],
+            "to_curr": ["aud", "hkd", "hkd", None],
+            "from_amt": ["1000", "12.50", "0", "1e3"],
+            "to_amt": ["200.0", "97.3", "", "3"],
+            "note": ["cash", "True", "", "2024-01-05 10:30:00"],
+        })
+        self.assert_same_as_per_row(data, "insert")
+
+    def test_typed_columns_and_schema(self):
+        data = pd.DataFrame({
+            "date": [pd.Timestamp("2024-01-05"), pd.NaT, pd.Timestamp("2024-03-01 12:00")],
+            "from_curr": ["HKD", "USD", "EUR"],
+            "to_curr": ["JPY", "HKD", "HKD"],
+            "from_amt": [1000, 20, 5],
+            "to_amt": [19000.5, np.nan, 42.0],
+            "paid": [True, False, True],
+        })
+        self.assert_same_as_per_row(data, "update")
+        self.assert_same_as_per_row(data.astype({"from_amt": str}), "insert", schema={"from_amt": "Float", "date": "Date"})
+
+class ComputeFingerprintTest(unittest.TestCase):
+    transaction = {"date": datetime.datetime(2024, 1, 5), "from_curr": "HKD", "to_curr": "JPY", "from_amt": 1000.0, "to_amt": 19000.5}
+
+    def test_same_transaction_in_other_representations(self):
+        fingerprint = compute_fingerprint(self.transaction)
+        self.assertIsNotNone(fingerprint)
+        for changes in (
+            {"date": datetime.date(2024, 1, 5)},
+            {"date": pd.Timestamp("2024-01-05")},
+            {"date": np.datetime64("2024-01-05")},
+            {"from_amt": 1000, "to_amt": np.float64(19000.5)},
+            {"from_amt": "1000.00"},
+            {"from_curr": " hkd ", "to_curr": "jpy"},
+        ):
+            self.assertEqual(compute_fingerprint({**self.transaction, **changes}), fingerprint, changes)
+
+    def test_other_transactions_and_incomplete_documents(self):
+        fingerprint = compute_fingerprint(self.transaction)
+        self.assertNotEqual(compute_fingerprint({**self.transaction, "to_amt": 19000.51}), fingerprint)
+        self.assertNotEqual(compute_fingerprint({**self.transaction, "date": datetime.datetime(2024, 1, 5, 9)}), fingerprint)
+        self.assertIsNone(compute_fingerprint({**self.transaction, "date": None}))
+        self.assertIsNone(compute_fingerprint({field: value for field, value in self.transaction.items() if field != "to_amt"}))
+        self.assertIsNone(compute_fingerprint({**self.transaction, "from_amt": "n/a"}))
+
+    def test_clean_up_data_stamps_the_fingerprint(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            document = clean_up_data(operation_type="insert", data={**self.transaction, "date": "2024-01-05", "from_amt": "1000"}, hidden_fields=True)
+        self.assertEqual(document[FINGERPRINT_FIELD], compute_fingerprint(self.transaction))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import mongomock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from functions.db import mongo_schema_registry
+from functions.db.mongo_schema_registry import SCHEMA_COLLECTION, get_or_infer_schema, get_schema, refresh_schema, save_schema
+from functions.db.storage_backend import SQLiteBackend
+
+class SchemaRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mongomock.MongoClient()
+        self.client["db"]["tx"].insert_many([{"from_amt": 100 + i, "date": datetime.datetime(2024, 1, 1 + i)} for i in range(5)])
+
+    def test_sampled_schema_is_registered_once(self):
+        with mock.patch.object(mongo_schema_registry, "infer_schema", wraps=mongo_schema_registry.infer_schema) as infer_schema:
+            self.assertEqual(get_or_infer_schema(self.client, "db", "tx"), {"from_amt": "Float", "date": "Date"})
+            self.client["db"]["tx"].insert_one({"from_amt": 1, "date": datetime.datetime(2024, 2, 1)})
+            get_or_infer_schema(self.client, "db", "tx")
+        self.assertEqual(infer_schema.call_count, 1)
+        self.assertEqual(self.client["db"][SCHEMA_COLLECTION].find_one({"_id": "tx"})["source"], "sample")
+
+    def test_form_schema_takes_precedence(self):
+        save_schema(self.client, "db", "tx", {"from_amt": "Integer"}, source="form")
+        self.assertIsNone(save_schema(self.client, "db", "tx", {"from_amt": "Float"}, source="sample"))
+        self.assertEqual(refresh_schema(self.client, "db", "tx"), {"from_amt": "Integer"})
+        self.assertEqual(get_or_infer_schema(self.client, "db", "tx"), {"from_amt": "Integer"})
+
+    def test_refresh_replaces_sampled_schema(self):
+        self.client["db"][SCHEMA_COLLECTION].insert_one({"_id": "tx", "fields": {"from_amt": "Integer"}, "source": "sample"})
+        self.assertEqual(get_or_infer_schema(self.client, "db", "tx"), {"from_amt": "Float"})
+        self.assertEqual(refresh_schema(self.client, "db", "tx"), {"from_amt": "Float", "date": "Date"})
+
+class SQLiteSchemaRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.backend = SQLiteBackend(os.path.join(self.temp_dir.name, "test.sqlite3"))
+        self.backend.insert_many("db", "tx", [{"from_amt": 100 + i, "date": datetime.datetime(2024, 1, 1 + i)} for i in range(5)])
+
+    def tearDown(self):
+        self.backend.close()
+        self.temp_dir.cleanup()
+
+    def test_sampled_schema_is_registered(self):
+        self.assertEqual(get_or_infer_schema(self.backend, "db", "tx"), {"from_amt": "Float", "date": "Date"})
+        self.assertEqual(self.backend.find("db", SCHEMA_COLLECTION, {"_id": "tx"})[0]["source"], "sample")
+        self.assertEqual(get_schema(self.backend, "db", "tx", source="sample"), {"from_amt": "Float", "date": "Date"})
+
+    def test_form_schema_takes_precedence(self):
+        get_or_infer_schema(self.backend, "db", "tx")
+        save_schema(self.backend, "db", "tx", {"from_amt": "Integer"}, source="form")
+        self.assertIsNone(save_schema(self.backend, "db", "tx", {"from_amt": "Float"}, source="sample"))
+        self.assertEqual(refresh_schema(self.backend, "db", "tx"), {"from_amt": "Integer"})
+        self.assertEqual(self.backend.count("db", SCHEMA_COLLECTION), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from functions.db.storage_backend import SQLiteBackend
+
+class SQLiteBackendQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.backend = SQLiteBackend(os.path.join(self.temp_dir.name, "test.sqlite3"))
+        self.backend.insert_many("db", "tx", [
+            {"_id": i, "date": datetime.datetime(2024, 1, 1 + i), "it's": i % 3, "nested": {"amount": i}}
+            for i in range(6)
+        ])
+
+    def tearDown(self):
+        self.backend.close()
+        self.temp_dir.cleanup()
+
+    def test_field_names_with_quotes(self):
+        documents = self.backend.find("db", "tx", {"it's": {"$in": [1, 2]}}, sort=[("it's", -1), ("_id", 1)])
+        self.assertEqual([document["_id"] for document in documents], [2, 5, 1, 4])
+        self.assertEqual(self.backend.count("db", "tx", {"it's'); DROP TABLE x; --": 1}), 0)
+
+    def test_comparisons_on_json_and_column_fields(self):
+        query = {"nested.amount": {"$gte": 2}, "date": {"$lt": datetime.datetime(2024, 1, 5)}}
+        self.assertEqual([document["_id"] for document in self.backend.find("db", "tx", query, sort=[("_id", 1)])], [2, 3])
+        self.assertEqual(self.backend.count("db", "tx", {"it's": {"$ne": 0}}), 4)
+
+    def test_bytes_round_trip(self):
+        # The bcrypt hashes of the users are bytes
+        self.backend.insert_one("db", "users", {"username": "admin", "password": b"$2b$12$hash", "active": True})
+        user = self.backend.find("db", "users", {"username": "admin", "active": True}, limit=1)[0]
+        self.assertEqual(user["password"], b"$2b$12$hash")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+import unittest
+from collections import OrderedDict
+from unittest import mock
+
+import mongomock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from functions.db import mongo_batch, write_behind
+from functions.db.write_behind import flush_write_behind, get_job_status, get_write_behind_status, submit_inserts
+
+class WriteBehindTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mongomock.MongoClient()
+        self.client["db"]["tx"].insert_one({"_id": "existing", "to_amt": 1.0})
+        settings = {"queue_size": 2, "batch_size": 500, "linger": 0.0, "flush_timeout": 5.0}
+        # Each test gets its own queue, worker and jobs
+        patches = [
+            mock.patch.object(write_behind, "_QUEUE", None),
+            mock.patch.object(write_behind, "_WORKER", None),
+            mock.patch.object(write_behind, "_JOBS", OrderedDict()),
+            mock.patch.object(write_behind, "_get_write_behind_settings", return_value=settings),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _submit(self, documents: list) -> str:
+        return submit_inserts(self.client, "db", "tx", documents, actor="admin")
+
+    def test_job_goes_from_pending_through_writing_to_committed(self):
+        started, release, statuses = threading.Event(), threading.Event(), []
+        execute_batch = mongo_batch.execute_batch
+
+        def _blocked_batch(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return execute_batch(*args, **kwargs)
+
+        with mock.patch.object(mongo_batch, "execute_batch", side_effect=_blocked_batch):
+            job_id = self._submit([{"_id": "a"}, {"_id": "b"}])
+            statuses.append(get_job_status(job_id)["status"])
+            self.assertTrue(started.wait(5))
+            statuses.append(get_job_status(job_id)["status"])
+            release.set()
+            self.assertTrue(flush_write_behind())
+        job = get_job_status(job_id)
+        self.assertIn(statuses[0], ("pending", "writing"))
+        self.assertEqual(statuses[1], "writing")
+        self.assertEqual((job["status"], job["committed"], job["failed"]), ("committed", 2, 0))
+        self.assertIsNotNone(job["committed_at"])
+        self.assertEqual(self.client["db"]["tx"].count_documents({"_updated_at": {"$exists": True}}), 2)
+
+    def test_partial_and_failed_jobs(self):
+        partial_id = self._submit([{"_id": "c"}, {"_id": "existing"}])
+        failed_id = self._submit([{"_id": "existing"}])
+        self.assertTrue(flush_write_behind())
+        partial, failed = get_job_status(partial_id), get_job_status(failed_id)
+        self.assertEqual((partial["status"], partial["committed"], partial["failed"]), ("partial", 1, 1))
+        self.assertEqual([failure["target"] for failure in partial["failures"]], ["existing"])
+        self.assertEqual((failed["status"], failed["committed"], failed["failed"]), ("failed", 0, 1))
+        status = get_write_behind_status()
+        self.assertEqual((status["pending"], status["committed"], status["failed"]), (0, 1, 2))
+
+    def test_full_queue_is_not_queued(self):
+        started, release = threading.Event(), threading.Event()
+        with mock.patch.object(mongo_batch, "execute_batch", side_effect=lambda *args, **kwargs: started.set() or (release.wait(5) and {"failures": []})):
+            job_ids = [self._submit([{"_id": "doc0"}])]
+            # The worker is writing the first job, the next two fill the queue of two
+            self.assertTrue(started.wait(5))
+            job_ids += [self._submit([{"_id": f"doc{i}"}]) for i in range(1, 4)]
+            release.set()
+            self.assertTrue(flush_write_behind())
+        self.assertIsNone(job_ids[-1])
+        self.assertTrue(all(job_ids[:-1]))
+        self.assertIsNone(get_job_status("missing"))
+
+if __name__ == "__main__":
+    unittest.main()